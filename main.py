@@ -1,5 +1,4 @@
 import sys
-import time
 from pathlib import Path
 from collections import defaultdict
 
@@ -18,6 +17,9 @@ from spotifyapp.list_playlists import list_all_playlists
 from spotifyapp.check_auto_created import check_auto_playlists
 from spotifyapp.delete_playlist import delete_playlists
 from spotifyapp.update_playlists import update_playlists_main
+from spotifyapp.library_mirror import sync_library
+from spotifyapp.genre_cache import close_cache
+from spotifyapp.genre_table import genre_ids, genre_name
 from spotifyapp.playlist_cache import (
     load_playlist_cache,
     load_staged_playlists,
@@ -28,21 +30,40 @@ from spotifyapp.playlist_cache import (
 
 
 def get_liked_tracks():
-    """Récupère toutes les chansons likées de l'utilisateur."""
+    """
+    Récupère toutes les chansons likées de l'utilisateur depuis le miroir local.
+    
+    Le miroir est d'abord synchronisé (seuls les nouveaux titres sont téléchargés,
+    --sync-library force une relecture complète).
+    
+    Returns:
+        Liste des entrées du miroir {uri, added_at, artist_ids, name, isrc}
+    """
     print("\n[*] Recuperation des chansons likees...")
-    liked_tracks = []
-    results = sp.current_user_saved_tracks(limit=50)
-    while results:
-        for item in results["items"]:
-            track = item["track"]
-            liked_tracks.append(track)
-        results = sp.next(results) if results["next"] else None
+    liked_tracks = sync_library(full=("--sync-library" in sys.argv))
     
     print(f"[*] Nombre de chansons likees recuperees : {len(liked_tracks)}")
     return liked_tracks
 
 
-def analyze_genres(liked_tracks, use_cache=True, force_refresh=False):
+def get_followed_artists():
+    """
+    Récupère les artistes suivis par l'utilisateur (objets complets, genres inclus).
+    
+    Returns:
+        Liste des artistes (vide si le scope user-follow-read n'est pas accordé)
+    """
+    from spotifyapp.pagination import iter_followed_artists
+    try:
+        followed_artists = list(iter_followed_artists())
+    except Exception as e:
+        print(f"[!] Artistes suivis indisponibles (scope user-follow-read ?) : {e}")
+        return []
+    print(f"[*] {len(followed_artists)} artiste(s) suivi(s)")
+    return followed_artists
+
+
+def analyze_genres(liked_tracks, use_cache=True, force_refresh=False, workers=1):
     """
     Analyse les genres des artistes pour chaque chanson likée.
     
@@ -50,44 +71,46 @@ def analyze_genres(liked_tracks, use_cache=True, force_refresh=False):
         liked_tracks: Liste des titres likés
         use_cache: Si True, utilise le cache pour éviter les appels API répétés
         force_refresh: Si True, force la mise à jour depuis l'API même si en cache
+        workers: Nombre de requêtes en parallèle pour les titres absents du cache
     
     Returns:
-        Tuple (genre_dict, track_genres_dict)
+        Tuple (genre_dict, track_genres_dict) ; track_genres_dict associe à chaque
+        titre le tuple des IDs de ses genres (voir genre_table)
     """
     print("\n[*] Analyse des genres des artistes...")
     
     if use_cache:
-        from spotifyapp.genre_cache import get_cache
+        from spotifyapp.genre_cache import get_cache, track_records
         cache = get_cache()
         
         # Afficher les stats du cache
         stats = cache.get_cache_stats()
         print(f"[*] Cache: {stats['tracks_cached']} titres, {stats['artists_cached']} artistes en cache")
         
-        # Récupérer les URIs des titres
-        track_uris = [track["uri"] for track in liked_tracks]
+        # Les titres likés contiennent déjà leurs artistes : pas besoin de sp.track
+        records = track_records(liked_tracks)
         
         # Analyser avec le cache
         def progress_callback(idx, total):
             print(f"  -> {idx}/{total} pistes analysees...")
         
-        track_genres_dict = cache.analyze_tracks_genres(
-            track_uris, 
+        track_genres_dict = cache.analyze_track_records(
+            records, 
             force_refresh=force_refresh,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            workers=workers
         )
     else:
         # Méthode originale sans cache
         track_genres_dict = {}
         artist_cache = {}
         for idx, track in enumerate(liked_tracks, 1):
-            artist_id = track["artists"][0]["id"]
+            if not track["artist_ids"]:
+                continue
+            artist_id = track["artist_ids"][0]
             if artist_id not in artist_cache:
-                artist_cache[artist_id] = sp.artist(artist_id)
-            artist_info = artist_cache[artist_id]
-            time.sleep(0.1)  # Pour eviter de trop solliciter l'API
-            genres = artist_info.get("genres", ["Unknown"])
-            track_genres_dict[track["uri"]] = genres
+                artist_cache[artist_id] = genre_ids(sp.artist(artist_id).get("genres", ["Unknown"]))
+            track_genres_dict[track["uri"]] = artist_cache[artist_id]
             
             if idx % 50 == 0:
                 print(f"  -> {idx}/{len(liked_tracks)} pistes analysees...")
@@ -96,7 +119,7 @@ def analyze_genres(liked_tracks, use_cache=True, force_refresh=False):
     genre_dict = defaultdict(list)
     for track_uri, genres in track_genres_dict.items():
         for genre in genres:
-            genre_dict[genre].append(track_uri)
+            genre_dict[genre_name(genre)].append(track_uri)
     
     print(f"[*] {len(genre_dict)} genres differents trouves dans les chansons likees\n")
     return genre_dict, track_genres_dict
@@ -115,6 +138,48 @@ def get_args_after(flag):
     return out
 
 
+def get_int_arg(flag, default):
+    """Retourne la valeur entière suivant un drapeau (ex. --workers 8), ou default."""
+    values = get_args_after(flag)
+    try:
+        return int(values[0]) if values else default
+    except ValueError:
+        print(f"[!] Valeur invalide pour {flag} : {values[0]} (defaut : {default})")
+        return default
+
+
+def get_use_async():
+    """Indique si --async est demandé et utilisable (aiohttp installé)."""
+    if "--async" not in sys.argv:
+        return False
+    from spotifyapp.async_client import is_available
+    if not is_available():
+        print("[!] --async ignore : aiohttp n'est pas installe (pip install aiohttp)")
+        return False
+    return True
+
+
+def apply_cache_options():
+    """Applique --cache-backend NOM (sqlite, journal, binary, json) et --cache-max-age JOURS au cache des genres."""
+    from spotifyapp.cache_backends import backend_names
+    from spotifyapp.genre_cache import configure_cache
+    options = {}
+    values = get_args_after("--cache-backend")
+    if values:
+        if values[0] in backend_names():
+            options["backend"] = values[0]
+        else:
+            print(f"[!] Backend de cache inconnu : {values[0]} (choix : {', '.join(backend_names())})")
+    values = get_args_after("--cache-max-age")
+    if values:
+        try:
+            options["max_age"] = float(values[0]) * 24 * 3600
+        except ValueError:
+            print(f"[!] Valeur invalide pour --cache-max-age : {values[0]}")
+    if options:
+        configure_cache(**options)
+
+
 def show_help():
     """Affiche l'aide avec toutes les options disponibles."""
     print("=" * 80)
@@ -137,8 +202,17 @@ def show_help():
     print("  --scoring           : Utiliser le système de scoring pondéré (nécessite entraînement)")
     print("  --no-cache          : Désactiver l'utilisation du cache des genres")
     print("  --refresh-cache     : Forcer la mise à jour du cache depuis l'API")
-    print("  --cache-stats       : Afficher les statistiques du cache")
+    print("  --cache-stats       : Afficher les statistiques du cache (taux de succes, appels API, latences)")
     print("  --clear-cache       : Vider le cache des genres")
+    print("  --warm-cache        : Pré-remplir le cache des genres (bibliothèque + artistes suivis) puis quitter")
+    print("  --cache-gc          : Retirer du cache les titres qui ne sont plus likés et les artistes orphelins (artistes suivis conservés)")
+    print("  --export-cache [F]  : Exporter les genres des artistes dans un fichier portable (.json.gz)")
+    print("  --import-cache F    : Fusionner un export dans le cache (l'entrée la plus récente l'emporte)")
+    print("  --cache-backend B   : Stockage du cache des genres : sqlite (défaut), journal, binary ou json")
+    print("  --cache-max-age J   : Durée de validité des genres d'un artiste en jours (défaut : 30, 0 = illimitée)")
+    print("  --workers N         : Nombre de requêtes parallèles pour les genres absents du cache (défaut : 1)")
+    print("  --sync-library      : Relire entièrement la bibliothèque (miroir local des titres likés)")
+    print("  --async             : Client asynchrone (aiohttp) pour la création, la mise à jour et --analyze")
     print("\nExemples :")
     print("  python main.py                    # Dry-run : créer les playlists par classe")
     print("  python main.py --confirm           # Créer réellement les playlists par classe")
@@ -172,9 +246,11 @@ def main():
         show_help()
         return
     
+    apply_cache_options()
+    
     if "--analyze" in sys.argv:
         print("\n[*] Mode : Analyse des playlists auto\n")
-        analyze_auto_playlists()
+        analyze_auto_playlists(use_async=get_use_async())
         return
     
     if "--find" in sys.argv:
@@ -238,7 +314,12 @@ def main():
             print(f"[*] Mise à jour partielle : {len(only_names)} playlist(s) sélectionnée(s).")
         use_cache = ("--no-cache" not in sys.argv)
         force_refresh = ("--refresh-cache" in sys.argv)
-        update_playlists_main(confirm=confirm, use_cache=use_cache, force_refresh=force_refresh)
+        workers = get_int_arg("--workers", 1)
+        update_playlists_main(
+            confirm=confirm, use_cache=use_cache, force_refresh=force_refresh, workers=workers,
+            use_async=get_use_async(), full_sync=("--sync-library" in sys.argv)
+        )
+        print(f"[*] {sp.format_stats()}")
         return
     
     if "--train-model" in sys.argv:
@@ -251,18 +332,85 @@ def main():
     
     if "--cache-stats" in sys.argv:
         print("\n[*] Statistiques du cache\n")
+        from datetime import datetime
         from spotifyapp.genre_cache import get_cache
+        from spotifyapp.metrics import format_metrics, load_metrics
         cache = get_cache()
-        stats = cache.get_cache_stats()
-        print(f"Fichier de cache: {stats['cache_file']}")
-        print(f"Titres en cache: {stats['tracks_cached']}")
-        print(f"Artistes en cache: {stats['artists_cached']}")
+        stats = cache.get_cache_stats(count_stale=True)
+        print(f"Fichier de cache: {stats['cache_file']} ({stats['backend']}, {stats['size_bytes'] / 1024:.1f} Ko)")
+        print(f"Titres en cache: {stats['tracks_cached']} (dont {stats['tracks_negative']} non resolu(s))")
+        print(f"Artistes en cache: {stats['artists_cached']} (dont {stats['artists_negative']} non resolu(s), "
+              f"{stats['artists_stale']} perime(s))")
         if stats['created_at']:
-            from datetime import datetime
             created = datetime.fromtimestamp(stats['created_at'])
             updated = datetime.fromtimestamp(stats['last_updated'])
             print(f"Créé le: {created.strftime('%Y-%m-%d %H:%M:%S')}")
             print(f"Dernière mise à jour: {updated.strftime('%Y-%m-%d %H:%M:%S')}")
+        metrics = load_metrics()
+        last_run = metrics.get("last_run")
+        if last_run:
+            finished = datetime.fromtimestamp(last_run["finished_at"]).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"\nDerniere execution ({finished}, arguments : {last_run.get('command') or '-'}) :")
+            for line in format_metrics(last_run):
+                print(line)
+        cumulative = metrics.get("cumulative")
+        if cumulative:
+            since = datetime.fromtimestamp(cumulative["since"]).strftime('%Y-%m-%d')
+            print(f"\nCumul ({cumulative['runs']} execution(s) depuis le {since}) :")
+            for line in format_metrics(cumulative):
+                print(line)
+        return
+    
+    if "--warm-cache" in sys.argv:
+        print("\n[*] Mode : Pré-remplissage du cache des genres\n")
+        from spotifyapp.genre_cache import get_cache, track_records
+        liked_tracks = get_liked_tracks()
+        followed_artists = get_followed_artists()
+        cache = get_cache()
+        result = cache.warm(track_records(liked_tracks), followed_artists, workers=get_int_arg("--workers", 1))
+        stats = cache.get_cache_stats()
+        print(f"[+] {result['followed']} artiste(s) suivi(s) enregistre(s), {result['fetched']} artiste(s) recupere(s) depuis l'API, "
+              f"{result['tracks_seeded']} titre(s) ajoute(s)")
+        print(f"[*] Cache: {stats['tracks_cached']} titres, {stats['artists_cached']} artistes en cache")
+        print(f"[*] {sp.format_stats()}")
+        return
+    
+    if "--cache-gc" in sys.argv:
+        print("\n[*] Mode : Nettoyage du cache des genres\n")
+        from spotifyapp.genre_cache import get_cache
+        library_uris = {track["uri"] for track in get_liked_tracks() if track.get("uri")}
+        if not library_uris:
+            print("[!] Bibliotheque vide ou illisible : nettoyage annule")
+            return
+        # Les artistes suivis enregistrés par --warm-cache n'ont pas forcément de titre liké
+        followed_ids = [artist["id"] for artist in get_followed_artists()]
+        result = get_cache().collect_garbage(library_uris, keep_artists=followed_ids)
+        before, after = result["before"], result["after"]
+        print(f"[+] Titres : {before['tracks']} -> {after['tracks']} | Artistes : {before['artists']} -> {after['artists']}")
+        print(f"[+] Taille du cache : {before['bytes'] / 1024:.1f} Ko -> {after['bytes'] / 1024:.1f} Ko")
+        return
+    
+    if "--export-cache" in sys.argv:
+        from spotifyapp.genre_cache import get_cache
+        from spotifyapp.paths import path_genre_cache_export
+        values = get_args_after("--export-cache")
+        target = Path(values[0]) if values else path_genre_cache_export()
+        count = get_cache().export_bundle(target)
+        print(f"[+] {count} artiste(s) exporte(s) dans {target} ({target.stat().st_size / 1024:.1f} Ko)")
+        return
+    
+    if "--import-cache" in sys.argv:
+        from spotifyapp.genre_cache import get_cache
+        values = get_args_after("--import-cache")
+        if not values:
+            print("[!] Usage : python main.py --import-cache FICHIER")
+            return
+        try:
+            result = get_cache().import_bundle(values[0])
+        except (OSError, ValueError) as e:
+            print(f"[!] Import impossible : {e}")
+            return
+        print(f"[+] {result['imported']} artiste(s) importe(s), {result['skipped']} ignore(s) (entree locale plus recente)")
         return
     
     if "--clear-cache" in sys.argv:
@@ -277,6 +425,7 @@ def main():
     use_scoring = ("--scoring" in sys.argv)
     use_cache = ("--no-cache" not in sys.argv)
     force_refresh = ("--refresh-cache" in sys.argv)
+    workers = get_int_arg("--workers", 1)
     
     if use_scoring:
         print("[*] Mode scoring pondere active\n")
@@ -287,15 +436,20 @@ def main():
     
     # Créer une fonction wrapper pour analyze_genres avec les paramètres de cache
     def analyze_genres_with_cache(liked_tracks):
-        return analyze_genres(liked_tracks, use_cache=use_cache, force_refresh=force_refresh)
+        return analyze_genres(liked_tracks, use_cache=use_cache, force_refresh=force_refresh, workers=workers)
     
     create_playlists_by_class(
         confirm=confirm, 
         get_liked_tracks_func=get_liked_tracks, 
         analyze_genres_func=analyze_genres_with_cache,
-        use_scoring=use_scoring
+        use_scoring=use_scoring,
+        use_async=get_use_async()
     )
+    print(f"[*] {sp.format_stats()}")
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        close_cache()
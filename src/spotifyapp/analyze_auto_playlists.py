@@ -1,93 +1,155 @@
 from .credentials import sp
+from .playlist_catalog import get_user_playlists
 from datetime import datetime, timezone
+import asyncio
+
+
+def print_playlist_header(idx, playlist, user_id):
+    """Affiche les informations générales d'une playlist."""
+    name = playlist.get("name", "Sans nom")
+    playlist_id = playlist.get("id")
+    owner = playlist.get("owner", {})
+    owner_id = owner.get("id", "Inconnu")
+    owner_name = owner.get("display_name") or owner_id
+    is_owned = owner_id == user_id
+    tracks_count = playlist.get("tracks", {}).get("total", 0)
+    public = "Public" if playlist.get("public") else "Prive"
+    collaborative = playlist.get("collaborative", False)
+    created_at = playlist.get("created_at")
+
+    print(f"\n{idx}. {name}")
+    print(f"   ID: {playlist_id}")
+    print(f"   Proprietaire: {owner_name} (ID: {owner_id})")
+    print(f"   Votre playlist: {'OUI' if is_owned else 'NON'}")
+    print(f"   {tracks_count} pistes | {public} | Collaborative: {collaborative}")
+    if created_at:
+        print(f"   Date de creation (API): {created_at}")
+
+
+def print_added_dates(items):
+    """Affiche les dates du premier et du dernier titre ajouté."""
+    earliest = None
+    latest = None
+    total_checked = 0
+
+    for item in items:
+        added = item.get("added_at")
+        if added:
+            try:
+                dt = datetime.fromisoformat(added.replace("Z", "+00:00"))
+                if earliest is None or dt < earliest:
+                    earliest = dt
+                if latest is None or dt > latest:
+                    latest = dt
+                total_checked += 1
+            except Exception:
+                pass
+
+    if earliest:
+        print(f"   Premier titre ajoute: {earliest.isoformat()}")
+    if latest:
+        print(f"   Dernier titre ajoute: {latest.isoformat()}")
+    print(f"   {total_checked} pistes analysees")
+
+
+def print_playlist_details(full_playlist):
+    """Affiche la description et le nombre d'abonnés d'une playlist."""
+    description = full_playlist.get("description", "")
+    if description:
+        print(f"   Description: {description}")
+    followers = full_playlist.get("followers", {}).get("total", 0)
+    print(f"   Abonnes: {followers}")
+
+
+def find_auto_playlists():
+    """Retourne l'ID utilisateur et les playlists contenant '(auto)'."""
+    playlists = get_user_playlists()
 
-def analyze_auto_playlists():
-    print("[*] Recherche des playlists contenant '(auto)'...\n")
-    
-    playlists = []
-    results = sp.current_user_playlists(limit=50)
-    
-    while results:
-        playlists.extend(results["items"])
-        results = sp.next(results) if results.get("next") else None
-    
     me = sp.current_user()
     user_id = me["id"]
-    
+
     # Filtrer les playlists avec "(auto)"
     auto_playlists = [p for p in playlists if "(auto)" in p.get("name", "").lower()]
-    
+    return user_id, auto_playlists
+
+
+async def fetch_auto_playlists_details(auto_playlists):
+    """
+    Récupère en parallèle les titres et détails de chaque playlist (client asynchrone).
+
+    Returns:
+        Liste de tuples (items ou exception, full_playlist ou exception), dans l'ordre des playlists
+    """
+    from .async_client import AsyncSpotify
+
+    async with AsyncSpotify() as asp:
+        async def fetch_one(playlist_id):
+            def fetch_page(limit, offset):
+                return asp.playlist_items(playlist_id, fields="items(added_at),total", limit=limit, offset=offset)
+            return await asyncio.gather(
+                asp.all_items(fetch_page, limit=100),
+                asp.playlist(playlist_id, fields="description,followers(total)"),
+                return_exceptions=True
+            )
+
+        return await asyncio.gather(*(fetch_one(p.get("id")) for p in auto_playlists))
+
+
+def analyze_auto_playlists(use_async=False):
+    """
+    Analyse les playlists contenant '(auto)'.
+
+    Args:
+        use_async: Si True, récupère les titres de toutes les playlists en parallèle (aiohttp)
+    """
+    print("[*] Recherche des playlists contenant '(auto)'...\n")
+
+    user_id, auto_playlists = find_auto_playlists()
+
     if not auto_playlists:
         print("[+] Aucune playlist contenant '(auto)' trouvee.")
         return
-    
+
     print(f"[*] {len(auto_playlists)} playlist(s) contenant '(auto)' trouvee(s):\n")
     print("=" * 80)
-    
+
+    prefetched = asyncio.run(fetch_auto_playlists_details(auto_playlists)) if use_async else None
+
     for idx, playlist in enumerate(auto_playlists, 1):
-        name = playlist.get("name", "Sans nom")
         playlist_id = playlist.get("id")
-        owner = playlist.get("owner", {})
-        owner_id = owner.get("id", "Inconnu")
-        owner_name = owner.get("display_name") or owner_id
-        is_owned = owner_id == user_id
-        tracks_count = playlist.get("tracks", {}).get("total", 0)
-        public = "Public" if playlist.get("public") else "Prive"
-        collaborative = playlist.get("collaborative", False)
-        created_at = playlist.get("created_at")
-        
-        print(f"\n{idx}. {name}")
-        print(f"   ID: {playlist_id}")
-        print(f"   Proprietaire: {owner_name} (ID: {owner_id})")
-        print(f"   Votre playlist: {'OUI' if is_owned else 'NON'}")
-        print(f"   {tracks_count} pistes | {public} | Collaborative: {collaborative}")
-        if created_at:
-            print(f"   Date de creation (API): {created_at}")
-        
+        print_playlist_header(idx, playlist, user_id)
+
         # Essayer de trouver la date du premier titre ajoute
         print(f"   Analyse des pistes...")
         try:
-            results = sp.playlist_items(playlist_id, fields="items(added_at),next", limit=100)
-            earliest = None
-            latest = None
-            total_checked = 0
-            
-            while results:
-                for item in results.get("items", []):
-                    added = item.get("added_at")
-                    if added:
-                        try:
-                            dt = datetime.fromisoformat(added.replace("Z", "+00:00"))
-                            if earliest is None or dt < earliest:
-                                earliest = dt
-                            if latest is None or dt > latest:
-                                latest = dt
-                            total_checked += 1
-                        except Exception:
-                            pass
-                results = sp.next(results) if results.get("next") else None
-            
-            if earliest:
-                print(f"   Premier titre ajoute: {earliest.isoformat()}")
-            if latest:
-                print(f"   Dernier titre ajoute: {latest.isoformat()}")
-            print(f"   {total_checked} pistes analysees")
+            if prefetched is not None:
+                items = prefetched[idx - 1][0]
+                if isinstance(items, Exception):
+                    raise items
+            else:
+                items = []
+                results = sp.playlist_items(playlist_id, fields="items(added_at),next", limit=100)
+                while results:
+                    items.extend(results.get("items", []))
+                    results = sp.next(results) if results.get("next") else None
+            print_added_dates(items)
         except Exception as e:
             print(f"   Erreur lors de l'analyse: {e}")
-        
+
         # Obtenir plus de details sur la playlist
         try:
-            full_playlist = sp.playlist(playlist_id)
-            description = full_playlist.get("description", "")
-            if description:
-                print(f"   Description: {description}")
-            followers = full_playlist.get("followers", {}).get("total", 0)
-            print(f"   Abonnes: {followers}")
+            if prefetched is not None:
+                full_playlist = prefetched[idx - 1][1]
+                if isinstance(full_playlist, Exception):
+                    raise full_playlist
+            else:
+                full_playlist = sp.playlist(playlist_id)
+            print_playlist_details(full_playlist)
         except Exception as e:
             print(f"   Erreur lors de la recuperation des details: {e}")
-        
+
         print("-" * 80)
-    
+
     print(f"\n[*] Analyse terminee.")
 
 if __name__ == "__main__":
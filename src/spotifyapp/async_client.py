@@ -0,0 +1,252 @@
+"""
+Client asynchrone (asyncio) pour l'API Spotify.
+
+Expose la même surface que celle utilisée avec `spotipy` (titres likés,
+playlists, playlist_items, artists, tracks, création/ajout/unfollow), mais
+permet de garder des centaines de requêtes en vol sur un seul pool de
+connexions keep-alive.
+
+Le débit reste celui du limiteur partagé (`credentials.sp`) : les seaux à
+jetons lecture/écriture et les compteurs sont communs aux clients synchrone et
+asynchrone.
+
+Dépendance optionnelle : `aiohttp` (pip install "spotifyapp[async]").
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    aiohttp = None
+
+from .credentials import sp
+from .rate_limiter import TRANSPORT_RETRY_STATUSES, parse_retry_after
+
+
+API_BASE = "https://api.spotify.com/v1/"
+REQUEST_TIMEOUT = 30  # Durée maximale d'une requête (secondes)
+CONNECT_TIMEOUT = 10  # Durée maximale d'établissement d'une connexion (secondes)
+
+
+def is_available() -> bool:
+    """Indique si le client asynchrone est utilisable (aiohttp installé)."""
+    return aiohttp is not None
+
+
+class AsyncSpotifyError(Exception):
+    """Erreur HTTP renvoyée par l'API Spotify (équivalent de SpotifyException)."""
+
+    def __init__(self, http_status: int, msg: str, headers=None):
+        super().__init__(f"http status: {http_status}, {msg}")
+        self.http_status = http_status
+        self.msg = msg
+        self.headers = headers or {}
+
+
+class AsyncSpotify:
+    """
+    Client Spotify asynchrone partageant le limiteur de débit du client synchrone.
+
+    Usage:
+        async with AsyncSpotify() as asp:
+            pages = await asyncio.gather(*(asp.playlist_items(pid) for pid in ids))
+    """
+
+    def __init__(
+        self, limiter=None, max_connections: int = 64, max_in_flight: int = 256, timeout: float = REQUEST_TIMEOUT
+    ):
+        """
+        Initialise le client.
+
+        Args:
+            limiter: Client limité (`RateLimitedSpotify`) fournissant jetons, token OAuth et compteurs (défaut: credentials.sp)
+            max_connections: Taille du pool de connexions keep-alive
+            max_in_flight: Nombre maximal de requêtes en vol simultanément
+            timeout: Durée maximale d'une requête en secondes (nouvelle tentative au-delà)
+        """
+        if aiohttp is None:
+            raise RuntimeError("Le client asynchrone necessite aiohttp : pip install aiohttp")
+        self._limiter = limiter if limiter is not None else sp
+        self._max_connections = max_connections
+        self._max_in_flight = max_in_flight
+        self._timeout = timeout
+        self._in_flight = None
+        self._session = None
+        self._token = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self._max_connections, keepalive_timeout=60)
+        timeout = aiohttp.ClientTimeout(total=self._timeout, sock_connect=min(CONNECT_TIMEOUT, self._timeout))
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        await self._refresh_token()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Ferme le pool de connexions."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _refresh_token(self):
+        """Récupère le token OAuth courant (rafraîchi si besoin) depuis spotipy."""
+        auth_manager = self._limiter.client.auth_manager
+        self._token = await asyncio.to_thread(auth_manager.get_access_token, as_dict=False)
+
+    async def _request(self, name: str, method: str, url: str, budget: str = "read", params=None, payload=None):
+        """
+        Exécute une requête en respectant le budget et en gérant 401/429.
+
+        Les erreurs serveur (5xx), réseau et les dépassements de délai sont
+        retentés avec le backoff du limiteur, jusqu'à `max_retries` fois.
+
+        Args:
+            name: Nom de l'endpoint (compteurs du limiteur)
+            method: Méthode HTTP
+            url: URL absolue ou chemin relatif à l'API
+            budget: "read" ou "write"
+            params: Paramètres de requête
+            payload: Corps JSON
+
+        Returns:
+            Réponse JSON décodée (None si corps vide)
+        """
+        if not url.startswith("http"):
+            url = API_BASE + url
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+        bucket = self._limiter.bucket(budget)
+        attempt = 0
+        token_refreshed = False
+        while True:
+            waited = 0.0
+            delay = bucket.try_acquire()
+            while delay > 0:
+                await asyncio.sleep(delay)
+                waited += delay
+                delay = bucket.try_acquire()
+            self._limiter.record_call(name, budget, waited)
+
+            retry_delay = None
+            async with self._in_flight:
+                headers = {"Authorization": f"Bearer {self._token}"}
+                started = time.perf_counter()
+                try:
+                    async with self._session.request(method, url, params=params, json=payload, headers=headers) as resp:
+                        if resp.status == 401 and not token_refreshed:
+                            token_refreshed = True
+                            await self._refresh_token()
+                            continue
+                        if resp.status == 429 and attempt < self._limiter.max_retries:
+                            bucket.block(self._limiter.backoff_delay(attempt, parse_retry_after(resp.headers)))
+                            self._limiter.record_throttle()
+                            attempt += 1
+                            continue
+                        if resp.status in TRANSPORT_RETRY_STATUSES and attempt < self._limiter.max_retries:
+                            retry_delay = self._limiter.backoff_delay(attempt, None)
+                        else:
+                            if resp.status >= 400:
+                                raise AsyncSpotifyError(resp.status, await resp.text(), dict(resp.headers))
+                            bucket.on_success()
+                            if resp.status == 204:
+                                return None
+                            text = await resp.text()
+                            return await resp.json(content_type=None) if text else None
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt >= self._limiter.max_retries:
+                        raise
+                    retry_delay = self._limiter.backoff_delay(attempt, None)
+                finally:
+                    self._limiter.record_latency(name, time.perf_counter() - started)
+
+            # Erreur passagère : attente hors du sémaphore avant la nouvelle tentative
+            self._limiter.record_retry()
+            attempt += 1
+            await asyncio.sleep(retry_delay)
+
+    # --- Pagination ---
+
+    async def next(self, result: Optional[Dict]) -> Optional[Dict]:
+        """Page suivante d'un résultat paginé (comme `spotipy.Spotify.next`)."""
+        if result and result.get("next"):
+            return await self._request("next", "GET", result["next"])
+        return None
+
+    async def all_items(self, fetch_page, limit: int) -> List[Dict]:
+        """
+        Récupère tous les éléments d'un endpoint paginé par offset.
+
+        La première page donne le total ; toutes les pages suivantes sont
+        ensuite demandées simultanément.
+
+        Args:
+            fetch_page: Coroutine `fetch_page(limit=..., offset=...)` renvoyant une page
+            limit: Taille de page
+
+        Returns:
+            Liste des éléments, dans l'ordre de l'API
+        """
+        first = await fetch_page(limit=limit, offset=0)
+        items = list(first.get("items", []))
+        total = first.get("total", len(items))
+        offsets = range(limit, total, limit)
+        pages = await asyncio.gather(*(fetch_page(limit=limit, offset=offset) for offset in offsets))
+        for page in pages:
+            items.extend(page.get("items", []))
+        return items
+
+    # --- Utilisateur / bibliothèque ---
+
+    async def current_user(self) -> Dict:
+        return await self._request("current_user", "GET", "me")
+
+    async def current_user_saved_tracks(self, limit: int = 20, offset: int = 0, market: Optional[str] = None) -> Dict:
+        params = {"limit": limit, "offset": offset, "market": market}
+        return await self._request("current_user_saved_tracks", "GET", "me/tracks", params=params)
+
+    async def current_user_playlists(self, limit: int = 50, offset: int = 0) -> Dict:
+        params = {"limit": limit, "offset": offset}
+        return await self._request("current_user_playlists", "GET", "me/playlists", params=params)
+
+    # --- Playlists ---
+
+    async def playlist(self, playlist_id: str, fields: Optional[str] = None) -> Dict:
+        return await self._request("playlist", "GET", f"playlists/{playlist_id}", params={"fields": fields})
+
+    async def playlist_items(
+        self, playlist_id: str, fields: Optional[str] = None, limit: int = 100, offset: int = 0
+    ) -> Dict:
+        params = {"fields": fields, "limit": limit, "offset": offset}
+        return await self._request("playlist_items", "GET", f"playlists/{playlist_id}/tracks", params=params)
+
+    async def user_playlist_create(
+        self, user: str, name: str, public: bool = True, collaborative: bool = False, description: str = ""
+    ) -> Dict:
+        payload = {"name": name, "public": public, "collaborative": collaborative, "description": description}
+        return await self._request("user_playlist_create", "POST", f"users/{user}/playlists", "write", payload=payload)
+
+    async def playlist_add_items(self, playlist_id: str, items: List[str], position: Optional[int] = None) -> Dict:
+        payload = {"uris": list(items)}
+        if position is not None:
+            payload["position"] = position
+        return await self._request("playlist_add_items", "POST", f"playlists/{playlist_id}/tracks", "write", payload=payload)
+
+    async def current_user_unfollow_playlist(self, playlist_id: str):
+        return await self._request(
+            "current_user_unfollow_playlist", "DELETE", f"playlists/{playlist_id}/followers", "write"
+        )
+
+    # --- Catalogue ---
+
+    async def tracks(self, tracks: List[str], market: Optional[str] = None) -> Dict:
+        ids = ",".join(t.split(":")[-1] for t in tracks)
+        return await self._request("tracks", "GET", "tracks", params={"ids": ids, "market": market})
+
+    async def artists(self, artists: List[str]) -> Dict:
+        ids = ",".join(a.split(":")[-1] for a in artists)
+        return await self._request("artists", "GET", "artists", params={"ids": ids})
@@ -0,0 +1,284 @@
+"""
+Instantanés binaires compacts, lus par mmap.
+
+Deux formats partagent la même structure : un en-tête, une table des chaînes
+(offsets + octets UTF-8, chaque chaîne stockée une seule fois), puis des
+enregistrements de taille fixe qui référencent les chaînes par leur indice.
+Tous les entiers sont en little-endian.
+
+- Cache des genres (genre_cache.bin, `CacheSnapshot`) : enregistrements des
+  titres et des artistes triés par clé (octets UTF-8), retrouvés par
+  dichotomie ; seules les entrées demandées sont décodées
+- Poids du modèle de scoring (weights_*.bin, `WeightsSnapshot`) : table des
+  buckets puis enregistrements (genre, poids) ; un bucket n'est décodé qu'au
+  premier accès
+
+L'ouverture ne lit que l'en-tête : son coût ne dépend pas de la taille du
+fichier.
+"""
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .jsonio import atomic_write_bytes
+
+
+FORMAT_VERSION = 1
+CACHE_MAGIC = b"SGC1"
+WEIGHTS_MAGIC = b"SGW1"
+NO_STRING = 0xFFFFFFFF  # Indice de chaîne "absente" (artist_id None, pas de raison négative)
+
+# magic, version, réservé, taille des métadonnées JSON, nb chaînes, nb titres, nb artistes, nb références de genres
+CACHE_HEADER = struct.Struct("<4sHHIIIII")
+# clé, artiste, raison négative, updated_at
+TRACK_RECORD = struct.Struct("<IIId")
+# clé, première référence de genre, nb genres, raison négative, updated_at
+ARTIST_RECORD = struct.Struct("<IIIId")
+GENRE_REF = struct.Struct("<I")
+
+# magic, version, réservé, nb chaînes, nb buckets, nb poids
+WEIGHTS_HEADER = struct.Struct("<4sHHIII")
+# nom du bucket, premier poids, nb poids
+BUCKET_RECORD = struct.Struct("<III")
+# genre, poids
+WEIGHT_RECORD = struct.Struct("<Id")
+
+STRING_OFFSET = struct.Struct("<I")
+
+
+def _align(size: int) -> int:
+    """Arrondit une taille au multiple de 8 supérieur."""
+    return (size + 7) & ~7
+
+
+class _StringTableBuilder:
+    """Table des chaînes en cours d'écriture (chaque chaîne n'est stockée qu'une fois)."""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._encoded: List[bytes] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self._index.get(value)
+        if index is None:
+            index = len(self._encoded)
+            self._index[value] = index
+            self._encoded.append(value.encode("utf-8"))
+        return index
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def to_bytes(self) -> bytes:
+        offsets = bytearray()
+        position = 0
+        for encoded in self._encoded:
+            offsets += STRING_OFFSET.pack(position)
+            position += len(encoded)
+        offsets += STRING_OFFSET.pack(position)
+        data = bytes(offsets) + b"".join(self._encoded)
+        return data + b"\0" * (_align(len(data)) - len(data))
+
+
+class _MappedFile:
+    """Fichier projeté en mémoire (lecture seule) et accès à sa table des chaînes."""
+
+    def __init__(self, path, magic: bytes, header: struct.Struct):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = header.unpack_from(self._mm, 0)
+        if fields[0] != magic or fields[1] != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Format binaire non reconnu : {self.path}")
+        self.header = fields
+        self.size = len(self._mm)
+
+    def _set_strings(self, offset: int, count: int):
+        self._offsets = offset
+        self._blob = offset + (count + 1) * STRING_OFFSET.size
+        return _align(self._blob + STRING_OFFSET.unpack_from(self._mm, offset + count * STRING_OFFSET.size)[0])
+
+    def raw_string(self, index: int) -> bytes:
+        start, end = struct.unpack_from("<II", self._mm, self._offsets + index * STRING_OFFSET.size)
+        return self._mm[self._blob + start:self._blob + end]
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        return self.raw_string(index).decode("utf-8")
+
+    def close(self):
+        self._mm.close()
+
+
+def write_cache_snapshot(path, meta: Dict, tables: Dict[str, Dict[str, Dict]]):
+    """
+    Écrit un instantané binaire du cache des genres (écriture atomique).
+
+    Args:
+        path: Fichier de destination
+        meta: Métadonnées (version, created_at, last_updated)
+        tables: {"tracks": {uri: entrée}, "artists": {artist_id: entrée}} au format
+            GenreCache (artist_id / genres, updated_at, negative)
+    """
+    strings = _StringTableBuilder()
+    tracks = sorted(tables.get("tracks", {}).items(), key=lambda item: item[0].encode("utf-8"))
+    artists = sorted(tables.get("artists", {}).items(), key=lambda item: item[0].encode("utf-8"))
+
+    track_records = bytearray()
+    for uri, entry in tracks:
+        track_records += TRACK_RECORD.pack(
+            strings.add(uri), strings.add(entry.get("artist_id")),
+            strings.add(entry.get("negative")), entry.get("updated_at", 0)
+        )
+    artist_records = bytearray()
+    genre_refs = bytearray()
+    ref_count = 0
+    for artist_id, entry in artists:
+        genres = entry.get("genres", [])
+        artist_records += ARTIST_RECORD.pack(
+            strings.add(artist_id), ref_count, len(genres),
+            strings.add(entry.get("negative")), entry.get("updated_at", 0)
+        )
+        for genre in genres:
+            genre_refs += GENRE_REF.pack(strings.add(genre))
+        ref_count += len(genres)
+
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    meta_bytes += b" " * (_align(CACHE_HEADER.size + len(meta_bytes)) - CACHE_HEADER.size - len(meta_bytes))
+    header = CACHE_HEADER.pack(
+        CACHE_MAGIC, FORMAT_VERSION, 0, len(meta_bytes), len(strings), len(tracks), len(artists), ref_count
+    )
+    atomic_write_bytes(path, b"".join((
+        header, meta_bytes, strings.to_bytes(), bytes(track_records), bytes(artist_records), bytes(genre_refs)
+    )))
+
+
+class CacheSnapshot(_MappedFile):
+    """Instantané binaire du cache des genres, décodé à la demande."""
+
+    def __init__(self, path):
+        super().__init__(path, CACHE_MAGIC, CACHE_HEADER)
+        _, _, _, meta_len, n_strings, self._n_tracks, self._n_artists, _ = self.header
+        meta_start = CACHE_HEADER.size
+        self.meta = json.loads(self._mm[meta_start:meta_start + meta_len])
+        self._tracks = self._set_strings(meta_start + meta_len, n_strings)
+        self._artists = self._tracks + self._n_tracks * TRACK_RECORD.size
+        self._refs = self._artists + self._n_artists * ARTIST_RECORD.size
+
+    def _table(self, table: str) -> Tuple[int, int, struct.Struct]:
+        if table == "tracks":
+            return self._tracks, self._n_tracks, TRACK_RECORD
+        return self._artists, self._n_artists, ARTIST_RECORD
+
+    def count(self, table: str) -> int:
+        return self._table(table)[1]
+
+    def _find(self, table: str, key: str) -> Optional[Tuple]:
+        """Recherche dichotomique d'un enregistrement par clé."""
+        start, count, record = self._table(table)
+        wanted = key.encode("utf-8")
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            fields = record.unpack_from(self._mm, start + middle * record.size)
+            current = self.raw_string(fields[0])
+            if current < wanted:
+                low = middle + 1
+            elif current > wanted:
+                high = middle
+            else:
+                return fields
+        return None
+
+    def _decode(self, table: str, fields: Tuple) -> Dict:
+        if table == "tracks":
+            _, artist, negative, updated_at = fields
+            entry = {"artist_id": self.string(artist), "updated_at": updated_at}
+        else:
+            _, first_ref, genre_count, negative, updated_at = fields
+            genres = [
+                self.string(GENRE_REF.unpack_from(self._mm, self._refs + (first_ref + i) * GENRE_REF.size)[0])
+                for i in range(genre_count)
+            ]
+            entry = {"genres": genres, "updated_at": updated_at}
+        if negative != NO_STRING:
+            entry["negative"] = self.string(negative)
+        return entry
+
+    def get(self, table: str, key: str) -> Optional[Dict]:
+        """Entrée d'une clé, ou None si absente de l'instantané."""
+        fields = self._find(table, key)
+        return None if fields is None else self._decode(table, fields)
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        table, key = item
+        return self._find(table, key) is not None
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict]]:
+        start, count, record = self._table(table)
+        for i in range(count):
+            fields = record.unpack_from(self._mm, start + i * record.size)
+            yield self.string(fields[0]), self._decode(table, fields)
+
+
+def write_weights_snapshot(path, weights: Dict[str, Dict[str, float]]):
+    """Écrit un instantané binaire des poids {bucket: {genre: poids}} (écriture atomique)."""
+    strings = _StringTableBuilder()
+    bucket_records = bytearray()
+    weight_records = bytearray()
+    weight_count = 0
+    for bucket_key, bucket_weights in weights.items():
+        bucket_records += BUCKET_RECORD.pack(strings.add(bucket_key), weight_count, len(bucket_weights))
+        for genre, weight in bucket_weights.items():
+            weight_records += WEIGHT_RECORD.pack(strings.add(genre), weight)
+        weight_count += len(bucket_weights)
+    header = WEIGHTS_HEADER.pack(WEIGHTS_MAGIC, FORMAT_VERSION, 0, len(strings), len(weights), weight_count)
+    header += b"\0" * (_align(len(header)) - len(header))
+    atomic_write_bytes(path, b"".join((header, strings.to_bytes(), bytes(bucket_records), bytes(weight_records))))
+
+
+class WeightsSnapshot(_MappedFile, Mapping):
+    """
+    Poids {bucket: {genre: poids}} lus depuis un instantané binaire.
+
+    Seuls les noms des buckets sont lus à l'ouverture ; les poids d'un bucket
+    sont décodés en dictionnaire (modifiable, conservé) au premier accès.
+    """
+
+    def __init__(self, path):
+        super().__init__(path, WEIGHTS_MAGIC, WEIGHTS_HEADER)
+        _, _, _, n_strings, n_buckets, _ = self.header
+        buckets_start = self._set_strings(_align(WEIGHTS_HEADER.size), n_strings)
+        self._weights_start = buckets_start + n_buckets * BUCKET_RECORD.size
+        self._buckets = {}
+        for i in range(n_buckets):
+            name, first, count = BUCKET_RECORD.unpack_from(self._mm, buckets_start + i * BUCKET_RECORD.size)
+            self._buckets[self.string(name)] = (first, count)
+        self._decoded: Dict[str, Dict[str, float]] = {}
+
+    def __getitem__(self, bucket_key: str) -> Dict[str, float]:
+        weights = self._decoded.get(bucket_key)
+        if weights is None:
+            first, count = self._buckets[bucket_key]
+            weights = {}
+            for i in range(first, first + count):
+                genre, weight = WEIGHT_RECORD.unpack_from(self._mm, self._weights_start + i * WEIGHT_RECORD.size)
+                weights[self.string(genre)] = weight
+            self._decoded[bucket_key] = weights
+        return weights
+
+    def __contains__(self, bucket_key) -> bool:
+        return bucket_key in self._buckets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._buckets)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,754 @@
+"""
+Stockage du cache des genres (backends interchangeables).
+
+`GenreCache` manipule deux tables, "tracks" et "artists", de la forme
+{clé: entrée}. Chaque backend sait lire une entrée, parcourir une table et
+appliquer un lot de modifications (upserts + suppressions) :
+
+- `SqliteBackend` (défaut) : genre_cache.db en mode WAL, une ligne par entrée,
+  seules les lignes modifiées sont écrites à chaque sauvegarde ; ouverture en
+  temps constant (aucun fichier à parser au démarrage)
+- `JournalBackend` : genre_cache.log, journal en ajout seul (une ligne JSON par
+  modification) rejoué au chargement par-dessus le dernier instantané compacté
+  (genre_cache.snapshot.json) ; compaction en arrière-plan quand le journal
+  dépasse `COMPACT_RATIO` fois la taille de l'instantané
+- `BinaryBackend` : instantané binaire genre_cache.bin (voir binary_snapshot)
+  projeté en mémoire et décodé à la demande, plus un journal des
+  modifications ; ouverture en temps constant
+- `JsonBackend` (historique) : genre_cache.json chargé en entier et réécrit à
+  chaque sauvegarde
+
+`CacheTable` présente une table comme un dictionnaire : les entrées sont lues
+à la demande et les modifications sont gardées en mémoire jusqu'au prochain
+`flush` du cache.
+
+Accès concurrents (plusieurs commandes lancées en même temps) : chaque
+sauvegarde fusionne ses modifications avec l'état sur disque au lieu de
+l'écraser (voir `_should_replace`). Les backends fichiers relisent le stockage
+sous `file_lock` s'il a changé depuis leur dernière lecture ; SQLite écrit
+dans une transaction `BEGIN IMMEDIATE`.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .binary_snapshot import CacheSnapshot, write_cache_snapshot
+from .jsonio import atomic_write_json, file_lock
+
+
+TABLES = ("tracks", "artists")
+SQL_VARIABLES_PER_QUERY = 500  # Nombre de clés par requête `IN (...)`
+COMPACT_RATIO = 1.0  # Compaction quand le journal dépasse cette fraction de l'instantané
+COMPACT_MIN_BYTES = 256 * 1024  # Pas de compaction en dessous de cette taille de journal
+BINARY_COMPACT_RATIO = 0.1  # Backend binaire : journal rejoué à chaque ouverture, gardé court
+SQLITE_BUSY_TIMEOUT = 30  # Attente maximale du verrou d'écriture SQLite (secondes)
+
+
+def _should_replace(current: Optional[Dict], entry: Dict) -> bool:
+    """
+    Règle de fusion avec l'entrée déjà stockée (écrite par un autre processus).
+
+    L'entrée la plus récente (`updated_at`) l'emporte, sauf qu'un échec
+    temporaire ("negative": "error") n'écrase jamais une entrée valide.
+    """
+    if current is None:
+        return True
+    if entry.get("negative") == "error" and not current.get("negative"):
+        return False
+    return entry.get("updated_at", 0) >= current.get("updated_at", 0)
+
+
+def _read_log(log_path: Path, truncate: bool = False) -> Iterator[Dict]:
+    """
+    Lit les lignes d'un journal ({"t", "k", "v"}, {"t", "k", "del"} ou {"meta"}).
+
+    Une ligne incomplète en fin de fichier (arrêt brutal) est ignorée, et
+    retirée du fichier si `truncate` pour que les ajouts suivants restent lisibles.
+    """
+    with open(log_path, "rb") as f:
+        content = f.read()
+    complete = content.rfind(b"\n") + 1
+    if complete < len(content) and truncate:
+        with open(log_path, "r+b") as f:
+            f.truncate(complete)
+    skipped = 0
+    for line in content[:complete].splitlines():
+        try:
+            yield json.loads(line)
+        except ValueError:
+            skipped += 1
+    if skipped:
+        print(f"[!] {skipped} ligne(s) illisible(s) ignoree(s) dans {log_path.name}")
+
+
+def _log_payload(lines: List[Dict]) -> str:
+    """Sérialise des lignes de journal (une ligne JSON compacte par enregistrement)."""
+    return "".join(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n" for line in lines)
+
+
+class CacheBackend:
+    """Interface commune des backends de stockage du cache."""
+
+    name = ""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load_meta(self) -> Optional[Dict]:
+        """Retourne les métadonnées (version, created_at, last_updated), ou None si le stockage est vide."""
+        raise NotImplementedError
+
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        """Retourne les entrées existantes parmi `keys`."""
+        raise NotImplementedError
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict]]:
+        """Parcourt toutes les entrées d'une table."""
+        raise NotImplementedError
+
+    def count(self, table: str) -> int:
+        """Nombre d'entrées d'une table."""
+        raise NotImplementedError
+
+    def write(self, meta: Dict, upserts: Dict[str, Dict[str, Dict]], deletes: Dict[str, Set[str]]) -> int:
+        """
+        Applique un lot de modifications {table: {clé: entrée}} / {table: {clés}}.
+
+        Retourne le nombre d'octets écrits (données sérialisées pour SQLite).
+        """
+        raise NotImplementedError
+
+    def reset(self, meta: Dict):
+        """Vide le stockage et enregistre de nouvelles métadonnées."""
+        raise NotImplementedError
+
+    def files(self) -> List[Path]:
+        """Fichiers occupés par le stockage."""
+        return [self.path]
+
+    def size_bytes(self) -> int:
+        """Taille totale sur disque du stockage (octets)."""
+        return sum(p.stat().st_size for p in self.files() if p.exists())
+
+    def _disk_state(self) -> Tuple:
+        """Signature (taille, date de modification) des fichiers, pour détecter les écritures d'autres processus."""
+        state = []
+        for p in self.files():
+            try:
+                st = p.stat()
+                state.append((st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def compact(self):
+        """Récupère la place laissée par les entrées supprimées."""
+
+    def close(self):
+        """Libère les ressources du backend."""
+
+
+class JsonBackend(CacheBackend):
+    """Fichier JSON unique, chargé en entier et réécrit à chaque sauvegarde."""
+
+    name = "json"
+
+    def __init__(self, path):
+        super().__init__(path)
+        with file_lock(self.path):
+            self.data = self._read()
+            self._seen = self._disk_state()
+
+    def _sync(self) -> bool:
+        """Relit le stockage s'il a été modifié par un autre processus (à appeler sous `file_lock`)."""
+        if self._disk_state() == self._seen:
+            return False
+        self.data = self._read()
+        self._seen = self._disk_state()
+        return True
+
+    def _apply(self, meta: Dict, upserts: Dict[str, Dict[str, Dict]], deletes: Dict[str, Set[str]]) -> List[Dict]:
+        """Applique les modifications à `self.data` et retourne les lignes de journal correspondantes."""
+        if self.data is None:
+            self.data = {table: {} for table in TABLES}
+        lines = []
+        for table in TABLES:
+            rows = self.data.setdefault(table, {})
+            for key in deletes.get(table, ()):
+                rows.pop(key, None)
+                lines.append({"t": table, "k": key, "del": 1})
+            for key, entry in upserts.get(table, {}).items():
+                if _should_replace(rows.get(key), entry):
+                    rows[key] = entry
+                    lines.append({"t": table, "k": key, "v": entry})
+        self.data.update(meta)
+        lines.append({"meta": meta})
+        return lines
+
+    def _read(self) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        return self._read_file(self.path)
+
+    def _read_file(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[!] Erreur lors du chargement du cache: {e}")
+            return None
+
+    def load_meta(self) -> Optional[Dict]:
+        if self.data is None:
+            return None
+        return {key: value for key, value in self.data.items() if key not in TABLES}
+
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        rows = (self.data or {}).get(table, {})
+        return {key: rows[key] for key in keys if key in rows}
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict]]:
+        return iter(list((self.data or {}).get(table, {}).items()))
+
+    def count(self, table: str) -> int:
+        return len((self.data or {}).get(table, {}))
+
+    def write(self, meta: Dict, upserts: Dict[str, Dict[str, Dict]], deletes: Dict[str, Set[str]]) -> int:
+        with file_lock(self.path):
+            self._sync()
+            self._apply(meta, upserts, deletes)
+            atomic_write_json(self.path, self.data, indent=2)
+            self._seen = self._disk_state()
+        return self.path.stat().st_size
+
+    def reset(self, meta: Dict):
+        with file_lock(self.path):
+            self.data = {table: {} for table in TABLES}
+            self.data.update(meta)
+            atomic_write_json(self.path, self.data, indent=2)
+            self._seen = self._disk_state()
+
+
+class JournalBackend(JsonBackend):
+    """
+    Journal en ajout seul rejoué par-dessus un instantané compacté.
+
+    Chaque sauvegarde ajoute une ligne par entrée modifiée ({"t", "k", "v"}
+    ou {"t", "k", "del"}) puis une ligne {"meta"} : son coût ne dépend que du
+    nombre de modifications. Une ligne tronquée par un arrêt brutal est
+    ignorée au rechargement.
+
+    Compaction : sous verrou, le journal est renommé en .old et l'état
+    courant copié ; un thread écrit ensuite l'instantané (fichier temporaire
+    + `os.replace`) puis supprime le .old. Le chargement rejoue
+    instantané + .old + journal, ce qui reste exact quelle que soit l'étape
+    à laquelle la compaction a été interrompue.
+
+    Entre processus, ajouts et compactions se font sous `file_lock` ; un
+    processus dont le .old a été repris par un autre (compaction terminée
+    ailleurs) abandonne la sienne.
+    """
+
+    name = "journal"
+
+    def __init__(self, path):
+        self.snapshot_path = Path(path).with_suffix(".snapshot.json")
+        self.old_log_path = Path(str(path) + ".old")
+        self._lock = threading.Lock()
+        self._compaction = None
+        self._log = None
+        self._old_log_state = None
+        super().__init__(path)
+        if self.old_log_path.exists():
+            # Compaction précédente interrompue : la terminer avant d'écrire à nouveau
+            self._compact(wait=True)
+
+    def _read(self) -> Optional[Dict]:
+        data = None
+        if self.snapshot_path.exists():
+            data = self._read_file(self.snapshot_path)
+        for log_path in (self.old_log_path, self.path):
+            if log_path.exists():
+                data = self._replay(log_path, data)
+        return data
+
+    def _replay(self, log_path: Path, data: Optional[Dict]) -> Optional[Dict]:
+        """Applique les lignes d'un journal à `data` (une ligne incomplète en fin de fichier est ignorée)."""
+        for record in _read_log(log_path, truncate=(log_path == self.path)):
+            if data is None:
+                data = {table: {} for table in TABLES}
+            if "meta" in record:
+                data.update(record["meta"])
+            elif record.get("del"):
+                data.setdefault(record["t"], {}).pop(record["k"], None)
+            else:
+                data.setdefault(record["t"], {})[record["k"]] = record["v"]
+        return data
+
+    def _sync(self) -> bool:
+        with self._lock:
+            if self._disk_state() == self._seen:
+                return False
+            # Journal remplacé par un autre processus : ne plus écrire dans l'ancien fichier
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+        return super()._sync()
+
+    def write(self, meta: Dict, upserts: Dict[str, Dict[str, Dict]], deletes: Dict[str, Set[str]]) -> int:
+        with file_lock(self.path):
+            self._sync()
+            lines = self._apply(meta, upserts, deletes)
+            payload = _log_payload(lines).encode("utf-8")
+            with self._lock:
+                if self._log is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._log = open(self.path, "ab")
+                self._log.write(payload)
+                self._log.flush()
+                log_size = self._log.tell()
+            self._seen = self._disk_state()
+        snapshot_size = self.snapshot_path.stat().st_size if self.snapshot_path.exists() else 0
+        if log_size > max(COMPACT_MIN_BYTES, COMPACT_RATIO * snapshot_size):
+            self._compact()
+        return len(payload)
+
+    def _file_state(self, path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size
+
+    def _compact(self, wait: bool = False):
+        """Remplace instantané + journal par un nouvel instantané (en arrière-plan sauf si `wait`)."""
+        with file_lock(self.path):
+            self._sync()
+            with self._lock:
+                if self._compaction is not None and self._compaction.is_alive():
+                    return
+                if self._log is not None:
+                    self._log.close()
+                    self._log = None
+                if self.path.exists():
+                    if self.old_log_path.exists():
+                        # .old déjà présent (compaction interrompue) : y ajouter le journal courant
+                        with open(self.old_log_path, "ab") as old, open(self.path, "rb") as log:
+                            old.write(log.read())
+                        os.remove(self.path)
+                    else:
+                        os.replace(self.path, self.old_log_path)
+                old_log_state = self._file_state(self.old_log_path)
+                # Les entrées sont remplacées, jamais modifiées : une copie des tables suffit
+                state = {key: (dict(value) if key in TABLES else value) for key, value in (self.data or {}).items()}
+            self._seen = self._disk_state()
+
+        def run():
+            try:
+                with file_lock(self.path):
+                    if self._file_state(self.old_log_path) != old_log_state:
+                        # Compaction déjà terminée (ou reprise) par un autre processus
+                        return
+                    unchanged = self._disk_state() == self._seen
+                    atomic_write_json(self.snapshot_path, state, separators=(",", ":"))
+                    os.remove(self.old_log_path)
+                    if unchanged:
+                        # Instantané écrit par ce processus : ne pas le relire à la prochaine écriture
+                        self._seen = self._disk_state()
+            except Exception as e:
+                print(f"[!] Erreur lors de la compaction du cache: {e}")
+
+        if wait:
+            run()
+            return
+        self._compaction = threading.Thread(target=run, name="genre-cache-compaction")
+        self._compaction.start()
+
+    def _wait_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def files(self) -> List[Path]:
+        return [self.snapshot_path, self.old_log_path, self.path]
+
+    def compact(self):
+        self._wait_compaction()
+        self._compact(wait=True)
+
+    def reset(self, meta: Dict):
+        self._wait_compaction()
+        with file_lock(self.path):
+            with self._lock:
+                if self._log is not None:
+                    self._log.close()
+                    self._log = None
+                for p in (self.path, self.old_log_path):
+                    if p.exists():
+                        os.remove(p)
+            self.data = {table: {} for table in TABLES}
+            self.data.update(meta)
+            atomic_write_json(self.snapshot_path, self.data, separators=(",", ":"))
+            self._seen = self._disk_state()
+
+    def close(self):
+        self._wait_compaction()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+class SqliteBackend(CacheBackend):
+    """
+    Base SQLite (mode WAL) : une ligne par titre / artiste.
+
+    Les entrées sont stockées en JSON dans la colonne `data` ; la clé primaire
+    sert aux recherches par URI / ID d'artiste et `tracks.artist_id` est
+    indexée pour retrouver les titres d'un artiste.
+    """
+
+    name = "sqlite"
+
+    _KEYS = {"tracks": "uri", "artists": "id"}
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Le cache n'est modifié que par un seul thread (voir GenreCache._analyze)
+        self.conn = sqlite3.connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracks (uri TEXT PRIMARY KEY, artist_id TEXT, data TEXT NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS tracks_artist_id ON tracks (artist_id)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS artists (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def load_meta(self) -> Optional[Dict]:
+        rows = self.conn.execute("SELECT key, value FROM meta").fetchall()
+        if not rows:
+            return None
+        return {key: json.loads(value) for key, value in rows}
+
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        key_column = self._KEYS[table]
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), SQL_VARIABLES_PER_QUERY):
+            chunk = keys[start:start + SQL_VARIABLES_PER_QUERY]
+            placeholders = ",".join("?" * len(chunk))
+            query = f"SELECT {key_column}, data FROM {table} WHERE {key_column} IN ({placeholders})"
+            for key, data in self.conn.execute(query, chunk):
+                found[key] = json.loads(data)
+        return found
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict]]:
+        query = f"SELECT {self._KEYS[table]}, data FROM {table}"
+        for key, data in self.conn.execute(query).fetchall():
+            yield key, json.loads(data)
+
+    def count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def write(self, meta: Dict, upserts: Dict[str, Dict[str, Dict]], deletes: Dict[str, Set[str]]) -> int:
+        with self.conn:
+            # Verrou d'écriture pris dès la lecture des entrées stockées (fusion sans course)
+            self.conn.execute("BEGIN IMMEDIATE")
+            upserts = {table: self._newer_only(table, upserts.get(table, {})) for table in TABLES}
+            meta_rows = [(key, json.dumps(value)) for key, value in meta.items()]
+            track_rows = [
+                (uri, entry.get("artist_id"), json.dumps(entry, ensure_ascii=False))
+                for uri, entry in upserts["tracks"].items()
+            ]
+            artist_rows = [
+                (artist_id, json.dumps(entry, ensure_ascii=False))
+                for artist_id, entry in upserts["artists"].items()
+            ]
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta_rows)
+            for table in TABLES:
+                key_column = self._KEYS[table]
+                removed = deletes.get(table)
+                if removed:
+                    self.conn.executemany(
+                        f"DELETE FROM {table} WHERE {key_column} = ?", [(key,) for key in removed]
+                    )
+            self.conn.executemany("INSERT OR REPLACE INTO tracks (uri, artist_id, data) VALUES (?, ?, ?)", track_rows)
+            self.conn.executemany("INSERT OR REPLACE INTO artists (id, data) VALUES (?, ?)", artist_rows)
+        return sum(len(row[-1].encode("utf-8")) for rows in (meta_rows, track_rows, artist_rows) for row in rows)
+
+    def _newer_only(self, table: str, rows: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Retire de `rows` les entrées moins récentes que celles déjà stockées."""
+        if not rows:
+            return rows
+        stored = self.get_many(table, rows)
+        return {key: entry for key, entry in rows.items() if _should_replace(stored.get(key), entry)}
+
+    def reset(self, meta: Dict):
+        with self.conn:
+            self.conn.execute("DELETE FROM meta")
+            for table in TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+        self.write(meta, {}, {})
+
+    def files(self) -> List[Path]:
+        return [self.path, Path(str(self.path) + "-wal"), Path(str(self.path) + "-shm")]
+
+    def compact(self):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+
+    def close(self):
+        self.conn.close()
+
+
+class BinaryBackend(CacheBackend):
+    """
+    Instantané binaire projeté en mémoire + journal des modifications.
+
+    Une entrée de l'instantané n'est décodée que lorsqu'elle est demandée
+    (recherche dichotomique) : l'ouverture ne dépend pas de la taille du
+    cache. Les sauvegardes ajoutent leurs modifications à <fichier>.log
+    (même format que `JournalBackend`), rejoué en mémoire à l'ouverture ;
+    quand il dépasse `BINARY_COMPACT_RATIO` fois la taille de l'instantané,
+    un nouvel instantané est écrit puis le journal supprimé (sous `file_lock`).
+    """
+
+    name = "binary"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.log_path = Path(str(path) + ".log")
+        self._snapshot = None
+        with file_lock(self.path):
+            self._open()
+
+    def files(self) -> List[Path]:
+        return [self.path, self.log_path]
+
+    def _open(self):
+        """(Ré)ouvre l'instantané et rejoue le journal (sous `file_lock`)."""
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = CacheSnapshot(self.path) if self.path.exists() else None
+        self._meta = dict(self._snapshot.meta) if self._snapshot is not None else None
+        # {table: {clé: entrée, ou None si supprimée}} : modifications postérieures à l'instantané
+        self._overlay = {table: {} for table in TABLES}
+        if self.log_path.exists():
+            for record in _read_log(self.log_path, truncate=True):
+                if "meta" in record:
+                    self._meta = {**(self._meta or {}), **record["meta"]}
+                else:
+                    self._overlay[record["t"]][record["k"]] = None if record.get("del") else record["v"]
+        self._seen = self._disk_state()
+
+    def _sync(self):
+        """Rouvre le stockage s'il a été modifié par un autre processus (sous `file_lock`)."""
+        if self._disk_state() != self._seen:
+            self._open()
+
+    def _get(self, table: str, key: str) -> Optional[Dict]:
+        overlay = self._overlay[table]
+        if key in overlay:
+            return overlay[key]
+        return self._snapshot.get(table, key) if self._snapshot is not None else None
+
+    def load_meta(self) -> Optional[Dict]:
+        return dict(self._meta) if self._meta is not None else None
+
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, Dict]:
+        found = {}
+        for key in keys:
+            entry = self._get(table, key)
+            if entry is not None:
+                found[key] = entry
+        return found
+
+    def items(self, table: str) -> Iterator[Tuple[str, Dict]]:
+        overlay = self._overlay[table]
+        if self._snapshot is not None:
+            for key, entry in self._snapshot.items(table):
+                if key not in overlay:
+                    yield key, entry
+        for key, entry in list(overlay.items()):
+            if entry is not None:
+                yield key, entry
+
+    def count(self, table: str) -> int:
+        total = self._snapshot.count(table) if self._snapshot is not None else 0
+        for key, entry in self._overlay[table].items():
+            stored = self._snapshot is not None and (table, key) in self._snapshot
+            total += (entry is not None) - stored
+        return total
+
+    def write(self, meta: Dict, upserts: Dict[str, Dict[str, Dict]], deletes: Dict[str, Set[str]]) -> int:
+        with file_lock(self.path):
+            self._sync()
+            lines = []
+            for table in TABLES:
+                overlay = self._overlay[table]
+                for key in deletes.get(table, ()):
+                    overlay[key] = None
+                    lines.append({"t": table, "k": key, "del": 1})
+                for key, entry in upserts.get(table, {}).items():
+                    if _should_replace(self._get(table, key), entry):
+                        overlay[key] = entry
+                        lines.append({"t": table, "k": key, "v": entry})
+            self._meta = {**(self._meta or {}), **meta}
+            lines.append({"meta": meta})
+            payload = _log_payload(lines).encode("utf-8")
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "ab") as f:
+                f.write(payload)
+            written = len(payload)
+            snapshot_size = self._snapshot.size if self._snapshot is not None else 0
+            if self.log_path.stat().st_size > max(COMPACT_MIN_BYTES, BINARY_COMPACT_RATIO * snapshot_size):
+                self._compact_locked()
+                written += self._snapshot.size
+            else:
+                self._seen = self._disk_state()
+        return written
+
+    def _compact_locked(self):
+        """Écrit un nouvel instantané intégrant le journal, puis supprime le journal (sous `file_lock`)."""
+        tables = {table: dict(self.items(table)) for table in TABLES}
+        write_cache_snapshot(self.path, self._meta or {}, tables)
+        if self.log_path.exists():
+            os.remove(self.log_path)
+        self._open()
+
+    def compact(self):
+        with file_lock(self.path):
+            self._sync()
+            self._compact_locked()
+
+    def reset(self, meta: Dict):
+        with file_lock(self.path):
+            write_cache_snapshot(self.path, meta, {})
+            if self.log_path.exists():
+                os.remove(self.log_path)
+            self._open()
+
+    def close(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+
+BACKENDS = {
+    SqliteBackend.name: SqliteBackend,
+    JournalBackend.name: JournalBackend,
+    BinaryBackend.name: BinaryBackend,
+    JsonBackend.name: JsonBackend,
+}
+DEFAULT_BACKEND = SqliteBackend.name
+
+
+class CacheTable(MutableMapping):
+    """
+    Table du cache vue comme un dictionnaire, chargée à la demande.
+
+    Les entrées lues sont conservées en mémoire ; les entrées ajoutées,
+    remplacées ou supprimées sont suivies jusqu'au prochain `flush`, qui ne
+    renvoie au backend que ces modifications.
+    """
+
+    def __init__(self, backend: CacheBackend, table: str):
+        self.backend = backend
+        self.table = table
+        self._rows = {}
+        self._missing = set()
+        self._dirty = set()
+        self._deleted = set()
+
+    def load(self, keys: Iterable[str]):
+        """Précharge en une fois les entrées de `keys` qui ne sont pas encore en mémoire."""
+        wanted = [
+            key for key in dict.fromkeys(keys)
+            if key and key not in self._rows and key not in self._missing and key not in self._deleted
+        ]
+        if not wanted:
+            return
+        found = self.backend.get_many(self.table, wanted)
+        self._rows.update(found)
+        self._missing.update(key for key in wanted if key not in found)
+
+    def __getitem__(self, key: str) -> Dict:
+        self.load((key,))
+        if key not in self._rows:
+            raise KeyError(key)
+        return self._rows[key]
+
+    def __contains__(self, key) -> bool:
+        self.load((key,))
+        return key in self._rows
+
+    def __setitem__(self, key: str, entry: Dict):
+        self._rows[key] = entry
+        self._missing.discard(key)
+        self._deleted.discard(key)
+        self._dirty.add(key)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        del self._rows[key]
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """Parcourt toutes les entrées (stockage + modifications en attente)."""
+        for key, entry in self.backend.items(self.table):
+            if key in self._deleted or key in self._dirty:
+                continue
+            yield key, self._rows.get(key, entry)
+        for key in list(self._dirty):
+            yield key, self._rows[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self.items():
+            yield key
+
+    def __len__(self) -> int:
+        pending = self._dirty | self._deleted
+        stored = set(self.backend.get_many(self.table, pending)) if pending else set()
+        added = len(self._dirty - stored)
+        removed = len(self._deleted & stored)
+        return self.backend.count(self.table) + added - removed
+
+    def has_changes(self) -> bool:
+        """Indique si des modifications attendent d'être écrites."""
+        return bool(self._dirty or self._deleted)
+
+    def pending_changes(self) -> Tuple[Dict[str, Dict], Set[str]]:
+        """Retourne les modifications en attente : ({clé: entrée}, {clés supprimées})."""
+        return {key: self._rows[key] for key in self._dirty}, set(self._deleted)
+
+    def mark_clean(self):
+        """
+        Oublie les modifications en attente (après leur écriture par le backend).
+
+        Les clés notées absentes sont aussi oubliées : une entrée ajoutée
+        entre-temps par un autre processus sera lue au prochain accès.
+        """
+        self._dirty.clear()
+        self._deleted.clear()
+        self._missing.clear()
+
+
+def open_backend(name: str, path) -> CacheBackend:
+    """Instancie le backend `name` sur le fichier `path`."""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de cache inconnu : {name} (choix : {', '.join(BACKENDS)})")
+    return BACKENDS[name](path)
+
+
+def backend_names() -> List[str]:
+    """Noms des backends disponibles."""
+    return list(BACKENDS)
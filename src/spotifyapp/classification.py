@@ -0,0 +1,131 @@
+"""
+Classement des titres dans les playlists (auto) par classe et par bucket.
+
+Moteur unique utilisé par la création complète (music_genre) et la mise à
+jour incrémentale (update_playlists) : chaque genre de la taxonomie est
+associé une fois pour toutes aux classes et aux buckets qui le contiennent
+(index inverse de `Taxonomy`), puis les genres de chaque titre ne sont
+parcourus qu'une seule fois pour toutes les playlists.
+
+Le résultat est mémorisé par tuple d'IDs de genres : les titres d'un même
+artiste (même tuple) ne sont classés qu'une fois.
+"""
+from typing import Dict, FrozenSet, Iterable, Set, Tuple
+
+from .genre_table import genre_name
+from .taxonomy import Taxonomy, get_taxonomy
+
+
+# Moteur construit pour la taxonomie courante
+_classifier = None
+
+_NO_TARGETS = (frozenset(), frozenset())
+
+
+class Classification:
+    """
+    Titres de chaque playlist (auto).
+
+    Attributs :
+        class_tracks: {class_label: set des URIs}
+        bucket_tracks: {bucket_key: set des URIs}
+    """
+
+    def __init__(self):
+        self.class_tracks: Dict[str, Set[str]] = {}
+        self.bucket_tracks: Dict[str, Set[str]] = {}
+
+    def tracks_for_class(self, class_label: str) -> Set[str]:
+        return self.class_tracks.get(class_label, set())
+
+    def tracks_for_bucket(self, bucket_key: str) -> Set[str]:
+        return self.bucket_tracks.get(bucket_key, set())
+
+
+class PlaylistClassifier:
+    """Classe les titres d'après leurs IDs de genres (voir genre_table)."""
+
+    def __init__(self, taxonomy: Taxonomy):
+        self.taxonomy = taxonomy
+        # Seuls les buckets nommés donnent une playlist
+        playlist_buckets = set(taxonomy.bucket_labels)
+        # {genre: (classes, buckets)} ; les genres de la taxonomie sont comparés aux noms en minuscules des titres
+        self._targets: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {
+            genre: (
+                taxonomy.classes_by_genre[genre],
+                taxonomy.buckets_by_genre.get(genre, frozenset()) & playlist_buckets
+            )
+            for genre in taxonomy.all_genres
+        }
+        self._by_genre_id: Dict[int, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self._by_track_genres: Dict[Tuple[int, ...], Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+
+    def _genre_targets(self, genre_id: int) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        targets = self._by_genre_id.get(genre_id)
+        if targets is None:
+            targets = self._targets.get(genre_name(genre_id), _NO_TARGETS)
+            self._by_genre_id[genre_id] = targets
+        return targets
+
+    def targets(self, track_genres: Iterable[int]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        Classes et buckets d'un titre.
+
+        Args:
+            track_genres: IDs des genres du titre
+
+        Returns:
+            Tuple (class_labels, bucket_keys)
+        """
+        key = tuple(track_genres)
+        found = self._by_track_genres.get(key)
+        if found is None:
+            classes = set()
+            buckets = set()
+            for genre_id in key:
+                genre_classes, genre_buckets = self._genre_targets(genre_id)
+                classes.update(genre_classes)
+                buckets.update(genre_buckets)
+            found = (frozenset(classes), frozenset(buckets))
+            self._by_track_genres[key] = found
+        return found
+
+    def classify(self, track_genres_dict: Dict[str, Tuple[int, ...]]) -> Classification:
+        """
+        Répartit les titres dans les playlists par classe et par bucket.
+
+        Args:
+            track_genres_dict: Dictionnaire {track_uri: (IDs de genres)}
+
+        Returns:
+            `Classification` (un titre peut appartenir à plusieurs playlists)
+        """
+        # Regrouper les titres par tuple de genres (un groupe par artiste, en pratique)
+        groups: Dict[Tuple[int, ...], list] = {}
+        for track_uri, track_genres in track_genres_dict.items():
+            groups.setdefault(tuple(track_genres), []).append(track_uri)
+
+        result = Classification()
+        class_tracks = result.class_tracks
+        bucket_tracks = result.bucket_tracks
+        for track_genres, track_uris in groups.items():
+            classes, buckets = self.targets(track_genres)
+            for class_label in classes:
+                class_tracks.setdefault(class_label, set()).update(track_uris)
+            for bucket_key in buckets:
+                bucket_tracks.setdefault(bucket_key, set()).update(track_uris)
+        return result
+
+
+def get_classifier() -> PlaylistClassifier:
+    """Moteur de classement de la taxonomie courante (reconstruit si elle a changé)."""
+    global _classifier
+    taxonomy = get_taxonomy()
+    if _classifier is None or _classifier.taxonomy is not taxonomy:
+        _classifier = PlaylistClassifier(taxonomy)
+    return _classifier
+
+
+def classify_tracks(track_genres_dict: Dict[str, Tuple[int, ...]]) -> Classification:
+    """Raccourci : `get_classifier().classify(track_genres_dict)`."""
+    return get_classifier().classify(track_genres_dict)
@@ -2,6 +2,7 @@ import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 
 from .paths import path_id_client
+from .rate_limiter import RateLimitedSpotify, build_session
 
 
 # --- Fonction pour lire le fichier de config ---
@@ -32,9 +33,15 @@ print("Client ID:", CLIENT_ID)
 print("Redirect URI:", REDIRECT_URI)
 
 # --- Authentification ---
-sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET,
-    redirect_uri=REDIRECT_URI,
-    scope="user-library-read playlist-read-private playlist-modify-public playlist-modify-private"
+# Les 429 ne sont pas retentés par spotipy/urllib3 (voir build_session) :
+# RateLimitedSpotify s'en charge (Retry-After, backoff) et applique un débit
+# partagé à tous les modules. Les 5xx restent retentés au niveau transport.
+sp = RateLimitedSpotify(spotipy.Spotify(
+    auth_manager=SpotifyOAuth(
+        client_id=CLIENT_ID,
+        client_secret=CLIENT_SECRET,
+        redirect_uri=REDIRECT_URI,
+        scope="user-library-read user-follow-read playlist-read-private playlist-modify-public playlist-modify-private"
+    ),
+    requests_session=build_session(),
 ))
@@ -1,6 +1,5 @@
 # delete_oct2025_playlists.py
 import sys
-import time
 from datetime import datetime, timezone
 from typing import List, Dict
 
@@ -9,6 +8,9 @@ try:
 except ImportError:
     raise RuntimeError("Import de `credentials` impossible. Assure-toi que credentials.py est présent.")
 
+from .playlist_membership import get_membership
+from .playlist_catalog import get_user_playlists, invalidate_catalog
+
 OCT_START = datetime(2025, 10, 1, tzinfo=timezone.utc)
 NOV_START = datetime(2025, 11, 1, tzinfo=timezone.utc)
 
@@ -17,13 +19,8 @@ def is_oct_2025(dt: datetime) -> bool:
 
 def get_all_user_playlists() -> List[Dict]:
     print("[*] Recuperation des playlists...")
-    playlists = []
-    results = sp.current_user_playlists(limit=50)
-    while results:
-        playlists.extend(results["items"])
-        print(f"  -> {len(playlists)} playlists chargees...")
-        results = sp.next(results) if results.get("next") else None
-        time.sleep(0.1)  # anti rate-limit
+    playlists = get_user_playlists()
+    print(f"  -> {len(playlists)} playlists chargees...")
     return playlists
 
 def earliest_track_date(playlist_id: str) -> datetime | None:
@@ -44,7 +41,6 @@ def earliest_track_date(playlist_id: str) -> datetime | None:
                 except Exception:
                     pass
         results = sp.next(results) if results.get("next") else None
-        time.sleep(0.1)
     return earliest
 
 def delete_playlists(confirm=False, auto_mode=False):
@@ -119,10 +115,13 @@ def delete_playlists(confirm=False, auto_mode=False):
         return
 
     print("\n[*] Suppression (unfollow) en cours...")
+    membership = get_membership()
     for pid, name, dt in candidates:
         sp.current_user_unfollow_playlist(pid)
+        membership.forget(pid)
         print(f"  [+] Supprimee de ton compte : {name}")
-        time.sleep(0.15)
+    membership.save()
+    invalidate_catalog()
 
     print("\n[+] Termine.")
 
@@ -1,15 +1,11 @@
 from .credentials import sp
+from .playlist_catalog import get_user_playlists
 import re
 
 def find_all_playlists():
     print("[*] Recherche de toutes les playlists (y compris celles avec 'auto')...\n")
     
-    playlists = []
-    results = sp.current_user_playlists(limit=50)
-    
-    while results:
-        playlists.extend(results["items"])
-        results = sp.next(results) if results.get("next") else None
+    playlists = get_user_playlists()
     
     me = sp.current_user()
     user_id = me["id"]
@@ -3,68 +3,337 @@ Module de cache pour les genres musicaux.
 
 Ce module permet de sauvegarder et charger les genres des titres depuis un fichier
 pour éviter de refaire les appels API Spotify à chaque exécution.
+
+Le stockage est délégué à un backend (voir cache_backends) : SQLite par défaut,
+journal en ajout seul, instantané binaire projeté en mémoire, ou JSON pour
+l'ancien format genre_cache.json.
+
+Les entrées d'artistes expirent après `max_age` secondes : une entrée périmée
+est servie immédiatement et re-téléchargée en arrière-plan (voir StaleRefresh).
+
+Les titres et artistes introuvables sont aussi mis en cache (entrées
+négatives, champ "negative" = code de raison) avec une durée de validité plus
+courte (`NEGATIVE_MAX_AGE`) : les exécutions suivantes ne redemandent pas à
+l'API les mêmes éléments non résolus.
+
+Chaque instance compte ses succès / échecs de cache, ses lectures d'entrées
+périmées et ses sauvegardes (voir metrics) ; l'instance globale les
+enregistre avec les compteurs de l'API dans cache_metrics.json à la fin de
+l'exécution.
+
+Export portable (`export_bundle` / `import_bundle`) : les genres des artistes
+sont écrits dans un fichier JSON compressé (gzip) et versionné, fusionné à
+l'import selon `updated_at` ; une nouvelle machine démarre ainsi avec le
+cache rempli, sans appel API.
+
+Format (version 2) : les titres pointent vers leur artiste principal, seuls
+les artistes portent leurs genres (en minuscules). En mémoire, les genres
+d'un artiste sont convertis une fois en tuple d'IDs (voir genre_table),
+partagé par tous ses titres.
 """
+import atexit
+import gzip
 import json
+import queue
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from .credentials import sp
-from .paths import path_genre_cache
+from .cache_backends import (
+    BinaryBackend, CacheTable, JournalBackend, JsonBackend, DEFAULT_BACKEND, TABLES, open_backend
+)
+from .genre_table import genre_ids, genre_names
+from .metrics import CacheMetrics, build_run_record, save_run_metrics
+from .jsonio import atomic_write_bytes
+from .paths import path_genre_cache, path_genre_cache_bin, path_genre_cache_db, path_genre_cache_journal
+
 
+CACHE_VERSION = 2  # Version du format de cache (pour migrations futures)
+BATCH_SIZE = 50  # Nombre max d'IDs acceptés par les endpoints /tracks et /artists
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # Durée de validité d'une entrée d'artiste (secondes)
+REFRESH_LIMIT = 1000  # Nombre max d'artistes périmés rafraîchis par exécution
+REFRESH_WORKERS = 2  # Nombre de lots rafraîchis simultanément en arrière-plan
 
-CACHE_VERSION = 1  # Version du format de cache (pour migrations futures)
+# Export portable du cache (voir GenreCache.export_bundle)
+BUNDLE_FORMAT = "spotifyapp-genre-bundle"
+BUNDLE_VERSION = 1
+
+# Codes de raison des entrées négatives
+NOT_FOUND = "not_found"  # Titre ou artiste inconnu de l'API (supprimé, indisponible dans la région, ID invalide)
+NO_ARTISTS = "no_artists"  # Titre sans artiste
+ERROR = "error"  # Échec de la requête
+
+# Durée de validité des entrées négatives selon leur raison (secondes)
+NEGATIVE_MAX_AGE = {
+    NOT_FOUND: 7 * 24 * 3600,
+    NO_ARTISTS: 7 * 24 * 3600,
+    ERROR: 6 * 3600,
+}
+
+
+class StaleRefresh:
+    """
+    Rafraîchissement en arrière-plan des artistes périmés.
+    
+    Les IDs sont regroupés par lots de `BATCH_SIZE` et récupérés via
+    `sp.artists` par un petit pool de threads (sous le limiteur de débit
+    partagé). Les résultats sont placés dans une file : seul le thread
+    propriétaire du cache les fusionne (voir GenreCache._merge_refreshed).
+    """
+    
+    def __init__(self, limit: int = REFRESH_LIMIT, workers: int = REFRESH_WORKERS):
+        self.limit = limit
+        self.workers = workers
+        self.results = queue.Queue()
+        self._scheduled = set()
+        self._pending = []
+        self._executor = None
+    
+    def schedule(self, artist_id: str):
+        """Programme le rafraîchissement d'un artiste (ignoré au-delà de `limit` par exécution)."""
+        if artist_id in self._scheduled or len(self._scheduled) >= self.limit:
+            return
+        self._scheduled.add(artist_id)
+        self._pending.append(artist_id)
+        if len(self._pending) >= BATCH_SIZE:
+            self.submit()
+    
+    def submit(self):
+        """Envoie au pool les IDs en attente (lot éventuellement incomplet)."""
+        if not self._pending:
+            return
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="genre-refresh")
+            for batch in _chunks(self._pending):
+                self._executor.submit(self._fetch, batch)
+        except RuntimeError:
+            # Interpréteur en cours d'arrêt (atexit) : ces artistes seront rafraîchis à la prochaine exécution
+            pass
+        self._pending = []
+    
+    def _fetch(self, batch: List[str]):
+        try:
+            self.results.put((batch, sp.artists(batch), None))
+        except Exception as e:
+            self.results.put((batch, None, e))
+    
+    def finish(self):
+        """Envoie les derniers IDs et attend la fin des lots en cours."""
+        self.submit()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
 
 class GenreCache:
     """Gère le cache des genres musicaux."""
     
-    def __init__(self, cache_file=None):
+    def __init__(self, cache_file=None, backend: str = DEFAULT_BACKEND, max_age: Optional[float] = DEFAULT_MAX_AGE):
         """
         Initialise le cache.
         
         Args:
-            cache_file: Chemin du fichier de cache (défaut: depuis paths)
+            cache_file: Chemin du fichier de cache (défaut: depuis paths, selon le backend)
+            backend: Backend de stockage ("sqlite", "journal", "binary" ou "json")
+            max_age: Durée de validité des entrées d'artistes en secondes (None ou 0 : pas d'expiration)
         """
         if cache_file is None:
-            cache_file = path_genre_cache()
+            cache_file = default_cache_file(backend)
         self.cache_file = Path(cache_file)
+        self.max_age = max_age
+        self.backend = open_backend(backend, self.cache_file)
+        # {artist_id: (entrée, tuple d'IDs de genres)} : conversion faite une fois par entrée
+        self._genre_ids = {}
+        self.metrics = CacheMetrics()
         self.cache_data = self._load_cache()
+        self._refresh = StaleRefresh()
     
     def _load_cache(self) -> Dict:
-        """Charge le cache depuis le fichier."""
-        if self.cache_file.exists():
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Vérifier la version du cache
-                    if data.get("version") == CACHE_VERSION:
-                        return data
-                    else:
-                        print(f"[!] Version de cache incompatible, creation d'un nouveau cache")
-                        return self._create_empty_cache()
-            except Exception as e:
-                print(f"[!] Erreur lors du chargement du cache: {e}")
-                return self._create_empty_cache()
-        else:
+        """Ouvre le cache (seules les métadonnées sont lues, les entrées le sont à la demande)."""
+        meta = self.backend.load_meta()
+        if meta is None and self.backend.name != JsonBackend.name:
+            meta = self._migrate_legacy_json()
+        if meta is None:
+            return self._create_empty_cache()
+        if meta.get("version") == 1:
+            meta = self._migrate_v1(meta)
+        # Vérifier la version du cache
+        if meta.get("version") != CACHE_VERSION:
+            print(f"[!] Version de cache incompatible, creation d'un nouveau cache")
             return self._create_empty_cache()
+        return self._with_tables(meta)
+    
+    def _migrate_legacy_json(self) -> Optional[Dict]:
+        """Importe l'ancien genre_cache.json dans le backend courant (une seule fois)."""
+        legacy_file = path_genre_cache()
+        if not legacy_file.exists():
+            return None
+        legacy = JsonBackend(legacy_file)
+        meta = legacy.load_meta()
+        if meta is None or meta.get("version") not in (1, CACHE_VERSION):
+            return None
+        upserts = {table: dict(legacy.items(table)) for table in TABLES}
+        self.backend.write(meta, upserts, {})
+        print(f"[*] Cache importe depuis {legacy_file.name} : "
+              f"{len(upserts['tracks'])} titres, {len(upserts['artists'])} artistes")
+        return meta
+    
+    def _migrate_v1(self, meta: Dict) -> Dict:
+        """
+        Convertit un cache version 1 (genres recopiés dans chaque titre) en version 2.
+        
+        Les genres des artistes sont mis en minuscules ; un titre dont l'artiste
+        manque lui transmet ses genres.
+        """
+        artists = {}
+        for artist_id, entry in self.backend.items("artists"):
+            artists[artist_id] = {"genres": _normalize_genres(entry["genres"]), "updated_at": entry.get("updated_at", 0)}
+        tracks = {}
+        for track_uri, entry in self.backend.items("tracks"):
+            artist_id = entry.get("artist_id")
+            if artist_id and artist_id not in artists:
+                artists[artist_id] = {"genres": _normalize_genres(entry["genres"]), "updated_at": entry.get("updated_at", 0)}
+            tracks[track_uri] = {"artist_id": artist_id, "updated_at": entry.get("updated_at", 0)}
+        meta = {**meta, "version": CACHE_VERSION}
+        self.backend.write(meta, {"tracks": tracks, "artists": artists}, {})
+        print(f"[*] Cache converti au format {CACHE_VERSION} : {len(tracks)} titres, {len(artists)} artistes")
+        return meta
+    
+    def _with_tables(self, meta: Dict) -> Dict:
+        """Associe aux métadonnées les tables chargées à la demande depuis le backend."""
+        data = dict(meta)
+        for table in TABLES:
+            data[table] = CacheTable(self.backend, table)
+        # tracks : {track_uri: {artist_id: "...", updated_at: timestamp}}
+        # artists : {artist_id: {genres: [...], updated_at: timestamp}}
+        return data
     
     def _create_empty_cache(self) -> Dict:
         """Crée une structure de cache vide."""
-        return {
+        meta = {
             "version": CACHE_VERSION,
             "created_at": time.time(),
-            "last_updated": time.time(),
-            "tracks": {},  # {track_uri: {genres: [...], artist_id: "...", updated_at: timestamp}}
-            "artists": {}  # {artist_id: {genres: [...], updated_at: timestamp}}
+            "last_updated": time.time()
         }
+        self.backend.reset(meta)
+        return self._with_tables(meta)
+    
+    def _meta(self) -> Dict:
+        """Métadonnées du cache (hors tables)."""
+        return {key: value for key, value in self.cache_data.items() if key not in TABLES}
+    
+    def _is_stale(self, entry: Dict) -> bool:
+        """Indique si une entrée a dépassé `max_age` (ou, pour une entrée négative, `NEGATIVE_MAX_AGE`)."""
+        age = time.time() - entry.get("updated_at", 0)
+        reason = entry.get("negative")
+        if reason:
+            return age > NEGATIVE_MAX_AGE.get(reason, NEGATIVE_MAX_AGE[ERROR])
+        return bool(self.max_age) and age > self.max_age
+    
+    def _set_negative(self, table: str, key: str, reason: str, now: float):
+        """
+        Enregistre une entrée négative (titre ou artiste non résolu).
+        
+        Une erreur passagère ne remplace pas une entrée valide déjà en cache.
+        """
+        existing = self.cache_data[table].get(key)
+        if reason == ERROR and existing is not None and not existing.get("negative"):
+            return
+        if table == "tracks":
+            self.cache_data["tracks"][key] = {"artist_id": None, "updated_at": now, "negative": reason}
+        else:
+            self.cache_data["artists"][key] = {"genres": [], "updated_at": now, "negative": reason}
+    
+    def _cached_artist_genres(self, artist_id: str) -> Optional[Tuple[int, ...]]:
+        """
+        IDs des genres d'un artiste en cache (None si absent, vide si négatif).
+        
+        Programme le rafraîchissement de l'artiste s'il est périmé. Le tuple
+        est construit une fois par entrée et partagé par tous ses titres.
+        """
+        entry = self.cache_data["artists"].get(artist_id)
+        if entry is None:
+            return None
+        if self._is_stale(entry):
+            self.metrics.add("stale_hits")
+            self._refresh.schedule(artist_id)
+        known = self._genre_ids.get(artist_id)
+        if known is not None and known[0] is entry:
+            return known[1]
+        ids = genre_ids(entry["genres"])
+        self._genre_ids[artist_id] = (entry, ids)
+        return ids
+    
+    def _cached_track_genres(self, track_uri: str) -> Tuple[int, ...]:
+        """IDs des genres d'un titre en cache (ceux de son artiste principal)."""
+        artist_id = self.cache_data["tracks"][track_uri].get("artist_id")
+        genres = self._cached_artist_genres(artist_id) if artist_id else None
+        return genres or ()
+    
+    def _set_artist(self, artist_id: str, genres: List[str], now: float):
+        """Enregistre les genres (mis en minuscules) d'un artiste."""
+        self.cache_data["artists"][artist_id] = {"genres": _normalize_genres(genres), "updated_at": now}
+    
+    def _merge_refreshed(self, wait: bool = False) -> int:
+        """
+        Fusionne dans le cache les artistes rafraîchis en arrière-plan.
+        
+        Args:
+            wait: Si True, attend d'abord la fin des rafraîchissements en cours
+        
+        Returns:
+            Nombre d'artistes mis à jour
+        """
+        if wait:
+            self._refresh.finish()
+        merged = 0
+        while True:
+            try:
+                batch, results, error = self._refresh.results.get_nowait()
+            except queue.Empty:
+                break
+            if error is not None:
+                print(f"[!] Erreur lors du rafraichissement d'un lot de {len(batch)} artistes: {error}")
+                for artist_id in batch:
+                    self._set_negative("artists", artist_id, ERROR, time.time())
+                continue
+            now = time.time()
+            for artist_id, artist_info in zip(batch, results.get("artists", [])):
+                if not artist_info:
+                    self._set_negative("artists", artist_id, NOT_FOUND, now)
+                    continue
+                self._set_artist(artist_info["id"], artist_info.get("genres", ["Unknown"]), now)
+                merged += 1
+        if merged:
+            print(f"[*] Cache: {merged} artiste(s) perime(s) rafraichi(s) en arriere-plan")
+        return merged
+    
+    def close(self):
+        """Termine les rafraîchissements en cours, sauvegarde et ferme le backend."""
+        self._merge_refreshed(wait=True)
+        self._save_cache()
+        self.backend.close()
     
     def _save_cache(self):
-        """Sauvegarde le cache dans le fichier."""
+        """Écrit dans le backend les entrées modifiées depuis la dernière sauvegarde."""
+        self._merge_refreshed()
+        tables = [self.cache_data[table] for table in TABLES]
+        if not any(table.has_changes() for table in tables):
+            return
         try:
+            started = time.perf_counter()
             self.cache_data["last_updated"] = time.time()
-            Path(self.cache_file).parent.mkdir(parents=True, exist_ok=True)
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_data, f, ensure_ascii=False, indent=2)
+            upserts = {}
+            deletes = {}
+            for table in tables:
+                upserts[table.table], deletes[table.table] = table.pending_changes()
+            written = self.backend.write(self._meta(), upserts, deletes)
+            for table in tables:
+                table.mark_clean()
+            self.metrics.record_save(written or 0, time.perf_counter() - started)
         except Exception as e:
             print(f"[!] Erreur lors de la sauvegarde du cache: {e}")
     
@@ -77,18 +346,26 @@ class GenreCache:
             force_refresh: Si True, force la mise à jour depuis l'API
         
         Returns:
-            Liste des genres ou None si le titre n'existe pas
+            Liste des genres (en minuscules) ou None si le titre n'existe pas
         """
-        # Vérifier le cache
-        if not force_refresh and track_uri in self.cache_data["tracks"]:
-            return self.cache_data["tracks"][track_uri]["genres"]
+        # Vérifier le cache (une entrée négative encore valide évite de redemander le titre)
+        entry = None if force_refresh else self.cache_data["tracks"].get(track_uri)
+        if entry is not None:
+            if not entry.get("negative"):
+                self.metrics.add("track_hits")
+                return genre_names(self._cached_track_genres(track_uri))
+            if not self._is_stale(entry):
+                self.metrics.add("negative_hits")
+                return None
+        self.metrics.add("track_misses")
         
         # Récupérer depuis l'API
         try:
             track_id = track_uri.split(":")[-1]
             track = sp.track(track_id)
             
-            if not track["artists"]:
+            if not track or not track["artists"]:
+                self._set_negative("tracks", track_uri, NOT_FOUND if not track else NO_ARTISTS, time.time())
                 return None
             
             artist_id = track["artists"][0]["id"]
@@ -98,7 +375,6 @@ class GenreCache:
             
             # Mettre en cache
             self.cache_data["tracks"][track_uri] = {
-                "genres": genres,
                 "artist_id": artist_id,
                 "updated_at": time.time()
             }
@@ -106,6 +382,7 @@ class GenreCache:
             return genres
         except Exception as e:
             print(f"[!] Erreur lors de la recuperation des genres pour {track_uri}: {e}")
+            self._set_negative("tracks", track_uri, _error_reason(e), time.time())
             return None
     
     def get_artist_genres(self, artist_id: str, force_refresh: bool = False) -> List[str]:
@@ -117,38 +394,183 @@ class GenreCache:
             force_refresh: Si True, force la mise à jour depuis l'API
         
         Returns:
-            Liste des genres
+            Liste des genres (en minuscules), ["Unknown"] si l'artiste n'a pas pu être résolu
         """
-        # Vérifier le cache
-        if not force_refresh and artist_id in self.cache_data["artists"]:
-            return self.cache_data["artists"][artist_id]["genres"]
+        # Vérifier le cache (une entrée périmée est servie puis rafraîchie en arrière-plan)
+        if not force_refresh:
+            genres = self._cached_artist_genres(artist_id)
+            if genres is not None:
+                self.metrics.add("artist_hits")
+                negative = self.cache_data["artists"][artist_id].get("negative")
+                return ["Unknown"] if negative else genre_names(genres)
+        self.metrics.add("artist_misses")
         
         # Récupérer depuis l'API
         try:
             artist_info = sp.artist(artist_id)
-            genres = artist_info.get("genres", ["Unknown"])
             
             # Mettre en cache
-            self.cache_data["artists"][artist_id] = {
-                "genres": genres,
-                "updated_at": time.time()
-            }
+            self._set_artist(artist_id, artist_info.get("genres", ["Unknown"]), time.time())
             
-            return genres
+            return self.cache_data["artists"][artist_id]["genres"]
         except Exception as e:
             print(f"[!] Erreur lors de la recuperation des genres pour l'artiste {artist_id}: {e}")
+            self._set_negative("artists", artist_id, _error_reason(e), time.time())
             return ["Unknown"]
     
+    def enrich_artists(
+        self, artist_ids: List[str], force_refresh: bool = False, workers: int = 1, include_stale: bool = False
+    ) -> int:
+        """
+        Récupère en lot les genres des artistes absents du cache.
+        
+        Les IDs manquants sont dédupliqués puis résolus par tranches de
+        `BATCH_SIZE` via `sp.artists`, soit un appel API pour 50 artistes.
+        Les artistes en cache mais périmés sont rafraîchis en arrière-plan ;
+        les artistes non résolus sont enregistrés comme entrées négatives.
+        
+        Args:
+            artist_ids: Liste des IDs d'artistes Spotify
+            force_refresh: Si True, récupère aussi les artistes déjà en cache
+            workers: Nombre de lots récupérés en parallèle (défaut: 1)
+            include_stale: Si True, les artistes périmés sont récupérés dans les mêmes lots
+                (et non en arrière-plan)
+        
+        Returns:
+            Nombre d'artistes récupérés depuis l'API
+        """
+        missing = []
+        seen = set()
+        if not force_refresh:
+            self.cache_data["artists"].load(artist_id for artist_id in artist_ids if artist_id)
+        for artist_id in artist_ids:
+            if not artist_id or artist_id in seen:
+                continue
+            seen.add(artist_id)
+            if include_stale and not force_refresh:
+                entry = self.cache_data["artists"].get(artist_id)
+                if entry is None or self._is_stale(entry):
+                    missing.append(artist_id)
+            elif force_refresh or self._cached_artist_genres(artist_id) is None:
+                missing.append(artist_id)
+        self.metrics.add("artist_hits", len(seen) - len(missing))
+        self.metrics.add("artist_misses", len(missing))
+        
+        fetched = 0
+        for batch, results, error in _run_batches(sp.artists, _chunks(missing), workers):
+            if error is not None:
+                print(f"[!] Erreur lors de la recuperation d'un lot de {len(batch)} artistes: {error}")
+                for artist_id in batch:
+                    self._set_negative("artists", artist_id, ERROR, time.time())
+                continue
+            now = time.time()
+            for artist_id, artist_info in zip(batch, results.get("artists", [])):
+                if not artist_info:
+                    self._set_negative("artists", artist_id, NOT_FOUND, now)
+                    continue
+                self._set_artist(artist_info["id"], artist_info.get("genres", ["Unknown"]), now)
+                fetched += 1
+        return fetched
+    
+    def warm(
+        self,
+        track_records: Iterable[Tuple[str, List[str]]],
+        followed_artists: Iterable[Dict] = (),
+        workers: int = 1
+    ) -> Dict[str, int]:
+        """
+        Pré-remplit le cache pour toute une bibliothèque.
+        
+        1. Les artistes suivis (objets complets, genres inclus) sont enregistrés
+           sans appel API.
+        2. Les artistes principaux des titres, absents ou périmés, sont
+           récupérés par lots de `BATCH_SIZE` via `sp.artists`.
+        3. Une entrée est créée pour chaque titre encore absent du cache.
+        
+        Les analyses suivantes trouvent alors tous les titres en cache.
+        
+        Args:
+            track_records: Itérable de tuples (track_uri, [artist_ids]) (voir `track_records`)
+            followed_artists: Objets artistes de `current_user_followed_artists`
+            workers: Nombre de lots récupérés en parallèle
+        
+        Returns:
+            Dictionnaire {followed, fetched, tracks_seeded}
+        """
+        now = time.time()
+        artists = self.cache_data["artists"]
+        followed = 0
+        for artist_info in followed_artists:
+            entry = artists.get(artist_info["id"])
+            if entry is None or self._is_stale(entry):
+                self._set_artist(artist_info["id"], artist_info.get("genres", ["Unknown"]), now)
+                followed += 1
+        
+        # Comme get_track_genres, seul l'artiste principal détermine les genres d'un titre
+        track_artists = {uri: artist_ids[0] for uri, artist_ids in track_records if artist_ids}
+        fetched = self.enrich_artists(list(track_artists.values()), workers=workers, include_stale=True)
+        
+        tracks = self.cache_data["tracks"]
+        tracks.load(track_artists)
+        seeded = 0
+        now = time.time()
+        for track_uri, artist_id in track_artists.items():
+            entry = tracks.get(track_uri)
+            if artist_id in artists and (entry is None or entry.get("artist_id") != artist_id):
+                tracks[track_uri] = {"artist_id": artist_id, "updated_at": now}
+                seeded += 1
+        
+        self._save_cache()
+        return {"followed": followed, "fetched": fetched, "tracks_seeded": seeded}
+    
+    def _resolve_track_artists(self, track_uris: List[str], workers: int = 1) -> Dict[str, str]:
+        """
+        Résout en lot l'artiste principal de chaque titre via `sp.tracks`.
+        
+        Les titres non résolus sont enregistrés comme entrées négatives.
+        
+        Args:
+            track_uris: Liste des URIs des titres
+            workers: Nombre de lots récupérés en parallèle (défaut: 1)
+        
+        Returns:
+            Dictionnaire {track_uri: artist_id} (titres introuvables ou sans artiste omis)
+        """
+        def fetch(batch):
+            return sp.tracks([uri.split(":")[-1] for uri in batch])
+        
+        track_artists = {}
+        for batch, results, error in _run_batches(fetch, _chunks(track_uris), workers):
+            now = time.time()
+            if error is not None:
+                print(f"[!] Erreur lors de la recuperation d'un lot de {len(batch)} titres: {error}")
+                for track_uri in batch:
+                    self._set_negative("tracks", track_uri, ERROR, now)
+                continue
+            for track_uri, track in zip(batch, results.get("tracks", [])):
+                if track and track.get("artists"):
+                    track_artists[track_uri] = track["artists"][0]["id"]
+                else:
+                    self._set_negative("tracks", track_uri, NO_ARTISTS if track else NOT_FOUND, now)
+        return track_artists
+    
     def analyze_tracks_genres(
         self, 
         track_uris: List[str], 
         force_refresh: bool = False,
         progress_callback: Optional[callable] = None,
-        save_every_n: int = 50
-    ) -> Dict[str, List[str]]:
+        save_every_n: int = 50,
+        workers: int = 1
+    ) -> Dict[str, Tuple[int, ...]]:
         """
         Analyse les genres de plusieurs titres en utilisant le cache.
         
+        Les titres absents du cache sont résolus en lot : les artistes des titres
+        sont récupérés 50 par 50 via `sp.tracks`, puis les artistes manquants
+        50 par 50 via `sp.artists`. Un cache vide coûte donc environ 2N/50
+        requêtes au lieu de 2N. Si les objets titres sont déjà disponibles,
+        préférer `analyze_track_records` qui évite l'appel `sp.tracks`.
+        
         Le cache est sauvegardé après chaque tranche de `save_every_n` titres
         récupérés depuis l'API, afin de conserver la progression en cas d'arrêt
         (rate limit, interruption, etc.).
@@ -158,61 +580,258 @@ class GenreCache:
             force_refresh: Si True, force la mise à jour depuis l'API
             progress_callback: Fonction appelée pour afficher la progression (idx, total)
             save_every_n: Sauvegarder le cache sur disque après chaque N titres récupérés via l'API (défaut: 50)
+            workers: Nombre de requêtes en parallèle pour les titres manquants (défaut: 1)
         
         Returns:
-            Dictionnaire {track_uri: [genres]}
+            Dictionnaire {track_uri: (IDs de genres)} (voir genre_table)
+        """
+        return self._analyze(list(track_uris), {}, force_refresh, progress_callback, save_every_n, workers)
+    
+    def analyze_track_records(
+        self,
+        track_records: Iterable[Tuple[str, List[str]]],
+        force_refresh: bool = False,
+        progress_callback: Optional[callable] = None,
+        save_every_n: int = 50,
+        workers: int = 1
+    ) -> Dict[str, Tuple[int, ...]]:
+        """
+        Analyse les genres de titres dont les artistes sont déjà connus.
+        
+        Variante de `analyze_tracks_genres` pour les enregistrements issus des
+        pages de titres likés (voir `track_records`) : aucun appel `sp.track`
+        n'est nécessaire, seuls les artistes manquants sont récupérés en lot.
+        
+        Args:
+            track_records: Itérable de tuples (track_uri, [artist_ids])
+            force_refresh: Si True, force la mise à jour depuis l'API
+            progress_callback: Fonction appelée pour afficher la progression (idx, total)
+            save_every_n: Sauvegarder le cache sur disque après chaque N titres récupérés via l'API (défaut: 50)
+            workers: Nombre de requêtes en parallèle pour les titres manquants (défaut: 1)
+        
+        Returns:
+            Dictionnaire {track_uri: (IDs de genres)} (voir genre_table)
+        """
+        track_uris = []
+        known_artists = {}
+        for track_uri, artist_ids in track_records:
+            track_uris.append(track_uri)
+            # Comme get_track_genres, seul l'artiste principal détermine les genres
+            known_artists[track_uri] = artist_ids[0] if artist_ids else None
+        return self._analyze(track_uris, known_artists, force_refresh, progress_callback, save_every_n, workers)
+    
+    def _analyze(
+        self,
+        track_uris: List[str],
+        known_artists: Dict[str, Optional[str]],
+        force_refresh: bool,
+        progress_callback: Optional[callable],
+        save_every_n: int,
+        workers: int
+    ) -> Dict[str, Tuple[int, ...]]:
+        """
+        Implémentation commune de l'analyse par lot.
+        
+        Avec `workers > 1`, les lots d'une tranche sont récupérés en parallèle
+        (sous le limiteur de débit partagé) ; l'écriture dans le cache reste
+        faite par le seul thread appelant.
+        
+        Args:
+            track_uris: Liste des URIs des titres
+            known_artists: {track_uri: artist_id} déjà connus (None = titre sans artiste)
+            force_refresh: Si True, force la mise à jour depuis l'API
+            progress_callback: Fonction appelée pour afficher la progression (idx, total)
+            save_every_n: Sauvegarder le cache après chaque N titres récupérés via l'API
+            workers: Nombre de requêtes en parallèle
+        
+        Returns:
+            Dictionnaire {track_uri: (IDs de genres)} (voir genre_table)
         """
         track_genres_dict = {}
         total = len(track_uris)
         cached_count = 0
+        negative_count = 0
         api_count = 0
         
-        for idx, track_uri in enumerate(track_uris, 1):
-            # Vérifier le cache d'abord
-            if not force_refresh and track_uri in self.cache_data["tracks"]:
-                track_genres_dict[track_uri] = self.cache_data["tracks"][track_uri]["genres"]
+        # Séparer les titres en cache des titres à récupérer
+        tracks = self.cache_data["tracks"]
+        if not force_refresh:
+            tracks.load(track_uris)
+            self.cache_data["artists"].load(
+                tracks[uri].get("artist_id") for uri in track_uris if uri in tracks
+            )
+        missing_uris = []
+        for track_uri in track_uris:
+            entry = None if force_refresh else tracks.get(track_uri)
+            if entry is not None and entry.get("negative"):
+                if not self._is_stale(entry):
+                    # Titre non résolu récemment : ne pas redemander à l'API
+                    negative_count += 1
+                    continue
+                entry = None
+            if entry is not None:
+                track_genres_dict[track_uri] = self._cached_track_genres(track_uri)
                 cached_count += 1
             else:
-                # Récupérer depuis l'API
-                genres = self.get_track_genres(track_uri, force_refresh=force_refresh)
+                missing_uris.append(track_uri)
+        self.metrics.add("track_hits", cached_count)
+        self.metrics.add("negative_hits", negative_count)
+        self.metrics.add("track_misses", len(missing_uris))
+        # Lancer sans attendre le rafraîchissement des artistes périmés rencontrés
+        self._refresh.submit()
+        
+        # Traiter les titres manquants par tranches (une tranche = une sauvegarde)
+        workers = max(1, workers)
+        chunk_size = max(save_every_n, BATCH_SIZE * workers) if save_every_n > 0 else len(missing_uris) or 1
+        for start in range(0, len(missing_uris), chunk_size):
+            chunk = missing_uris[start:start + chunk_size]
+            
+            # Artistes connus d'avance, les autres sont résolus via sp.tracks
+            track_artists = {}
+            unresolved = []
+            for uri in chunk:
+                if uri not in known_artists:
+                    unresolved.append(uri)
+                elif known_artists[uri]:
+                    track_artists[uri] = known_artists[uri]
+                else:
+                    # Titre connu sans artiste : entrée négative, comme après sp.tracks
+                    self._set_negative("tracks", uri, NO_ARTISTS, time.time())
+            if unresolved:
+                track_artists.update(self._resolve_track_artists(unresolved, workers=workers))
+            
+            self.enrich_artists(list(track_artists.values()), force_refresh=force_refresh, workers=workers)
+            
+            now = time.time()
+            for track_uri, artist_id in track_artists.items():
+                genres = self._cached_artist_genres(artist_id)
+                if genres is None:
+                    continue
+                self.cache_data["tracks"][track_uri] = {
+                    "artist_id": artist_id,
+                    "updated_at": now
+                }
                 if genres:
                     track_genres_dict[track_uri] = genres
                     api_count += 1
-                    
-                    # Sauvegarde incrémentale : après chaque tranche de titres récupérés via l'API
-                    if save_every_n > 0 and (api_count == 1 or api_count % save_every_n == 0):
-                        self._save_cache()
-                
-                # Petite pause pour éviter de surcharger l'API
-                if api_count > 0 and api_count % 10 == 0:
-                    time.sleep(0.1)
+            
+            if save_every_n > 0:
+                self._save_cache()
             
             # Callback de progression
-            if progress_callback and idx % 50 == 0:
-                progress_callback(idx, total)
+            if progress_callback:
+                progress_callback(cached_count + negative_count + start + len(chunk), total)
         
-        # Sauvegarder une dernière fois s'il reste des entrées non sauvegardées
+        # Sauvegarder une dernière fois si la sauvegarde incrémentale est désactivée
         if api_count > 0:
-            self._save_cache()
+            if save_every_n <= 0:
+                self._save_cache()
             print(f"[*] Cache mis a jour: {cached_count} depuis le cache, {api_count} depuis l'API")
+        if negative_count:
+            print(f"[*] Cache: {negative_count} titre(s) non resolu(s) recemment ignore(s) (cache negatif)")
+        self._refresh.submit()
         
         return track_genres_dict
     
-    def get_cache_stats(self) -> Dict:
-        """Retourne des statistiques sur le cache."""
+    def export_bundle(self, path) -> int:
+        """
+        Exporte les genres des artistes dans un fichier portable (JSON gzip).
+        
+        Seules les entrées valides sont exportées : les entrées négatives
+        dépendent de la machine (erreurs réseau) et expirent vite.
+        
+        Args:
+            path: Fichier de destination (.json.gz)
+        
+        Returns:
+            Nombre d'artistes exportés
+        """
+        self._save_cache()
+        artists = {
+            artist_id: {"genres": entry["genres"], "updated_at": entry.get("updated_at", 0)}
+            for artist_id, entry in self.cache_data["artists"].items()
+            if not entry.get("negative")
+        }
+        bundle = {
+            "format": BUNDLE_FORMAT,
+            "version": BUNDLE_VERSION,
+            "cache_version": CACHE_VERSION,
+            "exported_at": time.time(),
+            "artists": artists
+        }
+        payload = json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        atomic_write_bytes(path, gzip.compress(payload))
+        return len(artists)
+    
+    def import_bundle(self, path) -> Dict[str, int]:
+        """
+        Fusionne dans le cache un fichier créé par `export_bundle`.
+        
+        Pour chaque artiste, l'entrée la plus récente (`updated_at`) l'emporte ;
+        une entrée importée remplace toujours une entrée négative locale.
+        
+        Args:
+            path: Fichier exporté (.json.gz)
+        
+        Returns:
+            {"imported": nombre d'artistes ajoutés ou mis à jour, "skipped": entrées locales plus récentes}
+        
+        Raises:
+            ValueError: Si le fichier n'est pas un export reconnu
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            bundle = json.load(f)
+        if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"{path} n'est pas un export du cache des genres")
+        if bundle.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Version d'export non supportee : {bundle.get('version')} (attendue : {BUNDLE_VERSION})")
+        
+        artists = self.cache_data["artists"]
+        incoming = bundle.get("artists", {})
+        artists.load(incoming)
+        imported = 0
+        skipped = 0
+        for artist_id, entry in incoming.items():
+            updated_at = entry.get("updated_at", 0)
+            existing = artists.get(artist_id)
+            if existing is not None and not existing.get("negative") and existing.get("updated_at", 0) >= updated_at:
+                skipped += 1
+                continue
+            self._set_artist(artist_id, entry.get("genres", []), updated_at)
+            imported += 1
+        self._save_cache()
+        return {"imported": imported, "skipped": skipped}
+    
+    def get_cache_stats(self, count_stale: bool = False) -> Dict:
+        """
+        Retourne des statistiques sur le cache.
+        
+        Args:
+            count_stale: Si True, parcourt les artistes pour compter les entrées
+                périmées et négatives (artists_stale, artists_negative, tracks_negative)
+        """
         tracks_count = len(self.cache_data["tracks"])
         artists_count = len(self.cache_data["artists"])
         
         created_at = self.cache_data.get("created_at", 0)
         last_updated = self.cache_data.get("last_updated", 0)
         
-        return {
+        stats = {
             "tracks_cached": tracks_count,
             "artists_cached": artists_count,
             "created_at": created_at,
             "last_updated": last_updated,
-            "cache_file": str(self.cache_file)
+            "cache_file": str(self.cache_file),
+            "backend": self.backend.name,
+            "size_bytes": self.backend.size_bytes(),
+            "run": self.metrics.to_dict()
         }
+        if count_stale:
+            artists = [entry for _, entry in self.cache_data["artists"].items()]
+            stats["artists_stale"] = sum(1 for entry in artists if self._is_stale(entry))
+            stats["artists_negative"] = sum(1 for entry in artists if entry.get("negative"))
+            stats["tracks_negative"] = sum(1 for _, entry in self.cache_data["tracks"].items() if entry.get("negative"))
+        return stats
     
     def clear_cache(self, confirm: bool = False):
         """
@@ -226,7 +845,6 @@ class GenreCache:
             return
         
         self.cache_data = self._create_empty_cache()
-        self._save_cache()
         print("[+] Cache vide")
     
     def remove_track(self, track_uri: str):
@@ -237,22 +855,201 @@ class GenreCache:
     
     def remove_artist(self, artist_id: str):
         """Supprime un artiste du cache."""
-        if artist_id in self.cache_data["artists"]:
-            del self.cache_data["artists"][artist_id]
-            # Supprimer aussi les références dans les titres
-            for track_uri, track_data in list(self.cache_data["tracks"].items()):
-                if track_data.get("artist_id") == artist_id:
-                    del self.cache_data["tracks"][track_uri]
-            self._save_cache()
+        self.remove_artists([artist_id])
+    
+    def remove_artists(self, artist_ids: Iterable[str]) -> int:
+        """
+        Supprime des artistes du cache, ainsi que les titres qui y font référence.
+        
+        L'index inverse artiste → titres est construit une seule fois pour
+        toutes les suppressions.
+        
+        Returns:
+            Nombre d'artistes supprimés
+        """
+        artists = self.cache_data["artists"]
+        tracks = self.cache_data["tracks"]
+        artist_ids = [artist_id for artist_id in dict.fromkeys(artist_ids) if artist_id in artists]
+        if not artist_ids:
+            return 0
+        track_index = self._artist_track_index()
+        for artist_id in artist_ids:
+            del artists[artist_id]
+            for track_uri in track_index.get(artist_id, ()):
+                del tracks[track_uri]
+        self._save_cache()
+        return len(artist_ids)
+    
+    def _artist_track_index(self) -> Dict[str, Set[str]]:
+        """Index inverse {artist_id: {track_uri}} construit en un parcours de la table des titres."""
+        index = defaultdict(set)
+        for track_uri, entry in self.cache_data["tracks"].items():
+            artist_id = entry.get("artist_id")
+            if artist_id:
+                index[artist_id].add(track_uri)
+        return index
+    
+    def collect_garbage(self, library_uris: Iterable[str], keep_artists: Iterable[str] = ()) -> Dict[str, Dict[str, int]]:
+        """
+        Retire du cache ce que la bibliothèque ne référence plus.
+        
+        1. Les titres absents de `library_uris` (titres retirés des likes) sont supprimés.
+        2. Les artistes qui ne sont plus l'artiste d'aucun titre restant (d'après
+           l'index inverse artiste → titres) sont supprimés, sauf `keep_artists`.
+        3. Le stockage est compacté pour que le fichier rétrécisse réellement.
+        
+        Args:
+            library_uris: URIs des titres de la bibliothèque actuelle
+            keep_artists: IDs d'artistes à conserver même sans titre (ex: artistes suivis)
+        
+        Returns:
+            {"before": {...}, "after": {...}} avec tracks, artists et bytes
+        """
+        # Un rafraîchissement en cours pourrait réintroduire un artiste supprimé
+        self._merge_refreshed(wait=True)
+        self._save_cache()
+        tracks = self.cache_data["tracks"]
+        artists = self.cache_data["artists"]
+        before = {"tracks": len(tracks), "artists": len(artists), "bytes": self.backend.size_bytes()}
+        
+        library = set(library_uris)
+        for track_uri in [uri for uri in tracks if uri not in library]:
+            del tracks[track_uri]
+        
+        referenced = self._artist_track_index()
+        keep = set(keep_artists)
+        for artist_id in [aid for aid in artists if aid not in referenced and aid not in keep]:
+            del artists[artist_id]
+        
+        self._save_cache()
+        self.backend.compact()
+        after = {"tracks": len(tracks), "artists": len(artists), "bytes": self.backend.size_bytes()}
+        return {"before": before, "after": after}
+
+
+def _error_reason(error: Exception) -> str:
+    """Code de raison d'une requête en échec (404 / ID invalide : introuvable)."""
+    return NOT_FOUND if getattr(error, "http_status", None) in (400, 404) else ERROR
+
+
+def _normalize_genres(genres: Iterable[str]) -> List[str]:
+    """Genres en minuscules, sans doublons (ordre conservé)."""
+    return list(dict.fromkeys(genre.lower() for genre in genres))
+
 
+def _chunks(items: List, size: int = BATCH_SIZE) -> List[List]:
+    """Découpe une liste en lots de `size` éléments."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
 
-# Instance globale du cache
+
+def _run_batches(fetch, batches: List[List], workers: int = 1):
+    """
+    Exécute `fetch(batch)` pour chaque lot, éventuellement en parallèle.
+    
+    Les résultats sont renvoyés dans l'ordre des lots au thread appelant, qui
+    reste seul à modifier le cache.
+    
+    Args:
+        fetch: Fonction appelée avec un lot (appel API)
+        batches: Liste des lots
+        workers: Nombre maximal de lots en cours simultanément
+    
+    Yields:
+        Tuples (batch, résultat, erreur) ; résultat vaut None en cas d'erreur
+    """
+    def run(batch):
+        try:
+            return batch, fetch(batch), None
+        except Exception as e:
+            return batch, None, e
+    
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield run(batch)
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        yield from executor.map(run, batches)
+
+
+def track_records(tracks: Iterable[Dict]) -> List[Tuple[str, List[str]]]:
+    """
+    Convertit des objets titres en enregistrements (uri, [artist_ids]).
+    
+    Les objets titres des pages `current_user_saved_tracks` et les entrées du
+    miroir local (library_mirror) contiennent déjà leurs artistes : ces
+    enregistrements permettent à `analyze_track_records` de ne pas
+    re-télécharger chaque titre.
+    
+    Args:
+        tracks: Objets titres de l'API (champ "track" des items) ou entrées du miroir
+    
+    Returns:
+        Liste de tuples (track_uri, [artist_ids])
+    """
+    records = []
+    for track in tracks:
+        if not track or not track.get("uri"):
+            continue
+        artist_ids = track.get("artist_ids")
+        if artist_ids is None:
+            artist_ids = [artist["id"] for artist in track.get("artists", []) if artist.get("id")]
+        records.append((track["uri"], artist_ids))
+    return records
+
+
+def default_cache_file(backend: str) -> Path:
+    """Chemin par défaut du cache pour un backend donné."""
+    if backend == JsonBackend.name:
+        return path_genre_cache()
+    if backend == JournalBackend.name:
+        return path_genre_cache_journal()
+    if backend == BinaryBackend.name:
+        return path_genre_cache_bin()
+    return path_genre_cache_db()
+
+
+# Instance globale du cache et options utilisées pour la créer
 _cache_instance = None
+_cache_options = {"backend": DEFAULT_BACKEND, "max_age": DEFAULT_MAX_AGE}
+
+
+def configure_cache(**options):
+    """
+    Change les options de l'instance globale (backend, max_age).
+    
+    L'instance déjà ouverte, le cas échéant, est fermée : la suivante est
+    créée avec les nouvelles options au prochain `get_cache`.
+    """
+    global _cache_instance
+    if _cache_instance is not None:
+        _cache_instance.close()
+        _cache_instance = None
+    _cache_options.update(options)
+
+
+def close_cache():
+    """
+    Ferme l'instance globale en fin d'exécution (rafraîchissements terminés et
+    sauvegardés), puis enregistre les mesures de l'exécution.
+    
+    À appeler explicitement en fin de programme (voir main.py) ; enregistrée
+    aussi avec `atexit` en dernier recours, quand les threads ne peuvent plus
+    être utilisés (les rafraîchissements non lancés sont alors abandonnés).
+    """
+    global _cache_instance
+    if _cache_instance is not None:
+        _cache_instance.close()
+        api_stats = sp.stats() if hasattr(sp, "stats") else {}
+        if _cache_instance.metrics.has_activity() or api_stats.get("calls"):
+            save_run_metrics(build_run_record(_cache_instance.metrics.to_dict(), api_stats))
+        _cache_instance = None
 
 
 def get_cache() -> GenreCache:
     """Retourne l'instance globale du cache."""
     global _cache_instance
     if _cache_instance is None:
-        _cache_instance = GenreCache()
+        _cache_instance = GenreCache(**_cache_options)
+        atexit.register(close_cache)
     return _cache_instance
@@ -5,13 +5,29 @@ Ce module implémente :
 - Un système de pondération des genres pour chaque playlist
 - Un algorithme de descente de gradient pour optimiser les poids
 - Des fonctions d'évaluation et de test
+
+Les genres des titres sont des tuples d'IDs (voir genre_table). Pour chaque
+bucket, la correspondance entre un ID de genre et les genres du bucket
+(égalité ou inclusion d'une chaîne dans l'autre) est calculée une seule fois.
+
+Les poids sont sauvegardés en JSON et en instantané binaire (.bin à côté,
+voir binary_snapshot) : le chargement utilise le .bin s'il est à jour, et
+ne décode les poids d'un bucket qu'au premier accès.
+
+Le scoring de tous les buckets à la fois (`score_all_buckets`) passe par un
+produit de matrices creuses (voir sparse_scoring).
 """
 import json
 from pathlib import Path
 from collections import defaultdict
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, List, Sequence, Set, Tuple, Optional
 import random
 
+from .binary_snapshot import WeightsSnapshot, write_weights_snapshot
+from .genre_table import genre_name
+from .paths import path_weights_bin
+from . import sparse_scoring
+
 
 class GenreScoringModel:
     """
@@ -35,6 +51,10 @@ class GenreScoringModel:
         # Dictionnaire {bucket_key: {genre: poids}}
         self.genre_weights = {}
         
+        # {bucket_key: ([(genre du bucket, en minuscules)],
+        #               {genre_id: (premier genre correspondant ou None, tous les genres correspondants)})}
+        self._matches = {}
+        
         # Initialiser les poids pour chaque bucket
         self._initialize_weights()
     
@@ -50,13 +70,41 @@ class GenreScoringModel:
                     genre: self.initial_weight for genre in bucket_genres
                 }
     
-    def score_track(self, track_uri: str, track_genres: List[str], bucket_key: str) -> float:
+    def _genre_matches(self, bucket_key: str, genre_id: int) -> Tuple[Optional[str], Tuple[str, ...]]:
+        """
+        Genres du bucket correspondant à un genre (exactement ou partiellement).
+        
+        Le résultat est mémorisé par (bucket, genre) : la comparaison des
+        chaînes n'est faite qu'une fois par exécution, et les genres du bucket
+        ne sont mis en minuscules qu'une fois.
+        
+        Returns:
+            Tuple (premier genre du bucket correspondant ou None, tous les genres correspondants)
+        """
+        bucket_matches = self._matches.get(bucket_key)
+        if bucket_matches is None:
+            lowered = [(bucket_genre, bucket_genre.lower()) for bucket_genre in self.genre_weights[bucket_key]]
+            bucket_matches = self._matches[bucket_key] = (lowered, {})
+        lowered, matches = bucket_matches
+        found = matches.get(genre_id)
+        if found is None:
+            genre = genre_name(genre_id)
+            # L'égalité est un cas particulier de l'inclusion
+            all_matches = tuple(
+                bucket_genre for bucket_genre, lower in lowered
+                if genre in lower or lower in genre
+            )
+            found = (all_matches[0] if all_matches else None, all_matches)
+            matches[genre_id] = found
+        return found
+    
+    def score_track(self, track_uri: str, track_genres: Sequence[int], bucket_key: str) -> float:
         """
         Calcule le score d'un titre pour un bucket donné.
         
         Args:
             track_uri: URI du titre
-            track_genres: Liste des genres du titre
+            track_genres: IDs des genres du titre
             bucket_key: Clé du bucket cible
         
         Returns:
@@ -66,22 +114,19 @@ class GenreScoringModel:
             return 0.0
         
         weights = self.genre_weights[bucket_key]
-        track_genres_lower = [g.lower() for g in track_genres]
         
         score = 0.0
-        for genre in track_genres_lower:
-            # Chercher une correspondance exacte ou partielle
-            for bucket_genre, weight in weights.items():
-                bucket_genre_lower = bucket_genre.lower()
-                if genre == bucket_genre_lower or genre in bucket_genre_lower or bucket_genre_lower in genre:
-                    score += weight
-                    break  # Ne compter qu'une fois par genre du bucket
+        for genre_id in track_genres:
+            # Ne compter que la première correspondance (exacte ou partielle) de chaque genre
+            bucket_genre = self._genre_matches(bucket_key, genre_id)[0]
+            if bucket_genre is not None:
+                score += weights[bucket_genre]
         
         return score
     
     def score_tracks_for_bucket(
         self, 
-        track_genres_dict: Dict[str, List[str]], 
+        track_genres_dict: Dict[str, Sequence[int]], 
         bucket_key: str,
         threshold: float = 0.5
     ) -> List[Tuple[str, float]]:
@@ -107,6 +152,25 @@ class GenreScoringModel:
         scored_tracks.sort(key=lambda x: x[1], reverse=True)
         return scored_tracks
     
+    def score_all_buckets(
+        self,
+        track_genres_dict: Dict[str, Sequence[int]],
+        threshold: float = 0.5,
+        bucket_keys: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Score tous les titres pour tous les buckets en une seule passe (voir sparse_scoring).
+        
+        Args:
+            track_genres_dict: Dictionnaire {track_uri: (IDs de genres)}
+            threshold: Seuil minimum de score (défaut: 0.5)
+            bucket_keys: Buckets à scorer (défaut: tous)
+        
+        Returns:
+            {bucket_key: [(track_uri, score)] triés par score décroissant}
+        """
+        return sparse_scoring.score_all_buckets(self, track_genres_dict, threshold, bucket_keys)
+    
     def compute_loss(
         self,
         track_genres_dict: Dict[str, List[str]],
@@ -183,44 +247,31 @@ class GenreScoringModel:
             return {}
         
         gradients = defaultdict(float)
-        weights = self.genre_weights[bucket_key]
         
-        # Pour chaque paire (positif, négatif)
-        for pos_uri in positive_tracks:
-            if pos_uri not in track_genres_dict:
-                continue
-            
-            pos_genres = [g.lower() for g in track_genres_dict[pos_uri]]
-            pos_score = self.score_track(pos_uri, track_genres_dict[pos_uri], bucket_key)
-            
-            for neg_uri in negative_tracks:
-                if neg_uri not in track_genres_dict:
-                    continue
-                
-                neg_genres = [g.lower() for g in track_genres_dict[neg_uri]]
-                neg_score = self.score_track(neg_uri, track_genres_dict[neg_uri], bucket_key)
-                
-                diff = pos_score - neg_score
-                
-                # Si la marge n'est pas respectée, calculer le gradient
-                if diff < margin:
-                    # Gradient pour les genres du titre positif
-                    for genre in pos_genres:
-                        for bucket_genre, weight in weights.items():
-                            bucket_genre_lower = bucket_genre.lower()
-                            if (genre == bucket_genre_lower or 
-                                genre in bucket_genre_lower or 
-                                bucket_genre_lower in genre):
-                                gradients[bucket_genre] += 1.0
-                    
-                    # Gradient pour les genres du titre négatif (négatif car on veut les diminuer)
-                    for genre in neg_genres:
-                        for bucket_genre, weight in weights.items():
-                            bucket_genre_lower = bucket_genre.lower()
-                            if (genre == bucket_genre_lower or 
-                                genre in bucket_genre_lower or 
-                                bucket_genre_lower in genre):
-                                gradients[bucket_genre] -= 1.0
+        # Scores calculés une fois par titre (et non une fois par paire)
+        pos_scores = [
+            (uri, self.score_track(uri, track_genres_dict[uri], bucket_key))
+            for uri in positive_tracks if uri in track_genres_dict
+        ]
+        neg_scores = [
+            (uri, self.score_track(uri, track_genres_dict[uri], bucket_key))
+            for uri in negative_tracks if uri in track_genres_dict
+        ]
+        
+        # Nombre de paires (positif, négatif) ne respectant pas la marge, par titre
+        violations = defaultdict(int)
+        for pos_uri, pos_score in pos_scores:
+            for neg_uri, neg_score in neg_scores:
+                if pos_score - neg_score < margin:
+                    violations[pos_uri] += 1
+                    violations[neg_uri] -= 1
+        
+        # Chaque paire en violation ajoute +1 à tous les genres du bucket correspondant
+        # aux genres du titre positif, et -1 pour ceux du titre négatif
+        for track_uri, count in violations.items():
+            for genre_id in track_genres_dict[track_uri]:
+                for bucket_genre in self._genre_matches(bucket_key, genre_id)[1]:
+                    gradients[bucket_genre] += count
         
         # Normaliser par le nombre de paires
         num_pairs = len(positive_tracks) * len(negative_tracks)
@@ -307,15 +358,32 @@ class GenreScoringModel:
         return loss_history
     
     def save_weights(self, filepath: str):
-        """Sauvegarde les poids dans un fichier JSON."""
+        """Sauvegarde les poids dans un fichier JSON et dans son instantané binaire (.bin)."""
+        weights = {bucket_key: dict(bucket_weights) for bucket_key, bucket_weights in self.genre_weights.items()}
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.genre_weights, f, ensure_ascii=False, indent=2)
+            json.dump(weights, f, ensure_ascii=False, indent=2)
+        write_weights_snapshot(path_weights_bin(filepath), weights)
     
     def load_weights(self, filepath: str):
-        """Charge les poids depuis un fichier JSON."""
-        if Path(filepath).exists():
+        """
+        Charge les poids depuis un fichier JSON.
+        
+        L'instantané binaire (.bin) est utilisé à la place s'il est au moins aussi
+        récent que le JSON (un JSON modifié à la main reste prioritaire).
+        """
+        json_file = Path(filepath)
+        bin_file = path_weights_bin(filepath)
+        if bin_file.exists() and (not json_file.exists() or bin_file.stat().st_mtime >= json_file.stat().st_mtime):
+            try:
+                self.genre_weights = WeightsSnapshot(bin_file)
+                self._matches = {}
+                return
+            except (OSError, ValueError) as e:
+                print(f"[!] Instantane des poids illisible ({bin_file}), lecture du JSON : {e}")
+        if json_file.exists():
             with open(filepath, 'r', encoding='utf-8') as f:
                 self.genre_weights = json.load(f)
+            self._matches = {}
         else:
             print(f"[!] Fichier de poids introuvable : {filepath}")
     
@@ -0,0 +1,70 @@
+"""
+Table des genres internés.
+
+Chaque genre est mis en minuscules une seule fois puis associé à un entier :
+les titres analysés portent des tuples d'IDs de genres (partagés entre tous
+les titres d'un même artiste) au lieu de listes de chaînes, et les
+comparaisons (filtrage, scoring) se font sur des entiers.
+
+Les IDs ne valent que pour le processus courant : le cache stocke les noms
+des genres, pas leurs IDs.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class GenreTable:
+    """Association genre (minuscules) <-> ID entier."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def intern(self, genre: str) -> int:
+        """Retourne l'ID d'un genre, en le créant si besoin."""
+        name = genre.lower()
+        genre_id = self._ids.get(name)
+        if genre_id is None:
+            genre_id = len(self._names)
+            self._ids[name] = genre_id
+            self._names.append(name)
+        return genre_id
+
+    def lookup(self, genre: str) -> Optional[int]:
+        """Retourne l'ID d'un genre déjà rencontré, ou None."""
+        return self._ids.get(genre.lower())
+
+    def name(self, genre_id: int) -> str:
+        """Nom (en minuscules) d'un ID de genre."""
+        return self._names[genre_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+# Table globale du processus
+_table = GenreTable()
+
+
+def genre_ids(genres: Iterable[str]) -> Tuple[int, ...]:
+    """Convertit une liste de genres en tuple d'IDs (doublons retirés, ordre conservé)."""
+    return tuple(dict.fromkeys(_table.intern(genre) for genre in genres))
+
+
+def genre_id(genre: str) -> int:
+    """ID d'un genre (créé si besoin)."""
+    return _table.intern(genre)
+
+
+def lookup_genre_id(genre: str) -> Optional[int]:
+    """ID d'un genre déjà rencontré, ou None (aucun titre ne l'a)."""
+    return _table.lookup(genre)
+
+
+def genre_name(genre_id: int) -> str:
+    """Nom d'un ID de genre."""
+    return _table.name(genre_id)
+
+
+def genre_names(ids: Iterable[int]) -> List[str]:
+    """Noms d'une séquence d'IDs de genres."""
+    return [_table.name(genre_id) for genre_id in ids]
@@ -0,0 +1,147 @@
+"""
+Règles d'incompatibilité des genres par bucket (data/incompatible_genres.json).
+
+Un titre ayant un genre incompatible avec un bucket est exclu de la playlist
+de ce bucket (filtrage simple comme scoring pondéré).
+
+Format du fichier :
+- "groups" : listes de genres nommées, réutilisables (`"@rap"`) ; un groupe
+  peut en référencer un autre
+- "buckets" : {bucket_key: {"label": ..., "exclude": [genres ou @groupes]}}
+
+Les règles sont compilées une fois en masques de bits sur les IDs de genres
+(voir genre_table) : le test d'un titre est un ET binaire entre le masque
+de ses genres (mémorisé par tuple de genres, donc par artiste) et celui du
+bucket.
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .genre_table import genre_id
+from .paths import path_incompatible_genres
+
+
+GROUP_PREFIX = "@"
+
+# Règles compilées et signature (taille, date) du fichier lu
+_rules = None
+_rules_signature = None
+
+
+def _expand(items: Iterable[str], groups: Dict[str, List[str]], seen: Tuple[str, ...] = ()) -> Set[str]:
+    """Remplace les références de groupes par leurs genres (en minuscules)."""
+    genres = set()
+    for item in items:
+        if item.startswith(GROUP_PREFIX):
+            name = item[len(GROUP_PREFIX):]
+            if name in seen:
+                raise ValueError(f"Groupe de genres incompatibles circulaire : {' -> '.join(seen + (name,))}")
+            if name not in groups:
+                raise ValueError(f"Groupe de genres incompatibles inconnu : {item}")
+            genres.update(_expand(groups[name], groups, seen + (name,)))
+        else:
+            genres.add(item.lower())
+    return genres
+
+
+def _genre_mask(genre_ids: Iterable[int]) -> int:
+    mask = 0
+    for gid in genre_ids:
+        mask |= 1 << gid
+    return mask
+
+
+class IncompatibilityRules:
+    """Règles d'incompatibilité compilées en masques de bits par bucket."""
+
+    def __init__(self, genres_by_bucket: Dict[str, Set[str]]):
+        self.genres_by_bucket = genres_by_bucket
+        # Les genres des règles sont internés : leurs IDs restent valables pour tous les titres analysés ensuite
+        self._bucket_masks = {
+            bucket_key: _genre_mask(genre_id(genre) for genre in genres)
+            for bucket_key, genres in genres_by_bucket.items() if genres
+        }
+        self._track_masks: Dict[Tuple[int, ...], int] = {}
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "IncompatibilityRules":
+        """Compile le contenu de incompatible_genres.json."""
+        groups = data.get("groups", {})
+        genres_by_bucket = {
+            bucket_key: _expand(rule.get("exclude", []), groups)
+            for bucket_key, rule in data.get("buckets", {}).items()
+        }
+        return cls(genres_by_bucket)
+
+    def _track_mask(self, track_genres: Sequence[int]) -> int:
+        key = tuple(track_genres)
+        mask = self._track_masks.get(key)
+        if mask is None:
+            mask = self._track_masks[key] = _genre_mask(key)
+        return mask
+
+    def has_rules(self, bucket_key: str) -> bool:
+        return bucket_key in self._bucket_masks
+
+    def is_compatible(self, bucket_key: str, track_genres: Sequence[int]) -> bool:
+        """Indique si un titre (IDs de ses genres) peut aller dans la playlist du bucket."""
+        bucket_mask = self._bucket_masks.get(bucket_key)
+        return not bucket_mask or not self._track_mask(track_genres) & bucket_mask
+
+    def filter_tracks(self, bucket_key: str, track_uris: Iterable[str], track_genres_dict: Dict[str, Sequence[int]]) -> List[str]:
+        """
+        Retire les titres incompatibles avec un bucket.
+
+        Args:
+            bucket_key: Clé du bucket cible
+            track_uris: URIs des titres candidats
+            track_genres_dict: Dictionnaire {track_uri: (IDs de genres)}
+
+        Returns:
+            Liste des URIs compatibles (ordre conservé)
+        """
+        bucket_mask = self._bucket_masks.get(bucket_key)
+        if not bucket_mask:
+            return list(track_uris)
+        track_mask = self._track_mask
+        return [
+            track_uri for track_uri in track_uris
+            if not track_mask(track_genres_dict.get(track_uri, ())) & bucket_mask
+        ]
+
+    def filter_scored(self, bucket_key: str, scored_tracks: List[Tuple[str, float]], track_genres_dict: Dict[str, Sequence[int]]) -> List[Tuple[str, float]]:
+        """Retire les titres incompatibles d'une liste (track_uri, score) (ordre conservé)."""
+        if not self.has_rules(bucket_key):
+            return scored_tracks
+        return [
+            (track_uri, score) for track_uri, score in scored_tracks
+            if self.is_compatible(bucket_key, track_genres_dict.get(track_uri, ()))
+        ]
+
+
+def load_incompatibility_rules() -> Dict:
+    """Contenu de incompatible_genres.json ({} si absent)."""
+    p = path_incompatible_genres()
+    if not p.exists():
+        return {}
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_incompatibility_rules() -> IncompatibilityRules:
+    """Règles compilées (recompilées si le fichier a changé)."""
+    global _rules, _rules_signature
+    p = path_incompatible_genres()
+    try:
+        st = p.stat()
+        signature: Optional[Tuple[int, int]] = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        signature = None
+    if _rules is None or signature != _rules_signature:
+        try:
+            _rules = IncompatibilityRules.from_data(load_incompatibility_rules())
+        except (ValueError, AttributeError) as e:
+            print(f"[!] Regles d'incompatibilite invalides ({p.name}), ignorees : {e}")
+            _rules = IncompatibilityRules({})
+        _rules_signature = signature
+    return _rules
@@ -0,0 +1,128 @@
+"""
+Écriture sûre des fichiers JSON (et binaires) de data/.
+
+Le contenu est d'abord écrit dans un fichier temporaire du même dossier, puis
+substitué à l'ancien fichier par `os.replace` (opération atomique) : une
+interruption pendant l'écriture laisse l'ancienne version intacte.
+
+Plusieurs commandes peuvent tourner en même temps (ex: --update depuis cron
+pendant un --train-model) : `file_lock` sérialise entre processus les
+séquences lecture → fusion → écriture d'un même fichier, via un fichier
+`<nom>.lock` (fcntl sous Unix, msvcrt sous Windows).
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+LOCK_RETRY_DELAY = 0.05  # Attente entre deux tentatives de verrouillage sous Windows (secondes)
+
+
+def lock_path(path) -> Path:
+    """Fichier de verrou associé à `path`."""
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Verrou exclusif inter-processus sur `path` (bloquant).
+
+    Le verrou porte sur un fichier `<nom>.lock` à côté de `path`, jamais
+    remplacé : il reste valable quand `path` est substitué par `os.replace`.
+    Il n'est pas réentrant : ne pas l'imbriquer sur le même fichier.
+    """
+    p = lock_path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(p, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(LOCK_RETRY_DELAY)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_json(path, default=None):
+    """Lit un fichier JSON (`default` s'il est absent ou illisible)."""
+    path = Path(path)
+    if not path.exists():
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+def _atomic_write(path, write, mode):
+    """Écrit via `write(f)` dans un fichier temporaire puis le substitue à `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """
+    Écrit `data` en JSON dans `path` de manière atomique.
+
+    Args:
+        path: Fichier de destination
+        data: Données sérialisables en JSON
+        **dump_kwargs: Options passées à `json.dump` (indent, separators, ...)
+    """
+    _atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False, **dump_kwargs), "w")
+
+
+def atomic_write_bytes(path, data: bytes):
+    """Écrit `data` (octets) dans `path` de manière atomique."""
+    _atomic_write(path, lambda f: f.write(data), "wb")
+
+
+def update_json(path, merge, default=None, **dump_kwargs):
+    """
+    Fusionne des données dans un fichier JSON partagé entre processus.
+
+    Sous `file_lock`, relit la version sur disque, calcule
+    `merge(version_sur_disque)` puis l'écrit atomiquement : les écritures
+    des autres processus ne sont pas écrasées.
+
+    Args:
+        path: Fichier à mettre à jour
+        merge: Fonction (contenu actuel ou `default`) -> nouveau contenu
+        default: Contenu utilisé si le fichier est absent ou illisible
+        **dump_kwargs: Options passées à `json.dump`
+
+    Returns:
+        Le contenu écrit
+    """
+    with file_lock(path):
+        data = merge(read_json(path, default))
+        atomic_write_json(path, data, **dump_kwargs)
+    return data
@@ -0,0 +1,198 @@
+"""
+Miroir local de la bibliothèque de titres likés.
+
+Le fichier library_mirror.json conserve, pour chaque titre liké : URI, date
+d'ajout (added_at), IDs des artistes, nom et ISRC, du plus récent au plus ancien.
+
+- Synchronisation incrémentale : seules les pages plus récentes que le dernier
+  `added_at` connu sont téléchargées (même principe d'arrêt anticipé que
+  update_playlists.get_new_liked_tracks).
+- Détection des titres retirés : le `total` de la première page est comparé à
+  la taille du miroir, plus les items indisponibles (sans URI, comptés par
+  l'API mais absents du miroir ; mémorisés par `added_at` pour n'être
+  comptés qu'une fois) ; en cas d'écart, ou si la dernière vérification
+  complète est trop ancienne, la bibliothèque est entièrement relue.
+"""
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .credentials import sp
+from .jsonio import atomic_write_json, file_lock
+from .pagination import iter_saved_track_pages, DEFAULT_PAGE_WORKERS
+from .paths import path_library_mirror
+
+
+MIRROR_VERSION = 1
+FULL_CHECK_INTERVAL = 7 * 24 * 3600  # Relecture complète au moins une fois par semaine (secondes)
+
+
+def _create_empty_mirror() -> Dict:
+    """Crée une structure de miroir vide."""
+    return {
+        "version": MIRROR_VERSION,
+        "synced_at": 0,
+        "checked_at": 0,
+        "unavailable": [],  # added_at des items sans titre exploitable (comptés dans le total de l'API)
+        "tracks": []  # [{uri, added_at, artist_ids, name, isrc}], du plus récent au plus ancien
+    }
+
+
+def load_library_mirror() -> Dict:
+    """Charge le miroir depuis le fichier (miroir vide si absent ou incompatible)."""
+    p = path_library_mirror()
+    if not p.exists():
+        return _create_empty_mirror()
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MIRROR_VERSION:
+            return data
+    except Exception as e:
+        print(f"[!] Erreur lors du chargement du miroir de la bibliotheque: {e}")
+    return _create_empty_mirror()
+
+
+def save_library_mirror(mirror: Dict):
+    """Sauvegarde le miroir (JSON compact : le fichier peut contenir des dizaines de milliers de titres)."""
+    p = path_library_mirror()
+    with file_lock(p):
+        atomic_write_json(p, mirror, separators=(",", ":"))
+
+
+def _parse_added_at(value: Optional[str]) -> Optional[datetime]:
+    """Convertit une date ISO de l'API en datetime (None si absente ou invalide)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def entry_from_item(item: Dict) -> Optional[Dict]:
+    """Construit une entrée du miroir à partir d'un item de current_user_saved_tracks."""
+    track = item.get("track") or {}
+    if not track.get("uri"):
+        return None
+    return {
+        "uri": track["uri"],
+        "added_at": item.get("added_at"),
+        "artist_ids": [artist["id"] for artist in track.get("artists", []) if artist.get("id")],
+        "name": track.get("name"),
+        "isrc": (track.get("external_ids") or {}).get("isrc"),
+    }
+
+
+def _full_scan(workers: int):
+    """
+    Relit toute la bibliothèque (pages en parallèle).
+
+    Returns:
+        Tuple (entrées, added_at des items indisponibles)
+    """
+    entries = []
+    unavailable = []
+    for page in iter_saved_track_pages(workers=workers):
+        for item in page.get("items", []):
+            entry = entry_from_item(item)
+            if entry:
+                entries.append(entry)
+            else:
+                unavailable.append(item.get("added_at"))
+    return entries, unavailable
+
+
+def _fetch_newer(tracks: List[Dict], unavailable: List[Optional[str]]):
+    """
+    Télécharge les titres likés plus récents que le miroir, page par page.
+
+    Args:
+        tracks: Entrées du miroir
+        unavailable: added_at des items indisponibles déjà comptés
+
+    Returns:
+        Tuple (nouvelles entrées, added_at des nouveaux items indisponibles, total annoncé par l'API)
+    """
+    known_uris = {entry["uri"] for entry in tracks}
+    known_unavailable = set(unavailable)
+    newest = _parse_added_at(tracks[0]["added_at"]) if tracks else None
+
+    new_entries = []
+    new_unavailable = []
+    total = None
+    results = sp.current_user_saved_tracks(limit=50)
+    should_stop = False
+    while results and not should_stop:
+        if total is None:
+            total = results.get("total")
+        for item in results["items"]:
+            entry = entry_from_item(item)
+            added_at = _parse_added_at(item.get("added_at"))
+            # Les titres sont triés par date décroissante : on s'arrête au premier titre déjà connu
+            if newest and added_at and added_at < newest:
+                should_stop = True
+                break
+            if not entry:
+                # Item indisponible plus récent que le miroir : ne le compter qu'une fois
+                if item.get("added_at") not in known_unavailable:
+                    new_unavailable.append(item.get("added_at"))
+                continue
+            if newest and added_at == newest and entry["uri"] in known_uris:
+                should_stop = True
+                break
+            new_entries.append(entry)
+        if not should_stop:
+            results = sp.next(results) if results.get("next") else None
+    return new_entries, new_unavailable, total
+
+
+def sync_library(full: bool = False, workers: int = DEFAULT_PAGE_WORKERS) -> List[Dict]:
+    """
+    Synchronise le miroir avec la bibliothèque Spotify et retourne ses entrées.
+
+    Args:
+        full: Si True, force une relecture complète de la bibliothèque
+        workers: Nombre de pages demandées simultanément lors d'une relecture complète
+
+    Returns:
+        Liste des entrées {uri, added_at, artist_ids, name, isrc}, du plus récent au plus ancien
+    """
+    mirror = load_library_mirror()
+    now = time.time()
+
+    if not full and not mirror["tracks"]:
+        print("[*] Miroir de la bibliotheque vide : lecture complete")
+        full = True
+    elif not full and now - mirror.get("checked_at", 0) > FULL_CHECK_INTERVAL:
+        print("[*] Derniere verification complete trop ancienne : lecture complete")
+        full = True
+
+    if not full:
+        new_entries, new_unavailable, total = _fetch_newer(mirror["tracks"], mirror.get("unavailable", []))
+        unavailable = new_unavailable + mirror.get("unavailable", [])
+        if new_entries:
+            new_uris = {entry["uri"] for entry in new_entries}
+            # Un titre re-liké remonte en tête : retirer son ancienne entrée
+            tracks = new_entries + [entry for entry in mirror["tracks"] if entry["uri"] not in new_uris]
+        else:
+            tracks = mirror["tracks"]
+        # Le total de l'API compte aussi les items sans titre exploitable
+        if total is not None and total != len(tracks) + len(unavailable):
+            print(f"[*] Ecart avec la bibliotheque ({len(tracks)} en local + {len(unavailable)} indisponible(s), "
+                  f"{total} sur Spotify) : lecture complete")
+            full = True
+        else:
+            mirror["tracks"] = tracks
+            mirror["unavailable"] = unavailable
+            if new_entries:
+                print(f"[*] Miroir de la bibliotheque : {len(new_entries)} nouveau(x) titre(s)")
+
+    if full:
+        mirror["tracks"], mirror["unavailable"] = _full_scan(workers)
+        mirror["checked_at"] = now
+
+    mirror["synced_at"] = now
+    save_library_mirror(mirror)
+    return mirror["tracks"]
@@ -0,0 +1,224 @@
+"""
+Mesures du cache des genres et des appels à l'API, par exécution et cumulées.
+
+- `LatencyHistogram` : histogramme des latences par endpoint (rempli par le
+  limiteur de débit), fusionnable d'une exécution à l'autre ; les centiles
+  sont donnés par la borne supérieure de leur intervalle
+- `CacheMetrics` : compteurs de `GenreCache` (succès / échecs de cache,
+  entrées périmées servies, octets et temps de sauvegarde)
+- cache_metrics.json : dernière exécution ("last_run") et cumul depuis la
+  première mesure ("cumulative"), mis à jour en fin d'exécution (voir
+  `save_run_metrics`) ; affichés par `--cache-stats`
+
+Ces mesures permettent de savoir si une exécution lente vient de l'API
+(appels, 429, latence) ou du cache (taux de succès, sauvegardes).
+"""
+import bisect
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .jsonio import read_json, update_json
+from .paths import path_cache_metrics
+
+
+# Bornes supérieures des intervalles de l'histogramme (millisecondes) ; au-delà : dernier intervalle
+LATENCY_BOUNDS_MS = (10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000, 10000, 30000)
+PERCENTILES = (50, 90, 99)
+
+CACHE_COUNTERS = (
+    "track_hits",  # Titres servis depuis le cache
+    "track_misses",  # Titres à résoudre via l'API
+    "negative_hits",  # Titres non résolus récemment, pas redemandés
+    "artist_hits",  # Artistes trouvés en cache
+    "artist_misses",  # Artistes récupérés via l'API
+    "stale_hits",  # Lectures d'artistes périmés (servis puis rafraîchis en arrière-plan)
+    "saves",  # Sauvegardes ayant écrit des modifications
+    "bytes_written",  # Octets écrits par les sauvegardes
+)
+
+
+class LatencyHistogram:
+    """Histogramme de latences à intervalles fixes (`LATENCY_BOUNDS_MS`)."""
+
+    def __init__(self, counts: Optional[List[int]] = None, total_ms: float = 0.0):
+        self.counts = list(counts) if counts else [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.total_ms = total_ms
+
+    def add(self, seconds: float):
+        """Enregistre une latence (secondes)."""
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(LATENCY_BOUNDS_MS, ms)] += 1
+        self.total_ms += ms
+
+    def merge(self, other: "LatencyHistogram"):
+        """Ajoute les mesures d'un autre histogramme."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total_ms += other.total_ms
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Borne supérieure (ms) de l'intervalle contenant le centile `q` (None si vide, inf au-delà)."""
+        total = self.count
+        if not total:
+            return None
+        rank = q / 100 * total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BOUNDS_MS[index] if index < len(LATENCY_BOUNDS_MS) else float("inf")
+        return float("inf")
+
+    def summary(self) -> Dict:
+        """Nombre de mesures, moyenne et centiles (ms)."""
+        total = self.count
+        summary = {"count": total, "mean_ms": round(self.total_ms / total, 1) if total else None}
+        for q in PERCENTILES:
+            summary[f"p{q}_ms"] = self.percentile(q)
+        return summary
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "total_ms": round(self.total_ms, 3)}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        counts = data.get("counts")
+        if not counts or len(counts) != len(LATENCY_BOUNDS_MS) + 1:
+            # Intervalles différents (ancienne version) : repartir de zéro
+            return cls()
+        return cls(counts, data.get("total_ms", 0.0))
+
+
+class CacheMetrics:
+    """
+    Compteurs d'une instance de `GenreCache` pour l'exécution en cours.
+
+    Mis à jour uniquement par le thread propriétaire du cache (comme les
+    écritures dans le cache).
+    """
+
+    def __init__(self):
+        self.counters = dict.fromkeys(CACHE_COUNTERS, 0)
+        self.save_seconds = 0.0
+
+    def add(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def record_save(self, bytes_written: int, seconds: float):
+        """Comptabilise une sauvegarde (octets écrits, durée)."""
+        self.counters["saves"] += 1
+        self.counters["bytes_written"] += bytes_written
+        self.save_seconds += seconds
+
+    def has_activity(self) -> bool:
+        return any(self.counters.values())
+
+    def to_dict(self) -> Dict:
+        data = dict(self.counters)
+        data["save_seconds"] = round(self.save_seconds, 3)
+        return data
+
+
+def _hit_rate(hits: int, misses: int) -> Optional[float]:
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def build_run_record(cache: Dict, api: Dict) -> Dict:
+    """
+    Enregistrement d'une exécution.
+
+    Args:
+        cache: `CacheMetrics.to_dict()`
+        api: `RateLimitedSpotify.stats()` (latences incluses)
+    """
+    return {
+        "finished_at": time.time(),
+        "command": " ".join(sys.argv[1:]),
+        "cache": cache,
+        "api": {
+            "calls": api.get("calls", 0),
+            "calls_by_endpoint": api.get("calls_by_endpoint", {}),
+            "throttled": api.get("throttled", 0),
+            "waited_seconds": api.get("waited_seconds", 0.0),
+            "latency": api.get("latency", {}),
+        },
+    }
+
+
+def _add_run(cumulative: Dict, run: Dict) -> Dict:
+    """Ajoute une exécution au cumul."""
+    cumulative = dict(cumulative or {})
+    cumulative.setdefault("since", run["finished_at"])
+    cumulative["runs"] = cumulative.get("runs", 0) + 1
+    cache = dict(cumulative.get("cache", {}))
+    for name, value in run["cache"].items():
+        cache[name] = round(cache.get(name, 0) + value, 3)
+    cumulative["cache"] = cache
+    api = dict(cumulative.get("api", {}))
+    for name in ("calls", "throttled", "waited_seconds"):
+        api[name] = round(api.get(name, 0) + run["api"][name], 3)
+    by_endpoint = dict(api.get("calls_by_endpoint", {}))
+    for endpoint, calls in run["api"]["calls_by_endpoint"].items():
+        by_endpoint[endpoint] = by_endpoint.get(endpoint, 0) + calls
+    api["calls_by_endpoint"] = by_endpoint
+    latency = dict(api.get("latency", {}))
+    for endpoint, data in run["api"]["latency"].items():
+        histogram = LatencyHistogram.from_dict(latency.get(endpoint, {}))
+        histogram.merge(LatencyHistogram.from_dict(data))
+        latency[endpoint] = histogram.to_dict()
+    api["latency"] = latency
+    cumulative["api"] = api
+    return cumulative
+
+
+def save_run_metrics(run: Dict):
+    """Enregistre une exécution dans cache_metrics.json (dernière exécution + cumul, sous verrou)."""
+    def merge(stored):
+        stored = stored or {}
+        return {"last_run": run, "cumulative": _add_run(stored.get("cumulative"), run)}
+
+    try:
+        update_json(path_cache_metrics(), merge, default={}, separators=(",", ":"))
+    except Exception as e:
+        print(f"[!] Erreur lors de la sauvegarde des mesures du cache: {e}")
+
+
+def load_metrics() -> Dict:
+    """Contenu de cache_metrics.json ({} si absent)."""
+    return read_json(path_cache_metrics(), {}) or {}
+
+
+def format_metrics(record: Dict) -> List[str]:
+    """Lignes d'affichage d'une exécution ou du cumul."""
+    cache = record.get("cache", {})
+    api = record.get("api", {})
+    track_rate = _hit_rate(cache.get("track_hits", 0) + cache.get("negative_hits", 0), cache.get("track_misses", 0))
+    artist_rate = _hit_rate(cache.get("artist_hits", 0), cache.get("artist_misses", 0))
+    lines = [
+        f"  Titres : {cache.get('track_hits', 0)} en cache, {cache.get('negative_hits', 0)} negatif(s), "
+        f"{cache.get('track_misses', 0)} manquant(s)"
+        + (f" (taux de succes {track_rate:.1%})" if track_rate is not None else ""),
+        f"  Artistes : {cache.get('artist_hits', 0)} en cache, {cache.get('artist_misses', 0)} manquant(s)"
+        + (f" (taux de succes {artist_rate:.1%})" if artist_rate is not None else "")
+        + f", {cache.get('stale_hits', 0)} lecture(s) d'entrees perimees",
+        f"  Sauvegardes : {cache.get('saves', 0)}, {cache.get('bytes_written', 0) / 1024:.1f} Ko ecrits "
+        f"en {cache.get('save_seconds', 0):.2f}s",
+        f"  API : {api.get('calls', 0)} requete(s), {api.get('throttled', 0)} limitation(s) 429, "
+        f"{api.get('waited_seconds', 0):.1f}s d'attente",
+    ]
+    latency = api.get("latency", {})
+    for endpoint, calls in sorted(api.get("calls_by_endpoint", {}).items(), key=lambda item: -item[1]):
+        line = f"    {endpoint}: {calls}"
+        if endpoint in latency:
+            summary = LatencyHistogram.from_dict(latency[endpoint]).summary()
+            if summary["count"]:
+                line += " | " + ", ".join(
+                    f"p{q} <= {summary[f'p{q}_ms']:g} ms" for q in PERCENTILES
+                ) + f" (moy. {summary['mean_ms']} ms)"
+        lines.append(line)
+    return lines
@@ -1,60 +1,41 @@
-from collections import defaultdict
 from .credentials import sp
+import asyncio
 import json
-import os
-import time
 import sys
-from pathlib import Path
 
-from .paths import DIR_GENRES, path_weights, path_last_update
+from .paths import path_weights
+from .playlist_membership import get_membership
+from .playlist_catalog import invalidate_catalog
+from .incompatibility import IncompatibilityRules, get_incompatibility_rules
+from .taxonomy import get_taxonomy, invalidate_taxonomy
+from .classification import classify_tracks
 
 # Les fonctions get_liked_tracks() et analyze_genres() sont définies dans main.py
 # Elles peuvent être passées en paramètres pour éviter les imports circulaires
 
-def load_class_genres():
-    """Charge les fichiers de genres et collecte tous les genres par classe."""
-    genres_dir = DIR_GENRES
-    class_data = []
-    
-    print("\n[*] Chargement des fichiers de genres...")
-    for json_file in sorted(genres_dir.glob("classe_*.json")):
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                data["_file_path"] = json_file  # Garder le chemin du fichier
-                class_data.append(data)
-                print(f"  -> {json_file.name}: {data.get('class_label', 'N/A')}")
-        except Exception as e:
-            print(f"  [-] Erreur lors du chargement de {json_file.name}: {e}")
-    
-    print(f"[*] {len(class_data)} classe(s) chargee(s)\n")
-    
-    # Collecter tous les genres par classe et par bucket
-    class_genres = {}
-    for data in class_data:
-        class_label = data.get("class_label", "Unknown")
-        class_code = data.get("class_code", "?")
-        
-        # Collecter tous les genres de tous les buckets
-        all_genres = set()
-        genres_by_bucket = data.get("genres_by_bucket", {})
-        buckets = data.get("buckets", {})
-        
-        for bucket_genres in genres_by_bucket.values():
-            all_genres.update(bucket_genres)
-        
-        class_genres[class_label] = {
-            "code": class_code,
-            "genres": list(all_genres),
-            "genre_count": len(all_genres),
-            "data": data,  # Garder les données complètes pour pouvoir les modifier
-            "buckets": buckets,  # Garder les buckets avec leurs labels
-            "genres_by_bucket": genres_by_bucket  # Garder les genres par bucket
-        }
-        print(f"[*] Classe {class_code}: {class_label}")
-        print(f"    -> {len(all_genres)} genres differents")
-        print(f"    -> {len(buckets)} bucket(s) (sous-genres)")
-    
+def load_class_genres(verbose: bool = False):
+    """
+    Charge les classes de genres depuis la taxonomie compilée (voir taxonomy.py).
+
+    Les fichiers data/genres/classe_*.json ne sont relus et recompilés que
+    s'ils ont changé ; chaque appel retourne une copie modifiable.
+
+    Args:
+        verbose: Si True, affiche le détail de chaque classe
+
+    Returns:
+        {class_label: {"code", "genres", "genre_count", "data", "buckets", "genres_by_bucket"}}
+    """
+    taxonomy = get_taxonomy()
+    class_genres = taxonomy.class_genres_dict()
+
+    print(f"[*] {len(class_genres)} classe(s) chargee(s), {len(taxonomy.all_genres)} genres")
+    if verbose:
+        for class_label, class_info in class_genres.items():
+            print(f"[*] Classe {class_info['code']}: {class_label}")
+            print(f"    -> {class_info['genre_count']} genres differents")
+            print(f"    -> {len(class_info['buckets'])} bucket(s) (sous-genres)")
+
     return class_genres
 
 
@@ -114,6 +95,7 @@ def add_genre_to_class(class_genres, genre, class_label, bucket_key=None):
             save_data = {k: v for k, v in class_data.items() if k != "_file_path"}
             with open(file_path, "w", encoding="utf-8") as f:
                 json.dump(save_data, f, ensure_ascii=False, indent=2)
+            invalidate_taxonomy()
             print(f"  [+] Genre '{genre}' ajoute a la classe '{class_label}' (bucket {bucket_key})")
             print(f"     Fichier sauvegarde : {file_path.name}")
             return True
@@ -228,57 +210,25 @@ def handle_unknown_genres(genre_dict, class_genres):
 
 def get_incompatible_genres():
     """
-    Définit les genres incompatibles pour chaque bucket/classe.
+    Genres incompatibles pour chaque bucket/classe (data/incompatible_genres.json, groupes développés).
     Un titre avec un genre incompatible sera exclu de la playlist correspondante.
+    
+    Returns:
+        Dictionnaire {bucket_key: set de genres (minuscules)}
     """
-    return {
-        # Classe 4 - Musiques électroniques
-        "4.3": {  # House
-            "rap", "hip hop", "french rap", "rap francais", "trap", "drill", 
-            "gangster rap", "conscious hip hop", "underground hip hop",
-            "alternative hip hop", "cloud rap", "emo rap", "hardcore hip hop",
-            "country rap", "rap rock", "rap metal", "jazz rap", "hip house"
-        },
-        "4.4": {  # Techno / Trance / Hardcore
-            "rap", "hip hop", "french rap", "rap francais", "trap", "drill",
-            "gangster rap", "conscious hip hop", "underground hip hop",
-            "alternative hip hop", "cloud rap", "emo rap", "hardcore hip hop",
-            "country rap", "rap rock", "rap metal"
-        },
-        "4.6": {  # Electronica / Glitch / IDM
-            "rap", "hip hop", "french rap", "rap francais", "trap", "drill",
-            "gangster rap", "conscious hip hop", "underground hip hop",
-            "alternative hip hop", "cloud rap", "emo rap", "hardcore hip hop",
-            "country rap", "rap rock", "rap metal"
-        },
-        "4.7": {  # Jungle / Drum & Bass
-            "rap", "hip hop", "french rap", "rap francais", "trap", "drill",
-            "gangster rap", "conscious hip hop", "underground hip hop",
-            "alternative hip hop", "cloud rap", "emo rap", "hardcore hip hop",
-            "country rap", "rap rock", "rap metal"
-        },
-        "4.8": {  # Eurodance / Dance
-            "rap", "hip hop", "french rap", "rap francais", "trap", "drill",
-            "gangster rap", "conscious hip hop", "underground hip hop",
-            "alternative hip hop", "cloud rap", "emo rap", "hardcore hip hop",
-            "country rap", "rap rock", "rap metal"
-        },
-        # Classe 1 - Musiques d'influence afro-américaine
-        "1.5": {  # Hip hop, Rap
-            "house", "deep house", "tech house", "progressive house", "techno",
-            "trance", "drum and bass", "jungle", "dubstep", "edm", "hardstyle"
-        },
-        # Ajouter d'autres incompatibilités si nécessaire
-    }
+    return {bucket_key: set(genres) for bucket_key, genres in get_incompatibility_rules().genres_by_bucket.items()}
 
 
 def filter_incompatible_tracks(track_uris, track_genres_dict, incompatible_genres_set):
     """
     Filtre les titres qui ont des genres incompatibles.
     
+    Les règles des buckets sont déjà compilées : préférer
+    `get_incompatibility_rules().filter_tracks(bucket_key, ...)`.
+    
     Args:
         track_uris: Liste des URIs de pistes à filtrer
-        track_genres_dict: Dictionnaire {track_uri: [genres]}
+        track_genres_dict: Dictionnaire {track_uri: (IDs de genres)}
         incompatible_genres_set: Set de genres incompatibles
     
     Returns:
@@ -286,24 +236,65 @@ def filter_incompatible_tracks(track_uris, track_genres_dict, incompatible_genre
     """
     if not incompatible_genres_set:
         return track_uris
+    rules = IncompatibilityRules({None: {genre.lower() for genre in incompatible_genres_set}})
+    return rules.filter_tracks(None, track_uris, track_genres_dict)
+
+
+def playlist_description(playlist_info):
+    """Description Spotify d'une playlist auto (par classe ou par bucket)."""
+    if playlist_info["type"] == "class":
+        return f"Playlist auto-generee pour la classe {playlist_info['class_code']}: {playlist_info['class_label']}"
+    return f"Playlist auto-generee pour le sous-genre {playlist_info['bucket_key']} ({playlist_info['bucket_label']}) de la classe {playlist_info['class_code']}"
+
+
+async def create_playlists_async(all_playlists, user_id):
+    """
+    Crée les playlists en parallèle avec le client asynchrone.
     
-    filtered_tracks = []
-    for track_uri in track_uris:
-        track_genres = track_genres_dict.get(track_uri, [])
-        # Convertir en minuscules pour la comparaison
-        track_genres_lower = [g.lower() for g in track_genres]
-        incompatible_lower = {g.lower() for g in incompatible_genres_set}
-        
-        # Vérifier si le titre a des genres incompatibles
-        has_incompatible = any(genre in incompatible_lower for genre in track_genres_lower)
-        
-        if not has_incompatible:
-            filtered_tracks.append(track_uri)
+    Les playlists sont créées simultanément (sous le limiteur partagé) ; les
+    lots de 100 titres d'une même playlist restent ajoutés dans l'ordre.
+    
+    Args:
+        all_playlists: Liste des playlists à créer (voir create_playlists_by_class)
+        user_id: ID Spotify de l'utilisateur
+    
+    Returns:
+        Nombre de playlists créées avec succès
+    """
+    from .async_client import AsyncSpotify
     
-    return filtered_tracks
+    total = len(all_playlists)
+    membership = get_membership()
+    async with AsyncSpotify() as asp:
+        async def create_one(idx, playlist_info):
+            try:
+                playlist = await asp.user_playlist_create(
+                    user=user_id,
+                    name=playlist_info["playlist_name"],
+                    public=False,
+                    description=playlist_description(playlist_info)
+                )
+                membership.set(playlist["id"], playlist.get("snapshot_id"), [])
+                track_uris = playlist_info["track_uris"]
+                for i in range(0, len(track_uris), 100):
+                    batch = track_uris[i:i+100]
+                    result = await asp.playlist_add_items(playlist["id"], batch)
+                    membership.record_added(playlist["id"], batch, (result or {}).get("snapshot_id"))
+                print(f"  [{idx}/{total}] [+] Playlist creee : {playlist_info['playlist_name']} ({len(track_uris)} titres)")
+                return True
+            except Exception as e:
+                print(f"  [{idx}/{total}] [-] Erreur lors de la creation de {playlist_info['playlist_name']}: {e}")
+                return False
+        
+        results = await asyncio.gather(
+            *(create_one(idx, playlist_info) for idx, playlist_info in enumerate(all_playlists, 1))
+        )
+    membership.save()
+    invalidate_catalog()
+    return sum(results)
 
 
-def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze_genres_func=None, use_scoring=False):
+def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze_genres_func=None, use_scoring=False, use_async=False):
     """
     Crée des playlists par classe selon la nomenclature française.
     
@@ -312,6 +303,7 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
         get_liked_tracks_func: Fonction pour récupérer les titres likés
         analyze_genres_func: Fonction pour analyser les genres
         use_scoring: Si True, utilise le système de scoring pondéré au lieu du filtrage simple
+        use_async: Si True, crée les playlists en parallèle via le client asynchrone (aiohttp)
     """
     # Récupère ton user_id
     user_id = sp.current_user()["id"]
@@ -342,8 +334,8 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
             print("[!] Retour au mode filtrage simple")
             use_scoring = False
     
-    # Charger les genres incompatibles (utilisé si use_scoring=False)
-    incompatible_genres = get_incompatible_genres()
+    # Charger les règles d'incompatibilité (filtrage simple comme scoring)
+    incompatibility_rules = get_incompatibility_rules()
     
     # Utiliser les fonctions passées en paramètres ou les importer depuis main
     if get_liked_tracks_func is None or analyze_genres_func is None:
@@ -361,9 +353,10 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
     # Détecter et gérer les genres inconnus (peut modifier class_genres)
     handle_unknown_genres(genre_dict, class_genres)
     
-    # Associer les chansons aux classes et aux buckets (sous-genres)
+    # Associer les chansons aux classes et aux buckets (sous-genres) en un seul passage
     # Note : Un titre peut apparaître dans plusieurs playlists si ses genres correspondent à plusieurs classes/buckets
     print("[*] Association des chansons aux classes et sous-genres...")
+    classification = classify_tracks(track_genres_dict)
     class_playlists = []
     bucket_playlists = []
     
@@ -372,14 +365,8 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
         class_code = class_info["code"]
         target_genres = class_info["genres"]
         
-        # Trouver toutes les chansons correspondant aux genres de cette classe
-        # Utilisation d'un set() pour éviter les doublons dans la même playlist
-        track_uris = set()
-        for genre in target_genres:
-            if genre in genre_dict:
-                track_uris.update(genre_dict[genre])
-        
-        track_uris_list = list(track_uris)
+        # Chansons correspondant aux genres de cette classe (sans doublons)
+        track_uris_list = list(classification.tracks_for_class(class_label))
         
         # Ne créer que les playlists avec au moins 3 titres
         if len(track_uris_list) < 3:
@@ -406,6 +393,9 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
     
     # Playlists par bucket (sous-genre)
     print("\n[*] Association des chansons aux sous-genres (buckets)...")
+    if use_scoring and scoring_model:
+        # Scores de tous les buckets en une seule passe (les poids sont déjà chargés)
+        bucket_scores = scoring_model.score_all_buckets(track_genres_dict, threshold=0.5)
     for class_label, class_info in class_genres.items():
         class_code = class_info["code"]
         buckets = class_info.get("buckets", {})
@@ -419,18 +409,13 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
             if not bucket_genres:
                 continue
             
-            # Trouver toutes les chansons correspondant aux genres de ce bucket
-            track_uris = set()
-            for genre in bucket_genres:
-                if genre in genre_dict:
-                    track_uris.update(genre_dict[genre])
+            # Chansons correspondant aux genres de ce bucket
+            track_uris = classification.tracks_for_bucket(bucket_key)
             
             if use_scoring and scoring_model:
-                # Utiliser le système de scoring pondéré
-                # Les poids sont déjà chargés au début
-                scored_tracks = scoring_model.score_tracks_for_bucket(
-                    track_genres_dict, bucket_key, threshold=0.5
-                )
+                # Utiliser le système de scoring pondéré, sans les titres incompatibles
+                candidates = bucket_scores.get(bucket_key, [])
+                scored_tracks = incompatibility_rules.filter_scored(bucket_key, candidates, track_genres_dict)
                 track_uris_list = [uri for uri, score in scored_tracks]
                 
                 if scored_tracks:
@@ -439,17 +424,13 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
                     print(f"     Score moyen: {avg_score:.3f}, Score max: {max_score:.3f}")
             else:
                 # Filtrer les titres incompatibles (méthode simple)
-                incompatible_genres_set = incompatible_genres.get(bucket_key, set())
-                track_uris_list = filter_incompatible_tracks(
-                    list(track_uris), 
-                    track_genres_dict, 
-                    incompatible_genres_set
-                )
-                
-                # Afficher le nombre de titres filtrés si des incompatibilités sont définies
-                if incompatible_genres_set and len(track_uris_list) < len(track_uris):
-                    filtered_count = len(track_uris) - len(track_uris_list)
-                    print(f"     ({filtered_count} titre(s) exclu(s) pour incompatibilite de genres)")
+                candidates = track_uris
+                track_uris_list = incompatibility_rules.filter_tracks(bucket_key, track_uris, track_genres_dict)
+            
+            # Afficher le nombre de titres filtrés si des incompatibilités sont définies
+            if len(track_uris_list) < len(candidates):
+                filtered_count = len(candidates) - len(track_uris_list)
+                print(f"     ({filtered_count} titre(s) exclu(s) pour incompatibilite de genres)")
             
             # Ne créer que les playlists avec au moins 3 titres
             if len(track_uris_list) < 3:
@@ -504,51 +485,40 @@ def create_playlists_by_class(confirm=False, get_liked_tracks_func=None, analyze
     else:
         print(f"[*] Creation de {len(all_playlists)} playlist(s) en cours...\n")
         created_count = 0
-        for idx, playlist_info in enumerate(all_playlists, 1):
-            try:
-                # Crée la playlist
-                if playlist_info["type"] == "class":
-                    description = f"Playlist auto-generee pour la classe {playlist_info['class_code']}: {playlist_info['class_label']}"
-                else:  # bucket
-                    description = f"Playlist auto-generee pour le sous-genre {playlist_info['bucket_key']} ({playlist_info['bucket_label']}) de la classe {playlist_info['class_code']}"
-                
-                playlist = sp.user_playlist_create(
-                    user=user_id,
-                    name=playlist_info["playlist_name"],
-                    public=False,
-                    description=description
-                )
-                
-                # Ajoute les morceaux par lots de 100 (limite API)
-                track_uris = playlist_info["track_uris"]
-                for i in range(0, len(track_uris), 100):
-                    batch = track_uris[i:i+100]
-                    sp.playlist_add_items(playlist["id"], batch)
-                    time.sleep(0.2)  # Anti rate-limit
-                
-                created_count += 1
-                print(f"  [{idx}/{len(all_playlists)}] [+] Playlist creee : {playlist_info['playlist_name']} ({len(track_uris)} titres)")
-                time.sleep(0.2)  # Anti rate-limit
-            except Exception as e:
-                print(f"  [{idx}/{len(all_playlists)}] [-] Erreur lors de la creation de {playlist_info['playlist_name']}: {e}")
+        if use_async:
+            created_count = asyncio.run(create_playlists_async(all_playlists, user_id))
+        else:
+            membership = get_membership()
+            for idx, playlist_info in enumerate(all_playlists, 1):
+                try:
+                    # Crée la playlist
+                    playlist = sp.user_playlist_create(
+                        user=user_id,
+                        name=playlist_info["playlist_name"],
+                        public=False,
+                        description=playlist_description(playlist_info)
+                    )
+                    
+                    # Ajoute les morceaux par lots de 100 (limite API)
+                    membership.set(playlist["id"], playlist.get("snapshot_id"), [])
+                    track_uris = playlist_info["track_uris"]
+                    for i in range(0, len(track_uris), 100):
+                        batch = track_uris[i:i+100]
+                        result = sp.playlist_add_items(playlist["id"], batch)
+                        membership.record_added(playlist["id"], batch, (result or {}).get("snapshot_id"))
+                    
+                    created_count += 1
+                    print(f"  [{idx}/{len(all_playlists)}] [+] Playlist creee : {playlist_info['playlist_name']} ({len(track_uris)} titres)")
+                except Exception as e:
+                    print(f"  [{idx}/{len(all_playlists)}] [-] Erreur lors de la creation de {playlist_info['playlist_name']}: {e}")
+            membership.save()
+            invalidate_catalog()
         
         print(f"\n[+] Termine. {created_count}/{len(all_playlists)} playlist(s) creee(s) avec succes.")
         
         # Sauvegarder la date de dernière mise à jour
-        from datetime import datetime, timezone
-        import json
-        try:
-            last_update_file = path_last_update()
-            last_update_file.parent.mkdir(parents=True, exist_ok=True)
-            current_time = datetime.now(timezone.utc)
-            data = {
-                "last_update": current_time.isoformat()
-            }
-            with open(last_update_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-            print(f"[*] Date de derniere mise a jour sauvegardee : {current_time.isoformat()}")
-        except Exception as e:
-            print(f"[!] Erreur lors de la sauvegarde de la date : {e}")
+        from .update_playlists import save_last_update_date
+        save_last_update_date()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+"""
+Pagination parallèle des endpoints Spotify paginés par offset.
+
+La première page renvoie le `total` : tous les offsets suivants sont alors
+connus et peuvent être demandés en parallèle (sous le limiteur de débit
+partagé), au lieu de suivre les liens `next` un par un.
+
+Les artistes suivis sont paginés par curseur (`after`) : leurs pages sont
+forcément lues l'une après l'autre.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator
+
+from .credentials import sp
+
+
+DEFAULT_PAGE_WORKERS = 8  # Nombre de pages demandées simultanément
+
+
+def iter_pages(fetch_page: Callable[..., Dict], limit: int, workers: int = DEFAULT_PAGE_WORKERS) -> Iterator[Dict]:
+    """
+    Parcourt toutes les pages d'un endpoint paginé par offset.
+
+    Args:
+        fetch_page: Fonction `fetch_page(limit=..., offset=...)` renvoyant une page
+        limit: Taille de page (maximum autorisé par l'endpoint)
+        workers: Nombre de pages demandées simultanément après la première
+
+    Yields:
+        Les pages, dans l'ordre des offsets
+    """
+    first = fetch_page(limit=limit, offset=0)
+    yield first
+    total = first.get("total") or 0
+    offsets = list(range(limit, total, limit))
+    if not offsets:
+        return
+
+    def fetch(offset):
+        return fetch_page(limit=limit, offset=offset)
+
+    if workers <= 1:
+        for offset in offsets:
+            yield fetch(offset)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(offsets))) as executor:
+        yield from executor.map(fetch, offsets)
+
+
+def iter_saved_track_pages(workers: int = DEFAULT_PAGE_WORKERS) -> Iterator[Dict]:
+    """Parcourt toutes les pages des titres likés (50 par page), dans l'ordre."""
+    return iter_pages(sp.current_user_saved_tracks, limit=50, workers=workers)
+
+
+def iter_followed_artists() -> Iterator[Dict]:
+    """Parcourt les artistes suivis par l'utilisateur (objets complets, genres inclus ; scope user-follow-read)."""
+    after = None
+    while True:
+        page = sp.current_user_followed_artists(limit=50, after=after)["artists"]
+        yield from (artist for artist in page.get("items", []) if artist)
+        after = (page.get("cursors") or {}).get("after")
+        if not page.get("next") or not after:
+            return
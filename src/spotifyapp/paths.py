@@ -20,6 +20,11 @@ def path_weights(class_code: str, bucket_key: str) -> Path:
     return DIR_DATA / name
 
 
+def path_weights_bin(weights_file) -> Path:
+    """Chemin de l'instantané binaire associé à un fichier de poids JSON."""
+    return Path(weights_file).with_suffix(".bin")
+
+
 def path_last_update() -> Path:
     """Chemin du fichier de dernière mise à jour des playlists."""
     return DIR_DATA / "last_update.json"
@@ -40,6 +45,56 @@ def path_genre_cache() -> Path:
     return DIR_DATA / "genre_cache.json"
 
 
+def path_genre_cache_db() -> Path:
+    """Chemin de la base SQLite du cache des genres (backend par défaut)."""
+    return DIR_DATA / "genre_cache.db"
+
+
+def path_genre_cache_journal() -> Path:
+    """Chemin du journal du cache des genres (backend journal, instantané à côté)."""
+    return DIR_DATA / "genre_cache.log"
+
+
+def path_genre_cache_bin() -> Path:
+    """Chemin de l'instantané binaire du cache des genres (backend binary, journal à côté)."""
+    return DIR_DATA / "genre_cache.bin"
+
+
+def path_genre_cache_export() -> Path:
+    """Chemin par défaut de l'export portable du cache des genres (--export-cache)."""
+    return DIR_DATA / "genre_cache_export.json.gz"
+
+
+def path_incompatible_genres() -> Path:
+    """Chemin des règles d'incompatibilité des genres par bucket."""
+    return DIR_DATA / "incompatible_genres.json"
+
+
+def path_taxonomy_cache() -> Path:
+    """Chemin de la taxonomie des genres compilée (générée depuis data/genres/)."""
+    return DIR_DATA / "taxonomy.pickle"
+
+
+def path_cache_metrics() -> Path:
+    """Chemin des mesures du cache et de l'API (dernière exécution + cumul)."""
+    return DIR_DATA / "cache_metrics.json"
+
+
+def path_library_mirror() -> Path:
+    """Chemin du miroir local des titres likés."""
+    return DIR_DATA / "library_mirror.json"
+
+
+def path_playlist_membership() -> Path:
+    """Chemin du miroir du contenu des playlists (indexé par snapshot_id)."""
+    return DIR_DATA / "playlist_membership.json"
+
+
+def path_playlist_catalog() -> Path:
+    """Chemin du catalogue partagé des playlists de l'utilisateur."""
+    return DIR_DATA / "playlist_catalog.json"
+
+
 def path_id_client() -> Path:
     """Chemin du fichier des identifiants Spotify (CLIENT_ID, etc.)."""
     return DIR_CONFIG / "ID_client.txt"
@@ -3,11 +3,14 @@ Cache des playlists (auto) et sélection "staged" pour mise à jour partielle (m
 
 - playlist_cache.json : liste des playlists (auto) connues (nom -> id, etc.)
 - staged_playlists.json : noms des playlists à mettre à jour lors du prochain --update
+
+playlist_cache.json est écrit sous verrou inter-processus, de manière atomique.
 """
 import json
 from pathlib import Path
 
-from .credentials import sp
+from .jsonio import update_json
+from .playlist_catalog import get_user_playlists
 from .paths import path_playlist_cache, path_staged_playlists
 
 
@@ -16,7 +19,7 @@ def load_playlist_cache():
     Charge le cache des playlists depuis le fichier.
 
     Returns:
-        dict: {playlist_name: {"id": ..., "tracks_count": ...}} ou {} si absent
+        dict: {playlist_name: {"id": ..., "tracks_count": ..., "snapshot_id": ...}} ou {} si absent
     """
     p = path_playlist_cache()
     if not p.exists():
@@ -28,12 +31,23 @@ def load_playlist_cache():
         return {}
 
 
-def save_playlist_cache(cache):
-    """Sauvegarde le cache des playlists."""
-    p = path_playlist_cache()
-    p.parent.mkdir(parents=True, exist_ok=True)
-    with open(p, "w", encoding="utf-8") as f:
-        json.dump(cache, f, indent=2, ensure_ascii=False)
+def save_playlist_cache(cache, replace=True):
+    """
+    Sauvegarde le cache des playlists.
+
+    Args:
+        cache: {playlist_name: {...}}
+        replace: Si True (liste complète, ex: refresh), remplace le contenu du fichier ;
+            sinon fusionne ces entrées avec celles écrites par d'autres processus
+    """
+    def merge(stored):
+        if replace:
+            return cache
+        merged = dict(stored or {})
+        merged.update(cache)
+        return merged
+
+    return update_json(path_playlist_cache(), merge, default={}, indent=2)
 
 
 def refresh_playlist_cache(suffix="(auto)"):
@@ -45,13 +59,9 @@ def refresh_playlist_cache(suffix="(auto)"):
         suffix: filtre sur le nom (par défaut "(auto)")
 
     Returns:
-        dict: cache {playlist_name: {"id": ..., "tracks_count": ...}}
+        dict: cache {playlist_name: {"id": ..., "tracks_count": ..., "snapshot_id": ...}}
     """
-    playlists = []
-    results = sp.current_user_playlists(limit=50)
-    while results:
-        playlists.extend(results["items"])
-        results = sp.next(results) if results.get("next") else None
+    playlists = get_user_playlists()
 
     cache = {}
     for pl in playlists:
@@ -61,6 +71,7 @@ def refresh_playlist_cache(suffix="(auto)"):
         cache[name] = {
             "id": pl.get("id"),
             "tracks_count": pl.get("tracks", {}).get("total", 0),
+            "snapshot_id": pl.get("snapshot_id"),
         }
     save_playlist_cache(cache)
     return cache
@@ -0,0 +1,141 @@
+"""
+Catalogue partagé des playlists de l'utilisateur.
+
+Toutes les commandes lisent la liste des playlists (`current_user_playlists`)
+via ce module :
+
+- mémoïsation en mémoire : une exécution ne liste les playlists qu'une seule fois
+- playlist_catalog.json : copie sur disque réutilisée tant qu'elle a moins de
+  `CATALOG_MAX_AGE` secondes
+- `invalidate_catalog()` après toute modification (création, ajout, unfollow)
+- `find_playlist(name)` : recherche par nom en O(1) via un index nom → playlist
+  (exact puis normalisé), construit une fois par catalogue
+"""
+import json
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+from .credentials import sp
+from .jsonio import update_json
+from .pagination import iter_pages
+from .paths import path_playlist_catalog
+
+
+CATALOG_MAX_AGE = 300  # Durée de validité de la copie sur disque (secondes)
+
+# Catalogue chargé pendant cette exécution
+_catalog = None
+# Index des noms du catalogue : (nom exact → playlist, nom normalisé → playlist)
+_name_index = None
+
+
+def _load_catalog_file():
+    """Charge la copie sur disque du catalogue (None si absente ou illisible)."""
+    p = path_playlist_catalog()
+    if not p.exists():
+        return None
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _save_catalog_file(catalog: Dict):
+    """
+    Sauvegarde la copie sur disque du catalogue (écriture atomique sous verrou).
+
+    Si un autre processus a enregistré entre-temps un catalogue plus récent,
+    celui-ci est conservé.
+    """
+    def merge(current):
+        if isinstance(current, dict) and current.get("fetched_at", 0) > catalog["fetched_at"]:
+            return current
+        return catalog
+
+    try:
+        update_json(path_playlist_catalog(), merge, separators=(",", ":"))
+    except Exception as e:
+        print(f"[!] Erreur lors de la sauvegarde du catalogue des playlists: {e}")
+
+
+def get_user_playlists(max_age: float = CATALOG_MAX_AGE, force: bool = False) -> List[Dict]:
+    """
+    Retourne toutes les playlists de l'utilisateur.
+
+    Args:
+        max_age: Âge maximal (secondes) de la copie sur disque pour être réutilisée
+        force: Si True, relit la liste depuis l'API
+
+    Returns:
+        Liste des objets playlists (format de `current_user_playlists`)
+    """
+    global _catalog, _name_index
+    if _catalog is not None and not force:
+        return _catalog["playlists"]
+
+    if not force:
+        catalog = _load_catalog_file()
+        if catalog and time.time() - catalog.get("fetched_at", 0) <= max_age:
+            _catalog = catalog
+            return _catalog["playlists"]
+
+    playlists = []
+    for results in iter_pages(sp.current_user_playlists, limit=50):
+        playlists.extend(item for item in results["items"] if item)
+    _catalog = {"fetched_at": time.time(), "playlists": playlists}
+    _name_index = None
+    _save_catalog_file(_catalog)
+    return playlists
+
+
+def normalize_playlist_name(name: str) -> str:
+    """Normalise un nom de playlist (Unicode NFKC, casse, espaces multiples)."""
+    return " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+
+
+def _build_name_index(playlists: List[Dict]):
+    """Construit les index nom exact / nom normalisé (la première playlist d'un nom l'emporte)."""
+    by_name = {}
+    by_normalized = {}
+    for playlist in playlists:
+        name = playlist.get("name") or ""
+        by_name.setdefault(name, playlist)
+        by_normalized.setdefault(normalize_playlist_name(name), playlist)
+    return by_name, by_normalized
+
+
+def find_playlist(name: str) -> Optional[Dict]:
+    """
+    Trouve une playlist du catalogue par son nom.
+
+    Le nom exact est cherché en premier, puis sa forme normalisée
+    (`normalize_playlist_name`). L'index est construit une seule fois par
+    catalogue et reconstruit après `invalidate_catalog()`.
+
+    Returns:
+        Objet playlist, ou None si aucune playlist ne porte ce nom
+    """
+    global _name_index
+    playlists = get_user_playlists()
+    if _name_index is None:
+        _name_index = _build_name_index(playlists)
+    by_name, by_normalized = _name_index
+    playlist = by_name.get(name)
+    if playlist is None:
+        playlist = by_normalized.get(normalize_playlist_name(name))
+    return playlist
+
+
+def invalidate_catalog():
+    """Invalide le catalogue (mémoire et disque) après une modification des playlists."""
+    global _catalog, _name_index
+    _catalog = None
+    _name_index = None
+    p = path_playlist_catalog()
+    try:
+        if p.exists():
+            p.unlink()
+    except OSError as e:
+        print(f"[!] Erreur lors de l'invalidation du catalogue des playlists: {e}")
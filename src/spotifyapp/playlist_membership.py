@@ -0,0 +1,171 @@
+"""
+Miroir local du contenu des playlists, indexé par `snapshot_id`.
+
+Spotify change le `snapshot_id` d'une playlist à chaque modification : tant
+qu'il est identique à celui enregistré, le contenu local est exact et la
+playlist n'a pas besoin d'être relue. Après nos propres `playlist_add_items`,
+le miroir est mis à jour localement avec le nouveau `snapshot_id` renvoyé par
+l'API.
+
+- playlist_membership.json : {playlist_id: {"snapshot_id": ..., "uris": [...]}}
+
+Le fichier est partagé par les commandes lancées en même temps (--update,
+--train-model) : chaque sauvegarde ne réécrit que les playlists modifiées
+par ce processus, par-dessus la version sur disque (voir `jsonio.update_json`).
+"""
+import json
+from typing import Dict, Iterable, Optional, Set
+
+from .credentials import sp
+from .jsonio import update_json
+from .pagination import iter_pages
+from .paths import path_playlist_membership
+
+
+class PlaylistMembership:
+    """Gère le miroir du contenu des playlists."""
+
+    def __init__(self, membership_file=None):
+        """
+        Initialise le miroir.
+
+        Args:
+            membership_file: Chemin du fichier (défaut: depuis paths)
+        """
+        self.membership_file = membership_file or path_playlist_membership()
+        self.playlists = self._load()
+        # IDs des playlists modifiées ou retirées depuis la dernière sauvegarde
+        self._changed: Set[str] = set()
+
+    def _load(self) -> Dict:
+        """Charge le miroir depuis le fichier."""
+        if not self.membership_file.exists():
+            return {}
+        try:
+            with open(self.membership_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[!] Erreur lors du chargement du miroir des playlists: {e}")
+            return {}
+
+    def save(self):
+        """
+        Sauvegarde le miroir s'il a été modifié.
+
+        Seules les playlists modifiées par ce processus remplacent celles du
+        fichier ; les autres entrées du fichier (écrites par un autre
+        processus) sont conservées et reprises en mémoire.
+        """
+        if not self._changed:
+            return
+
+        def merge(current: Dict) -> Dict:
+            if not isinstance(current, dict):
+                current = {}
+            for playlist_id in self._changed:
+                if playlist_id in self.playlists:
+                    current[playlist_id] = self.playlists[playlist_id]
+                else:
+                    current.pop(playlist_id, None)
+            return current
+
+        try:
+            self.playlists = update_json(self.membership_file, merge, default={}, separators=(",", ":"))
+            self._changed.clear()
+        except Exception as e:
+            print(f"[!] Erreur lors de la sauvegarde du miroir des playlists: {e}")
+
+    def get(self, playlist_id: str, snapshot_id: Optional[str]) -> Optional[Set[str]]:
+        """
+        Retourne le contenu connu d'une playlist si son snapshot est à jour.
+
+        Returns:
+            Set des URIs, ou None si la playlist est inconnue ou a changé
+        """
+        entry = self.playlists.get(playlist_id)
+        if entry is None or not snapshot_id or entry.get("snapshot_id") != snapshot_id:
+            return None
+        return set(entry["uris"])
+
+    def set(self, playlist_id: str, snapshot_id: Optional[str], uris: Iterable[str]):
+        """Enregistre le contenu complet d'une playlist pour un snapshot donné."""
+        if not snapshot_id:
+            return
+        self.playlists[playlist_id] = {"snapshot_id": snapshot_id, "uris": list(uris)}
+        self._changed.add(playlist_id)
+
+    def record_added(self, playlist_id: str, uris: Iterable[str], snapshot_id: Optional[str]):
+        """
+        Met à jour localement une playlist après un `playlist_add_items`.
+
+        Args:
+            playlist_id: ID de la playlist
+            uris: URIs ajoutés
+            snapshot_id: Nouveau snapshot_id renvoyé par l'API
+        """
+        entry = self.playlists.get(playlist_id)
+        if entry is None:
+            return
+        if not snapshot_id:
+            # Snapshot inconnu : le contenu local ne peut plus être garanti
+            del self.playlists[playlist_id]
+        else:
+            entry["uris"].extend(uris)
+            entry["snapshot_id"] = snapshot_id
+        self._changed.add(playlist_id)
+
+    def forget(self, playlist_id: str):
+        """Retire une playlist du miroir (ex. après unfollow)."""
+        if self.playlists.pop(playlist_id, None) is not None:
+            self._changed.add(playlist_id)
+
+
+def fetch_playlist_snapshot(playlist_id: str) -> Optional[str]:
+    """Récupère le snapshot_id courant d'une playlist (requête légère)."""
+    return sp.playlist(playlist_id, fields="snapshot_id").get("snapshot_id")
+
+
+def get_playlist_uris(playlist_id: str, snapshot_id: Optional[str] = None, membership=None) -> Set[str]:
+    """
+    Retourne les URIs des titres d'une playlist, sans la relire si elle n'a pas changé.
+
+    Args:
+        playlist_id: ID de la playlist
+        snapshot_id: snapshot_id courant s'il est connu (sinon une requête légère le récupère)
+        membership: Miroir à utiliser (défaut: instance globale)
+
+    Returns:
+        Set des URIs des titres
+    """
+    membership = membership or get_membership()
+    if snapshot_id is None:
+        snapshot_id = fetch_playlist_snapshot(playlist_id)
+
+    uris = membership.get(playlist_id, snapshot_id)
+    if uris is not None:
+        return uris
+
+    uris = set()
+
+    def fetch_page(limit, offset):
+        return sp.playlist_items(playlist_id, fields="items(track(uri)),total", limit=limit, offset=offset)
+
+    for results in iter_pages(fetch_page, limit=100):
+        for item in results.get("items", []):
+            track = item.get("track")
+            if track:
+                uris.add(track.get("uri"))
+    membership.set(playlist_id, snapshot_id, uris)
+    return uris
+
+
+# Instance globale du miroir
+_membership_instance = None
+
+
+def get_membership() -> PlaylistMembership:
+    """Retourne l'instance globale du miroir des playlists."""
+    global _membership_instance
+    if _membership_instance is None:
+        _membership_instance = PlaylistMembership()
+    return _membership_instance
@@ -0,0 +1,325 @@
+"""
+Limiteur de débit partagé pour les appels à l'API Spotify.
+
+Remplace les `time.sleep` dispersés dans le code par un seau à jetons (token
+bucket) adaptatif placé autour du client `spotipy.Spotify` :
+
+- deux budgets séparés : lectures (GET) et écritures (création, ajout, unfollow)
+- respect de l'en-tête `Retry-After` des réponses 429 (pause partagée par tous les appels)
+- backoff exponentiel avec jitter lorsque l'en-tête est absent
+- débit adaptatif : divisé par deux à chaque 429, puis remonte progressivement
+- compteurs et latences par endpoint consultables à tout moment via `stats()`
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from spotipy.exceptions import SpotifyException
+from urllib3.util.retry import Retry
+
+from .metrics import LatencyHistogram
+
+
+# Méthodes spotipy qui modifient le compte (budget "write")
+WRITE_METHODS = frozenset({
+    "user_playlist_create",
+    "playlist_add_items",
+    "playlist_remove_all_occurrences_of_items",
+    "playlist_replace_items",
+    "playlist_change_details",
+    "current_user_unfollow_playlist",
+    "current_user_follow_playlist",
+    "current_user_saved_tracks_add",
+    "current_user_saved_tracks_delete",
+})
+
+# Méthodes du client qui ne déclenchent pas de requête HTTP
+LOCAL_METHODS = frozenset({"set_auth"})
+
+# Erreurs serveur retentées au niveau transport (les 429 sont laissés au limiteur)
+TRANSPORT_RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def build_session(retries: int = 3, backoff_factor: float = 0.3) -> requests.Session:
+    """
+    Session HTTP pour `spotipy.Spotify(requests_session=...)`.
+
+    Reprend la configuration de spotipy (nouvelles tentatives sur les erreurs
+    de connexion et les 5xx) sans jamais retenter un 429 : urllib3 respecte
+    sinon `Retry-After` de lui-même, en dehors du limiteur partagé. Le 429
+    remonte ainsi en `SpotifyException` jusqu'à `RateLimitedSpotify`.
+    """
+    retry = Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=TRANSPORT_RETRY_STATUSES,
+        respect_retry_after_header=False,
+        # Après la dernière tentative, renvoyer la réponse (spotipy lève l'erreur HTTP réelle)
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class TokenBucket:
+    """
+    Seau à jetons thread-safe avec débit adaptatif (AIMD).
+
+    Le débit est divisé par deux à chaque limitation (429) sans descendre sous
+    `min_rate`, puis remonte de `recovery` jeton/s à chaque succès jusqu'à `max_rate`.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_rate: float = 0.5, recovery: float = 0.05):
+        """
+        Initialise le seau.
+
+        Args:
+            rate: Débit maximal (jetons par seconde)
+            capacity: Nombre de jetons maximal (taille des rafales)
+            min_rate: Débit plancher après limitations successives
+            recovery: Augmentation du débit (jetons/s) après chaque succès
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min(min_rate, rate)
+        self.recovery = recovery
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Ajoute les jetons accumulés depuis le dernier passage."""
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self) -> float:
+        """
+        Tente de consommer un jeton sans attendre.
+
+        Returns:
+            0 si un jeton a été consommé, sinon le délai (secondes) avant de réessayer
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> float:
+        """
+        Consomme un jeton, en attendant si nécessaire.
+
+        Returns:
+            Temps total d'attente (secondes)
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def block(self, delay: float):
+        """Suspend tous les appels de ce budget pendant `delay` secondes et réduit le débit."""
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def on_success(self):
+        """Remonte progressivement le débit après un appel réussi."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.recovery)
+
+
+class RateLimitedSpotify:
+    """
+    Enveloppe un client `spotipy.Spotify` et fait passer chaque appel par le limiteur.
+
+    Toutes les méthodes du client restent accessibles (`sp.track`, `sp.next`, ...).
+    """
+
+    def __init__(
+        self,
+        client,
+        read_rate: float = 10.0,
+        read_burst: float = 10.0,
+        write_rate: float = 2.0,
+        write_burst: float = 5.0,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ):
+        """
+        Initialise le client limité.
+
+        Args:
+            client: Instance `spotipy.Spotify`
+            read_rate: Débit maximal des lectures (requêtes/s)
+            read_burst: Rafale maximale de lectures
+            write_rate: Débit maximal des écritures (requêtes/s)
+            write_burst: Rafale maximale d'écritures
+            max_retries: Nombre maximal de nouvelles tentatives après un 429
+            base_delay: Délai initial du backoff exponentiel (secondes)
+            max_delay: Délai maximal du backoff exponentiel (secondes)
+        """
+        self._client = client
+        self._buckets = {
+            "read": TokenBucket(read_rate, read_burst),
+            "write": TokenBucket(write_rate, write_burst),
+        }
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._stats_lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._latency = defaultdict(LatencyHistogram)
+        self._budget_calls = defaultdict(int)
+        self._throttled = 0
+        self._retries = 0
+        self._waited = 0.0
+
+    @property
+    def client(self):
+        """Client `spotipy.Spotify` sous-jacent (sans limitation)."""
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in LOCAL_METHODS or not callable(attr):
+            return attr
+        budget = "write" if name in WRITE_METHODS else "read"
+
+        def limited(*args, **kwargs):
+            return self._call(name, budget, attr, args, kwargs)
+
+        limited.__name__ = name
+        limited.__doc__ = getattr(attr, "__doc__", None)
+        return limited
+
+    def bucket(self, budget: str) -> TokenBucket:
+        """Seau à jetons d'un budget ("read" ou "write"), partagé avec le client asynchrone."""
+        return self._buckets[budget]
+
+    @property
+    def max_retries(self) -> int:
+        """Nombre maximal de nouvelles tentatives après un 429."""
+        return self._max_retries
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Délai avant la prochaine tentative : Retry-After si fourni, sinon backoff exponentiel avec jitter."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.5)
+        cap = min(self._max_delay, self._base_delay * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def record_call(self, name: str, budget: str, waited: float):
+        """Comptabilise un appel (utilisé aussi par le client asynchrone)."""
+        with self._stats_lock:
+            self._calls[name] += 1
+            self._budget_calls[budget] += 1
+            self._waited += waited
+
+    def record_latency(self, name: str, seconds: float):
+        """Comptabilise la durée d'une requête, attente du limiteur exclue (utilisé aussi par le client asynchrone)."""
+        with self._stats_lock:
+            self._latency[name].add(seconds)
+
+    def record_throttle(self):
+        """Comptabilise un 429 suivi d'une nouvelle tentative."""
+        with self._stats_lock:
+            self._throttled += 1
+            self._retries += 1
+
+    def record_retry(self):
+        """Comptabilise une nouvelle tentative après une erreur serveur ou réseau (client asynchrone)."""
+        with self._stats_lock:
+            self._retries += 1
+
+    def _call(self, name, budget, func, args, kwargs):
+        """Exécute un appel en respectant le budget et en gérant les 429."""
+        bucket = self._buckets[budget]
+        attempt = 0
+        while True:
+            self.record_call(name, budget, bucket.acquire())
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except SpotifyException as e:
+                if e.http_status != 429 or attempt >= self._max_retries:
+                    raise
+                bucket.block(self.backoff_delay(attempt, _retry_after(e)))
+                self.record_throttle()
+                attempt += 1
+                continue
+            finally:
+                self.record_latency(name, time.perf_counter() - started)
+            bucket.on_success()
+            return result
+
+    def stats(self) -> Dict:
+        """
+        Retourne les compteurs courants du limiteur.
+
+        Returns:
+            Dictionnaire avec le nombre d'appels (total, par budget, par méthode),
+            les 429 reçus, les nouvelles tentatives, le temps d'attente cumulé,
+            le débit courant de chaque budget et l'histogramme des latences
+            par méthode (voir metrics.LatencyHistogram).
+        """
+        with self._stats_lock:
+            return {
+                "calls": sum(self._calls.values()),
+                "calls_by_budget": dict(self._budget_calls),
+                "calls_by_endpoint": dict(self._calls),
+                "throttled": self._throttled,
+                "retries": self._retries,
+                "waited_seconds": round(self._waited, 3),
+                "rates": {name: round(bucket.rate, 2) for name, bucket in self._buckets.items()},
+                "latency": {name: histogram.to_dict() for name, histogram in self._latency.items()},
+            }
+
+    def format_stats(self) -> str:
+        """Résumé des compteurs sur une ligne."""
+        stats = self.stats()
+        budgets = stats["calls_by_budget"]
+        return (
+            f"{stats['calls']} requete(s) API ({budgets.get('read', 0)} lecture(s), "
+            f"{budgets.get('write', 0)} ecriture(s)), {stats['throttled']} limitation(s) 429, "
+            f"{stats['waited_seconds']:.1f}s d'attente"
+        )
+
+
+def _retry_after(error: SpotifyException) -> Optional[float]:
+    """Extrait l'en-tête Retry-After (en secondes) d'une erreur 429, si présent."""
+    return parse_retry_after(getattr(error, "headers", None))
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Lit l'en-tête Retry-After (en secondes) d'un dictionnaire d'en-têtes HTTP."""
+    headers = headers or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,171 @@
+"""
+Scoring de tous les buckets en une seule passe.
+
+Les scores de `GenreScoringModel` forment un produit de matrices creuses :
+(titres × genres, 1 si le titre a le genre) @ (genres × buckets, poids du
+genre du bucket correspondant au genre du titre). Tous les buckets sont
+scorés d'un coup au lieu d'appeler `score_tracks_for_bucket` par bucket.
+
+- les titres sont regroupés par tuple de genres (un groupe par artiste, en
+  pratique) : une ligne de la matrice par groupe
+- avec NumPy/SciPy (pip install "spotifyapp[fast]") : produit creux et
+  seuils vectorisés
+- sinon : même calcul en Python pur, ligne par ligne (genres présents
+  seulement)
+
+Les résultats sont identiques à `score_tracks_for_bucket` (mêmes titres,
+même ordre), aux arrondis de la somme près.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # Dépendances optionnelles
+    np = None
+    sparse = None
+
+
+def is_available() -> bool:
+    """Indique si le calcul vectorisé est utilisable (NumPy et SciPy installés)."""
+    return sparse is not None
+
+
+def _group_tracks(track_genres_dict: Dict[str, Sequence[int]]):
+    """
+    Regroupe les titres par tuple de genres.
+
+    Returns:
+        Tuple (URIs des titres, indice du groupe de chaque titre, tuples de genres des groupes)
+    """
+    track_uris = []
+    track_groups = []
+    group_index: Dict[Tuple[int, ...], int] = {}
+    for track_uri, track_genres in track_genres_dict.items():
+        key = tuple(track_genres)
+        index = group_index.get(key)
+        if index is None:
+            index = group_index[key] = len(group_index)
+        track_uris.append(track_uri)
+        track_groups.append(index)
+    return track_uris, track_groups, list(group_index)
+
+
+def _genre_rows(model, bucket_keys: List[str], genre_ids: Iterable[int]) -> Dict[int, List[Tuple[int, float]]]:
+    """Lignes de la matrice genres × buckets : {genre_id: [(indice du bucket, poids)]} (valeurs non nulles)."""
+    rows: Dict[int, List[Tuple[int, float]]] = {genre_id: [] for genre_id in genre_ids}
+    for bucket_index, bucket_key in enumerate(bucket_keys):
+        weights = model.genre_weights[bucket_key]
+        for genre_id, row in rows.items():
+            # Première correspondance (exacte ou partielle), comme score_track
+            bucket_genre = model._genre_matches(bucket_key, genre_id)[0]
+            if bucket_genre is not None and weights[bucket_genre]:
+                row.append((bucket_index, weights[bucket_genre]))
+    return rows
+
+
+def _select(track_uris: List[str], track_scores, threshold: float) -> List[Tuple[str, float]]:
+    """Titres au-dessus du seuil, triés par score décroissant (ordre d'origine en cas d'égalité)."""
+    selected = [(track_uris[i], score) for i, score in enumerate(track_scores) if score >= threshold]
+    selected.sort(key=lambda x: x[1], reverse=True)
+    return selected
+
+
+def _score_numpy(track_uris, track_groups, groups, rows, n_buckets, threshold):
+    genre_column = {genre_id: column for column, genre_id in enumerate(rows)}
+
+    # Matrice titres (groupes) × genres
+    indptr = [0]
+    indices = []
+    for key in groups:
+        indices.extend(genre_column[genre_id] for genre_id in key)
+        indptr.append(len(indices))
+    incidence = sparse.csr_matrix(
+        (np.ones(len(indices)), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(groups), len(rows))
+    )
+
+    # Matrice genres × buckets (poids)
+    weight_rows, weight_cols, weight_values = [], [], []
+    for genre_id, row in rows.items():
+        for bucket_index, weight in row:
+            weight_rows.append(genre_column[genre_id])
+            weight_cols.append(bucket_index)
+            weight_values.append(weight)
+    weights = sparse.csr_matrix(
+        (np.array(weight_values, dtype=np.float64), (weight_rows, weight_cols)),
+        shape=(len(rows), n_buckets)
+    )
+
+    # Scores de chaque groupe pour chaque bucket, puis de chaque titre
+    group_scores = (incidence @ weights).toarray()
+    scores = group_scores[np.array(track_groups, dtype=np.int64)]
+
+    uris = np.array(track_uris, dtype=object)
+    results = []
+    for bucket_index in range(n_buckets):
+        column = scores[:, bucket_index]
+        selected = np.flatnonzero(column >= threshold)
+        order = selected[np.argsort(-column[selected], kind="stable")]
+        results.append(list(zip(uris[order].tolist(), column[order].tolist())))
+    return results
+
+
+def _score_python(track_uris, track_groups, groups, rows, n_buckets, threshold):
+    # Scores non nuls de chaque groupe : {indice du bucket: score}
+    group_scores = []
+    for key in groups:
+        totals: Dict[int, float] = {}
+        for genre_id in key:
+            for bucket_index, weight in rows[genre_id]:
+                totals[bucket_index] = totals.get(bucket_index, 0.0) + weight
+        group_scores.append(totals)
+
+    if threshold <= 0:
+        # Les scores nuls passent le seuil : tous les titres sont retenus
+        return [
+            _select(track_uris, [group_scores[group].get(bucket_index, 0.0) for group in track_groups], threshold)
+            for bucket_index in range(n_buckets)
+        ]
+
+    results = [[] for _ in range(n_buckets)]
+    for track_uri, group in zip(track_uris, track_groups):
+        for bucket_index, score in group_scores[group].items():
+            if score >= threshold:
+                results[bucket_index].append((track_uri, score))
+    for selected in results:
+        selected.sort(key=lambda x: x[1], reverse=True)
+    return results
+
+
+def score_all_buckets(
+    model,
+    track_genres_dict: Dict[str, Sequence[int]],
+    threshold: float = 0.5,
+    bucket_keys: Optional[Iterable[str]] = None
+) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Score tous les titres pour tous les buckets du modèle.
+
+    Args:
+        model: `GenreScoringModel` (poids chargés)
+        track_genres_dict: Dictionnaire {track_uri: (IDs de genres)}
+        threshold: Seuil minimum de score (défaut: 0.5)
+        bucket_keys: Buckets à scorer (défaut: tous ceux du modèle)
+
+    Returns:
+        {bucket_key: [(track_uri, score)] triés par score décroissant}, comme
+        `score_tracks_for_bucket` pour chaque bucket
+    """
+    if bucket_keys is None:
+        bucket_keys = list(model.genre_weights)
+    else:
+        bucket_keys = [bucket_key for bucket_key in bucket_keys if bucket_key in model.genre_weights]
+    if not bucket_keys:
+        return {}
+
+    track_uris, track_groups, groups = _group_tracks(track_genres_dict)
+    rows = _genre_rows(model, bucket_keys, {genre_id for key in groups for genre_id in key})
+    score = _score_numpy if is_available() else _score_python
+    results = score(track_uris, track_groups, groups, rows, len(bucket_keys), threshold)
+    return dict(zip(bucket_keys, results))
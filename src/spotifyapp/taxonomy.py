@@ -0,0 +1,221 @@
+"""
+Taxonomie des genres compilée (data/genres/classe_*.json).
+
+Les fichiers de classes sont lus et compilés une seule fois en un objet
+`Taxonomy` : ensembles de genres figés (frozenset) par classe et par bucket,
+et index inverses genre → classes / buckets.
+
+- mémoïsation en mémoire : `get_taxonomy()` ne relit les fichiers que s'ils
+  ont changé (taille, date de modification)
+- copie compilée sur disque (taxonomy.pickle) réutilisée par les exécutions
+  suivantes ; invalidée quand la taille ou la date d'un fichier source
+  change et que son contenu (sha256) diffère, ou quand la liste des fichiers
+  change
+- `invalidate_taxonomy()` après toute modification des fichiers (voir
+  music_genre.add_genre_to_class)
+"""
+import hashlib
+import json
+import pickle
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .jsonio import atomic_write_bytes
+from .paths import DIR_GENRES, path_taxonomy_cache
+
+
+TAXONOMY_VERSION = 1  # À incrémenter quand la structure de `Taxonomy` change
+
+# Taxonomie compilée pendant cette exécution
+_taxonomy = None
+
+
+class Taxonomy:
+    """
+    Classes et buckets de genres, compilés et figés.
+
+    Attributs :
+        class_codes: {class_label: class_code}
+        bucket_labels: {bucket_key: label du bucket}
+        bucket_class: {bucket_key: class_label}
+        genres_by_class: {class_label: frozenset des genres}
+        genres_by_bucket: {bucket_key: frozenset des genres}
+        classes_by_genre: {genre: frozenset des class_label}
+        buckets_by_genre: {genre: frozenset des bucket_key}
+        all_genres: frozenset de tous les genres connus
+        sources: [(nom, taille, mtime_ns, sha256)] des fichiers compilés
+    """
+
+    def __init__(self, class_data: List[Tuple[str, Dict]], sources: List[Tuple[str, int, int, str]]):
+        self.sources = sources
+        self._class_files: Dict[str, str] = {}
+        self.class_codes: Dict[str, str] = {}
+        self.bucket_labels: Dict[str, str] = {}
+        self.bucket_class: Dict[str, str] = {}
+        self.genres_by_class: Dict[str, FrozenSet[str]] = {}
+        self.genres_by_bucket: Dict[str, FrozenSet[str]] = {}
+
+        # Structure historique de load_class_genres, copiée à chaque appel (voir class_genres_dict)
+        legacy = {}
+        for file_name, data in class_data:
+            class_label = data.get("class_label", "Unknown")
+            class_code = data.get("class_code", "?")
+            genres_by_bucket = data.get("genres_by_bucket", {})
+            buckets = data.get("buckets", {})
+            all_genres = set()
+            for bucket_genres in genres_by_bucket.values():
+                all_genres.update(bucket_genres)
+
+            self.class_codes[class_label] = class_code
+            self._class_files[class_label] = file_name
+            self.genres_by_class[class_label] = frozenset(all_genres)
+            for bucket_key, bucket_genres in genres_by_bucket.items():
+                self.genres_by_bucket[bucket_key] = frozenset(bucket_genres)
+                self.bucket_class[bucket_key] = class_label
+            for bucket_key, bucket_label in buckets.items():
+                self.bucket_labels[bucket_key] = bucket_label
+                self.bucket_class.setdefault(bucket_key, class_label)
+
+            legacy[class_label] = {
+                "code": class_code,
+                "genres": list(all_genres),
+                "genre_count": len(all_genres),
+                "data": data,
+                "buckets": buckets,
+                "genres_by_bucket": genres_by_bucket
+            }
+        self._class_genres_blob = pickle.dumps(legacy, protocol=pickle.HIGHEST_PROTOCOL)
+
+        classes_by_genre: Dict[str, set] = {}
+        for class_label, genres in self.genres_by_class.items():
+            for genre in genres:
+                classes_by_genre.setdefault(genre, set()).add(class_label)
+        buckets_by_genre: Dict[str, set] = {}
+        for bucket_key, genres in self.genres_by_bucket.items():
+            for genre in genres:
+                buckets_by_genre.setdefault(genre, set()).add(bucket_key)
+        self.classes_by_genre = {genre: frozenset(labels) for genre, labels in classes_by_genre.items()}
+        self.buckets_by_genre = {genre: frozenset(keys) for genre, keys in buckets_by_genre.items()}
+        self.all_genres = frozenset(self.classes_by_genre)
+
+    def class_genres_dict(self) -> Dict:
+        """
+        Nouvelle copie modifiable du dictionnaire historique de `load_class_genres`.
+
+        {class_label: {"code", "genres", "genre_count", "data", "buckets", "genres_by_bucket"}},
+        où "data" contient aussi "_file_path" (utilisé par add_genre_to_class).
+        """
+        class_genres = pickle.loads(self._class_genres_blob)
+        for class_label, file_name in self._class_files.items():
+            class_genres[class_label]["data"]["_file_path"] = DIR_GENRES / file_name
+        return class_genres
+
+
+def _source_files() -> List[Path]:
+    return sorted(DIR_GENRES.glob("classe_*.json"))
+
+
+def _stat_signature(files: List[Path]) -> List[Tuple[str, int, int]]:
+    signature = []
+    for path in files:
+        st = path.stat()
+        signature.append((path.name, st.st_size, st.st_mtime_ns))
+    return signature
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _compile(files: List[Path]) -> Taxonomy:
+    """Lit et compile les fichiers de classes."""
+    class_data = []
+    sources = []
+    for json_file in files:
+        try:
+            content = json_file.read_bytes()
+            data = json.loads(content)
+        except Exception as e:
+            print(f"  [-] Erreur lors du chargement de {json_file.name}: {e}")
+            continue
+        class_data.append((json_file.name, data))
+        st = json_file.stat()
+        sources.append((json_file.name, st.st_size, st.st_mtime_ns, hashlib.sha256(content).hexdigest()))
+    return Taxonomy(class_data, sources)
+
+
+def _load_compiled(files: List[Path]) -> Optional[Taxonomy]:
+    """
+    Charge la taxonomie compilée sur disque si elle correspond aux fichiers sources.
+
+    Un fichier dont la taille ou la date a changé mais dont le contenu est
+    identique (ex: checkout git) ne l'invalide pas.
+    """
+    p = path_taxonomy_cache()
+    if not p.exists():
+        return None
+    try:
+        with open(p, "rb") as f:
+            stored = pickle.load(f)
+        if stored.get("version") != TAXONOMY_VERSION:
+            return None
+        taxonomy = stored["taxonomy"]
+    except Exception:
+        return None
+    if [source[0] for source in taxonomy.sources] != [path.name for path in files]:
+        return None
+    sources = []
+    for (name, size, mtime_ns, sha), (_, current_size, current_mtime) in zip(taxonomy.sources, _stat_signature(files)):
+        if (size, mtime_ns) != (current_size, current_mtime) and sha != _sha256(DIR_GENRES / name):
+            return None
+        sources.append((name, current_size, current_mtime, sha))
+    if sources != taxonomy.sources:
+        # Contenu inchangé : enregistrer les nouvelles dates pour ne plus recalculer les empreintes
+        taxonomy.sources = sources
+        _save_compiled(taxonomy)
+    return taxonomy
+
+
+def _save_compiled(taxonomy: Taxonomy):
+    try:
+        atomic_write_bytes(
+            path_taxonomy_cache(),
+            pickle.dumps({"version": TAXONOMY_VERSION, "taxonomy": taxonomy}, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+    except Exception as e:
+        print(f"[!] Erreur lors de la sauvegarde de la taxonomie compilee: {e}")
+
+
+def get_taxonomy() -> Taxonomy:
+    """
+    Retourne la taxonomie compilée (mémoire, puis copie sur disque, puis fichiers sources).
+
+    Returns:
+        Objet `Taxonomy` partagé : ne pas le modifier
+    """
+    global _taxonomy
+    files = _source_files()
+    signature = _stat_signature(files)
+    if _taxonomy is not None and [source[:3] for source in _taxonomy.sources] == signature:
+        return _taxonomy
+
+    taxonomy = _load_compiled(files)
+    if taxonomy is None:
+        taxonomy = _compile(files)
+        print(f"[*] Taxonomie des genres compilee ({len(taxonomy.class_codes)} classe(s), "
+              f"{len(taxonomy.all_genres)} genres)")
+        _save_compiled(taxonomy)
+    _taxonomy = taxonomy
+    return taxonomy
+
+
+def invalidate_taxonomy():
+    """Invalide la taxonomie compilée (mémoire et disque) après une modification des fichiers de classes."""
+    global _taxonomy
+    _taxonomy = None
+    p = path_taxonomy_cache()
+    try:
+        if p.exists():
+            p.unlink()
+    except OSError as e:
+        print(f"[!] Erreur lors de l'invalidation de la taxonomie compilee: {e}")
@@ -19,47 +19,34 @@ from .genre_scoring import (
     evaluate_model
 )
 from .paths import path_weights
+from .library_mirror import sync_library
+from .playlist_membership import get_membership, get_playlist_uris
+from .playlist_catalog import find_playlist
+from .cache_backends import backend_names, DEFAULT_BACKEND
+from .genre_cache import configure_cache, DEFAULT_MAX_AGE
+from .genre_table import genre_ids, genre_names
 
 
 def get_playlist_tracks(playlist_name: str) -> set:
     """Récupère les URIs des titres d'une playlist."""
-    playlists = sp.current_user_playlists(limit=50)
-    playlist_id = None
-    
-    while playlists:
-        for playlist in playlists["items"]:
-            if playlist["name"] == playlist_name:
-                playlist_id = playlist["id"]
-                break
-        if playlist_id:
-            break
-        playlists = sp.next(playlists) if playlists.get("next") else None
-    
-    if not playlist_id:
+    # Index des noms construit une seule fois par exécution (catalogue partagé)
+    playlist = find_playlist(playlist_name)
+    if not playlist:
         return set()
     
-    tracks = set()
-    results = sp.playlist_items(playlist_id, fields="items(track(uri)),next", limit=100)
-    while results:
-        for item in results.get("items", []):
-            track = item.get("track")
-            if track:
-                tracks.add(track.get("uri"))
-        results = sp.next(results) if results.get("next") else None
-    
-    return tracks
+    # Miroir local : la playlist n'est relue que si son snapshot_id a changé
+    return get_playlist_uris(playlist["id"], playlist.get("snapshot_id"))
+
+
+def get_liked_track_records(full_sync: bool = False) -> list:
+    """Récupère les enregistrements (uri, [artist_ids]) de tous les titres likés (miroir local)."""
+    from .genre_cache import track_records
+    return track_records(sync_library(full=full_sync))
 
 
 def get_all_liked_tracks() -> set:
     """Récupère tous les URIs des titres likés."""
-    tracks = set()
-    results = sp.current_user_saved_tracks(limit=50)
-    while results:
-        for item in results["items"]:
-            track = item["track"]
-            tracks.add(track["uri"])
-        results = sp.next(results) if results["next"] else None
-    return tracks
+    return {track_uri for track_uri, _ in get_liked_track_records()}
 
 
 def get_track_info(track_uri: str) -> dict:
@@ -80,7 +67,7 @@ def get_track_info(track_uri: str) -> dict:
         }
 
 
-def analyze_tracks_genres(track_uris: set, use_cache=True, force_refresh=False) -> dict:
+def analyze_tracks_genres(track_uris: set, use_cache=True, force_refresh=False, track_records=None, workers=1) -> dict:
     """
     Analyse les genres de tous les titres en utilisant le cache.
     
@@ -88,6 +75,8 @@ def analyze_tracks_genres(track_uris: set, use_cache=True, force_refresh=False)
         track_uris: Set des URIs des titres
         use_cache: Si True, utilise le cache
         force_refresh: Si True, force la mise à jour depuis l'API
+        track_records: Enregistrements (uri, [artist_ids]) déjà connus, évite un sp.track par titre
+        workers: Nombre de requêtes en parallèle pour les titres absents du cache
     """
     print("\n[*] Analyse des genres des titres...")
     
@@ -103,27 +92,38 @@ def analyze_tracks_genres(track_uris: set, use_cache=True, force_refresh=False)
         def progress_callback(idx, total):
             print(f"  -> {idx}/{total} titres analyses...")
         
-        track_genres_dict = cache.analyze_tracks_genres(
-            list(track_uris),
-            force_refresh=force_refresh,
-            progress_callback=progress_callback
-        )
+        if track_records is not None:
+            track_genres_dict = cache.analyze_track_records(
+                track_records,
+                force_refresh=force_refresh,
+                progress_callback=progress_callback,
+                workers=workers
+            )
+        else:
+            track_genres_dict = cache.analyze_tracks_genres(
+                list(track_uris),
+                force_refresh=force_refresh,
+                progress_callback=progress_callback,
+                workers=workers
+            )
     else:
         # Méthode originale sans cache
         track_genres_dict = {}
         artist_cache = {}
+        known_artists = dict(track_records) if track_records is not None else {}
         
         for idx, track_uri in enumerate(track_uris, 1):
-            # Récupérer les infos du titre
-            track = sp.track(track_uri.split(":")[-1])
-            artist_id = track["artists"][0]["id"]
+            # Récupérer les infos du titre (sauf si ses artistes sont déjà connus)
+            if known_artists.get(track_uri):
+                artist_id = known_artists[track_uri][0]
+            else:
+                track = sp.track(track_uri.split(":")[-1])
+                artist_id = track["artists"][0]["id"]
             
             if artist_id not in artist_cache:
-                artist_cache[artist_id] = sp.artist(artist_id)
+                artist_cache[artist_id] = genre_ids(sp.artist(artist_id).get("genres", ["Unknown"]))
             
-            artist_info = artist_cache[artist_id]
-            genres = artist_info.get("genres", ["Unknown"])
-            track_genres_dict[track_uri] = genres
+            track_genres_dict[track_uri] = artist_cache[artist_id]
             
             if idx % 50 == 0:
                 print(f"  -> {idx}/{len(track_uris)} titres analyses...")
@@ -141,15 +141,22 @@ def train_bucket_model(
     iterations: int = 100,
     learning_rate: float = 0.01,
     margin: float = 1.0,
-    save_tracks: bool = False
+    save_tracks: bool = False,
+    class_genres: dict = None
 ):
-    """Entraîne le modèle pour un bucket spécifique."""
+    """
+    Entraîne le modèle pour un bucket spécifique.
+
+    `class_genres` (depuis load_class_genres) peut être partagé entre les
+    buckets : il n'est pas modifié.
+    """
     print(f"\n{'='*80}")
     print(f"[*] Entrainement pour le bucket {bucket_key}: {bucket_label}")
     print(f"{'='*80}")
     
     # Créer le modèle
-    class_genres = load_class_genres()
+    if class_genres is None:
+        class_genres = load_class_genres()
     model = GenreScoringModel(class_genres)
     
     # Charger les poids existants si disponibles
@@ -185,7 +192,7 @@ def train_bucket_model(
     positive_tracks_list = []
     for idx, track_uri in enumerate(sorted(positive_tracks), 1):
         track_info = get_track_info(track_uri)
-        genres = track_genres_dict.get(track_uri, [])
+        genres = genre_names(track_genres_dict.get(track_uri, ()))
         genres_str = ", ".join(genres[:3]) + ("..." if len(genres) > 3 else "")
         print(f"    {idx:3d}. {track_info['name']} - {track_info['artists']}")
         print(f"        Genres: {genres_str}")
@@ -200,7 +207,7 @@ def train_bucket_model(
     negative_tracks_list = []
     for idx, track_uri in enumerate(sorted(negative_tracks), 1):
         track_info = get_track_info(track_uri)
-        genres = track_genres_dict.get(track_uri, [])
+        genres = genre_names(track_genres_dict.get(track_uri, ()))
         genres_str = ", ".join(genres[:3]) + ("..." if len(genres) > 3 else "")
         print(f"    {idx:3d}. {track_info['name']} - {track_info['artists']}")
         print(f"        Genres: {genres_str}")
@@ -279,8 +286,13 @@ def main():
     parser.add_argument("--save-tracks", action="store_true", help="Sauvegarder les listes de titres dans un fichier JSON")
     parser.add_argument("--no-cache", action="store_true", help="Desactiver l'utilisation du cache")
     parser.add_argument("--refresh-cache", action="store_true", help="Forcer la mise a jour du cache depuis l'API")
+    parser.add_argument("--sync-library", action="store_true", help="Relire entierement la bibliotheque (miroir local)")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de requetes paralleles pour les genres absents du cache")
+    parser.add_argument("--cache-backend", choices=backend_names(), default=DEFAULT_BACKEND, help="Stockage du cache des genres")
+    parser.add_argument("--cache-max-age", type=float, default=DEFAULT_MAX_AGE / (24 * 3600), help="Duree de validite des genres d'un artiste (jours, 0 = illimitee)")
     
     args = parser.parse_args()
+    configure_cache(backend=args.cache_backend, max_age=args.cache_max_age * 24 * 3600)
     
     if not args.bucket and not args.all_buckets:
         print("[!] Veuillez specifier --bucket ou --all-buckets")
@@ -288,13 +300,17 @@ def main():
     
     # Récupérer tous les titres likés
     print("[*] Recuperation des titres likes...")
-    all_tracks = get_all_liked_tracks()
+    liked_records = get_liked_track_records(full_sync=args.sync_library)
+    all_tracks = {track_uri for track_uri, _ in liked_records}
     print(f"[*] {len(all_tracks)} titres likes trouves")
     
     # Analyser les genres
     use_cache = not args.no_cache
     force_refresh = args.refresh_cache
-    track_genres_dict = analyze_tracks_genres(all_tracks, use_cache=use_cache, force_refresh=force_refresh)
+    track_genres_dict = analyze_tracks_genres(
+        all_tracks, use_cache=use_cache, force_refresh=force_refresh, track_records=liked_records,
+        workers=args.workers
+    )
     
     # Charger les classes de genres
     class_genres = load_class_genres()
@@ -315,7 +331,8 @@ def main():
                     iterations=args.iterations,
                     learning_rate=args.learning_rate,
                     margin=args.margin,
-                    save_tracks=args.save_tracks
+                    save_tracks=args.save_tracks,
+                    class_genres=class_genres
                 )
     else:
         # Entraîner un bucket spécifique
@@ -337,13 +354,16 @@ def main():
                     all_tracks,
                     iterations=args.iterations,
                     learning_rate=args.learning_rate,
-                    margin=args.margin
+                    margin=args.margin,
+                    class_genres=class_genres
                 )
                 bucket_found = True
                 break
         
         if not bucket_found:
             print(f"[!] Bucket '{bucket_key}' introuvable")
+    
+    get_membership().save()
 
 
 if __name__ == "__main__":
@@ -3,13 +3,20 @@ Script de mise à jour des playlists avec les nouveaux titres likés depuis la d
 """
 import sys
 import json
-import time
+import asyncio
 from datetime import datetime, timezone
 from pathlib import Path
 from collections import defaultdict
 from .credentials import sp
-from .music_genre import load_class_genres, get_incompatible_genres, filter_incompatible_tracks
+from .music_genre import load_class_genres
+from .incompatibility import get_incompatibility_rules
 from .paths import path_last_update
+from .jsonio import update_json
+from .library_mirror import sync_library
+from .playlist_membership import get_membership, get_playlist_uris
+from .playlist_catalog import find_playlist, invalidate_catalog
+from .genre_table import genre_ids
+from .classification import classify_tracks
 from .playlist_cache import (
     load_playlist_cache,
     load_staged_playlists,
@@ -35,84 +42,88 @@ def load_last_update_date():
 
 
 def save_last_update_date():
-    """Sauvegarde la date actuelle comme dernière date de mise à jour."""
+    """
+    Sauvegarde la date actuelle comme dernière date de mise à jour.
+    
+    Le fichier est fusionné sous verrou avec la version sur disque : si une
+    autre exécution a enregistré une date plus récente, elle est conservée.
+    """
+    current_time = datetime.now(timezone.utc)
+    
+    def merge(data):
+        stored = (data or {}).get("last_update")
+        try:
+            if stored and datetime.fromisoformat(stored.replace("Z", "+00:00")) > current_time:
+                return data
+        except ValueError:
+            pass
+        return {"last_update": current_time.isoformat()}
+    
     try:
-        last_update_file = path_last_update()
-        last_update_file.parent.mkdir(parents=True, exist_ok=True)
-        current_time = datetime.now(timezone.utc)
-        data = {
-            "last_update": current_time.isoformat()
-        }
-        with open(last_update_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        print(f"[*] Date de dernière mise à jour sauvegardee : {current_time.isoformat()}")
+        saved = update_json(path_last_update(), merge, default={}, indent=2)
+        print(f"[*] Date de dernière mise à jour sauvegardee : {saved['last_update']}")
     except Exception as e:
         print(f"[!] Erreur lors de la sauvegarde de la date : {e}")
 
 
-def get_new_liked_tracks(last_update_date=None):
+def get_new_liked_tracks(last_update_date=None, full_sync=False):
     """
     Récupère les nouvelles chansons likées depuis la dernière mise à jour.
     
+    Le miroir local de la bibliothèque est synchronisé (seules les pages plus
+    récentes que le dernier titre connu sont téléchargées), puis filtré.
+    
     Args:
         last_update_date: Date de la dernière mise à jour (datetime ou None)
+        full_sync: Si True, force une relecture complète de la bibliothèque
     
     Returns:
         Liste des nouvelles chansons likées avec leur date d'ajout
+        ({"track": entrée du miroir, "added_at": datetime ou None, "uri": ...})
     """
     print("\n[*] Recuperation des nouvelles chansons likees...")
     new_tracks = []
-    results = sp.current_user_saved_tracks(limit=50)
     
-    should_stop = False
-    while results and not should_stop:
-        for item in results["items"]:
-            track = item["track"]
-            added_at_str = item.get("added_at")
-            
-            if added_at_str:
-                try:
-                    added_at = datetime.fromisoformat(added_at_str.replace("Z", "+00:00"))
-                    
-                    # Si pas de date de dernière mise à jour, prendre toutes les chansons
-                    # Sinon, prendre seulement celles ajoutées après la dernière mise à jour
-                    if last_update_date is None or added_at > last_update_date:
-                        new_tracks.append({
-                            "track": track,
-                            "added_at": added_at,
-                            "uri": track["uri"]
-                        })
-                    else:
-                        # Les chansons sont triées par date décroissante, donc si on trouve
-                        # une chanson plus ancienne, on peut s'arrêter
-                        if last_update_date and added_at <= last_update_date:
-                            should_stop = True
-                            break
-                except Exception as e:
-                    print(f"[!] Erreur lors du parsing de la date : {e}")
-                    # En cas d'erreur, inclure la chanson par sécurité
+    for track in sync_library(full=full_sync):
+        added_at_str = track.get("added_at")
+        
+        if added_at_str:
+            try:
+                added_at = datetime.fromisoformat(added_at_str.replace("Z", "+00:00"))
+                
+                # Si pas de date de dernière mise à jour, prendre toutes les chansons
+                # Sinon, prendre seulement celles ajoutées après la dernière mise à jour
+                if last_update_date is None or added_at > last_update_date:
                     new_tracks.append({
                         "track": track,
-                        "added_at": None,
+                        "added_at": added_at,
                         "uri": track["uri"]
                     })
-            else:
-                # Si pas de date, inclure par sécurité
+                else:
+                    # Les chansons sont triées par date décroissante, donc si on trouve
+                    # une chanson plus ancienne, on peut s'arrêter
+                    break
+            except Exception as e:
+                print(f"[!] Erreur lors du parsing de la date : {e}")
+                # En cas d'erreur, inclure la chanson par sécurité
                 new_tracks.append({
                     "track": track,
                     "added_at": None,
                     "uri": track["uri"]
                 })
-        
-        if not should_stop and results:
-            results = sp.next(results) if results.get("next") else None
-            time.sleep(0.1)  # Anti rate-limit
+        else:
+            # Si pas de date, inclure par sécurité
+            new_tracks.append({
+                "track": track,
+                "added_at": None,
+                "uri": track["uri"]
+            })
     
     print(f"[*] {len(new_tracks)} nouvelle(s) chanson(s) likee(s) trouvee(s)")
     return new_tracks
 
 
-def analyze_new_tracks_genres(new_tracks, use_cache=True, force_refresh=False):
+def analyze_new_tracks_genres(new_tracks, use_cache=True, force_refresh=False, workers=1):
     """
     Analyse les genres des nouvelles chansons en utilisant le cache.
     
@@ -120,33 +131,33 @@ def analyze_new_tracks_genres(new_tracks, use_cache=True, force_refresh=False):
         new_tracks: Liste des nouvelles chansons
         use_cache: Si True, utilise le cache
         force_refresh: Si True, force la mise à jour depuis l'API
+        workers: Nombre de requêtes en parallèle pour les titres absents du cache
     
     Returns:
-        Tuple (genre_dict, track_genres_dict) où:
-        - genre_dict: Dictionnaire {genre: [track_uris]}
-        - track_genres_dict: Dictionnaire {track_uri: [genres]}
+        Dictionnaire {track_uri: (IDs de genres)} (voir genre_table)
     """
     print("\n[*] Analyse des genres des nouvelles chansons...")
     
     if use_cache:
-        from .genre_cache import get_cache
+        from .genre_cache import get_cache, track_records
         cache = get_cache()
         
         # Afficher les stats du cache
         stats = cache.get_cache_stats()
         print(f"[*] Cache: {stats['tracks_cached']} titres, {stats['artists_cached']} artistes en cache")
         
-        # Récupérer les URIs des nouvelles chansons
-        track_uris = [track_info["uri"] for track_info in new_tracks]
+        # Les titres likés contiennent déjà leurs artistes : pas besoin de sp.track
+        records = track_records(track_info["track"] for track_info in new_tracks)
         
         # Analyser avec le cache
         def progress_callback(idx, total):
             print(f"  -> {idx}/{total} nouvelles pistes analysees...")
         
-        track_genres_dict = cache.analyze_tracks_genres(
-            track_uris,
+        track_genres_dict = cache.analyze_track_records(
+            records,
             force_refresh=force_refresh,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            workers=workers
         )
     else:
         # Méthode originale sans cache
@@ -155,67 +166,52 @@ def analyze_new_tracks_genres(new_tracks, use_cache=True, force_refresh=False):
         
         for idx, track_info in enumerate(new_tracks, 1):
             track = track_info["track"]
-            artist_id = track["artists"][0]["id"]
+            if not track["artist_ids"]:
+                continue
+            artist_id = track["artist_ids"][0]
             
             if artist_id not in artist_cache:
-                artist_cache[artist_id] = sp.artist(artist_id)
-            
-            artist_info = artist_cache[artist_id]
-            time.sleep(0.1)  # Pour éviter de trop solliciter l'API
-            genres = artist_info.get("genres", ["Unknown"])
+                artist_cache[artist_id] = genre_ids(sp.artist(artist_id).get("genres", ["Unknown"]))
             
             # Stocker tous les genres de cette piste pour le filtrage
-            track_genres_dict[track_info["uri"]] = genres
+            track_genres_dict[track_info["uri"]] = artist_cache[artist_id]
             
             if idx % 20 == 0:
                 print(f"  -> {idx}/{len(new_tracks)} nouvelles pistes analysees...")
     
-    # Construire le genre_dict
-    genre_dict = defaultdict(list)
-    for track_uri, genres in track_genres_dict.items():
-        for genre in genres:
-            genre_dict[genre].append(track_uri)
-    
-    print(f"[*] {len(genre_dict)} genres differents trouves dans les nouvelles chansons\n")
-    return genre_dict, track_genres_dict
+    genre_count = len({genre for genres in track_genres_dict.values() for genre in genres})
+    print(f"[*] {genre_count} genres differents trouves dans les nouvelles chansons\n")
+    return track_genres_dict
 
 
-def find_playlists_for_genres(class_genres, genre_dict, track_genres_dict):
+def find_playlists_for_genres(class_genres, track_genres_dict):
     """
     Trouve les playlists correspondant aux genres trouvés.
     
+    Les titres sont classés par le moteur commun (voir classification.py),
+    à partir de leurs IDs de genres.
+    
     Args:
         class_genres: Dictionnaire des classes de genres
-        genre_dict: Dictionnaire des genres des nouvelles chansons
-        track_genres_dict: Dictionnaire {track_uri: [genres]} pour le filtrage
+        track_genres_dict: Dictionnaire {track_uri: (IDs de genres)}
     
     Returns:
         Dictionnaire {playlist_name: [track_uris]}
     """
     print("[*] Recherche des playlists correspondantes...")
     
-    # Charger les genres incompatibles
-    incompatible_genres = get_incompatible_genres()
+    # Charger les règles d'incompatibilité
+    incompatibility_rules = get_incompatibility_rules()
     
-    # Collecter tous les genres connus
-    all_known_genres = set()
-    for class_info in class_genres.values():
-        all_known_genres.update(class_info["genres"])
+    # Classer les nouvelles chansons en un seul passage
+    classification = classify_tracks(track_genres_dict)
     
     # Trouver les playlists par classe et par bucket
     playlists_to_update = defaultdict(set)
     
     # Par classe
-    for class_label, class_info in class_genres.items():
-        class_code = class_info["code"]
-        target_genres = class_info["genres"]
-        
-        # Trouver les genres correspondants
-        matching_track_uris = set()
-        for genre in target_genres:
-            if genre in genre_dict:
-                matching_track_uris.update(genre_dict[genre])
-        
+    for class_label in class_genres:
+        matching_track_uris = classification.tracks_for_class(class_label)
         if matching_track_uris:
             playlist_name = f"{class_label} (auto)"
             playlists_to_update[playlist_name].update(matching_track_uris)
@@ -224,23 +220,13 @@ def find_playlists_for_genres(class_genres, genre_dict, track_genres_dict):
     for class_label, class_info in class_genres.items():
         class_code = class_info["code"]
         buckets = class_info.get("buckets", {})
-        genres_by_bucket = class_info.get("genres_by_bucket", {})
         
         for bucket_key, bucket_label in buckets.items():
-            bucket_genres = genres_by_bucket.get(bucket_key, [])
-            
-            # Trouver les genres correspondants
-            matching_track_uris = set()
-            for genre in bucket_genres:
-                if genre in genre_dict:
-                    matching_track_uris.update(genre_dict[genre])
+            matching_track_uris = classification.tracks_for_bucket(bucket_key)
             
             # Filtrer les titres incompatibles
-            incompatible_genres_set = incompatible_genres.get(bucket_key, set())
-            filtered_track_uris = filter_incompatible_tracks(
-                list(matching_track_uris),
-                track_genres_dict,
-                incompatible_genres_set
+            filtered_track_uris = incompatibility_rules.filter_tracks(
+                bucket_key, matching_track_uris, track_genres_dict
             )
             
             if filtered_track_uris:
@@ -256,6 +242,11 @@ def find_playlists_for_genres(class_genres, genre_dict, track_genres_dict):
     return playlists_to_update_dict
 
 
+def find_playlist_snapshot(playlist_name):
+    """Retourne le snapshot_id connu d'une playlist (cache des playlists), ou None."""
+    return load_playlist_cache().get(playlist_name, {}).get("snapshot_id")
+
+
 def find_playlist_by_name(playlist_name):
     """
     Trouve une playlist par son nom (utilise le cache si disponible).
@@ -269,24 +260,81 @@ def find_playlist_by_name(playlist_name):
     cache = load_playlist_cache()
     if playlist_name in cache and cache[playlist_name].get("id"):
         return cache[playlist_name]["id"]
-    playlists = []
-    results = sp.current_user_playlists(limit=50)
-    while results:
-        playlists.extend(results["items"])
-        results = sp.next(results) if results.get("next") else None
-    for playlist in playlists:
-        if playlist.get("name") == playlist_name:
-            return playlist.get("id")
-    return None
+    playlist = find_playlist(playlist_name)
+    return playlist.get("id") if playlist else None
 
 
-def update_playlists(playlists_to_update, confirm=False):
+async def update_playlists_async(playlists_to_update):
+    """
+    Met à jour les playlists en parallèle avec le client asynchrone.
+    
+    Le contenu de toutes les playlists cibles est téléchargé simultanément
+    (toutes les pages à la fois), puis les nouveaux titres sont ajoutés.
+    
+    Args:
+        playlists_to_update: Dictionnaire {playlist_name: [track_uris]}
+    
+    Returns:
+        Nombre de playlists mises à jour
+    """
+    from .async_client import AsyncSpotify
+    
+    membership = get_membership()
+    targets = []
+    for playlist_name, track_uris in playlists_to_update.items():
+        playlist_id = find_playlist_by_name(playlist_name)
+        if not playlist_id:
+            print(f"  [-] Playlist '{playlist_name}' introuvable, ignoree")
+            continue
+        targets.append((playlist_name, playlist_id, track_uris))
+    
+    async with AsyncSpotify() as asp:
+        async def update_one(playlist_name, playlist_id, track_uris):
+            try:
+                # Vérifier les titres déjà présents (miroir local si la playlist n'a pas changé)
+                snapshot_id = find_playlist_snapshot(playlist_name)
+                if snapshot_id is None:
+                    snapshot_id = (await asp.playlist(playlist_id, fields="snapshot_id")).get("snapshot_id")
+                existing_tracks = membership.get(playlist_id, snapshot_id)
+                if existing_tracks is None:
+                    def fetch_page(limit, offset):
+                        return asp.playlist_items(
+                            playlist_id, fields="items(track(uri)),total", limit=limit, offset=offset
+                        )
+                    items = await asp.all_items(fetch_page, limit=100)
+                    existing_tracks = {item["track"].get("uri") for item in items if item.get("track")}
+                    membership.set(playlist_id, snapshot_id, existing_tracks)
+                
+                new_track_uris = [uri for uri in track_uris if uri not in existing_tracks]
+                if not new_track_uris:
+                    print(f"  [i] {playlist_name}: Tous les titres sont deja presents")
+                    return False
+                
+                # Ajouter les morceaux par lots de 100 (limite API)
+                for i in range(0, len(new_track_uris), 100):
+                    batch = new_track_uris[i:i+100]
+                    result = await asp.playlist_add_items(playlist_id, batch)
+                    membership.record_added(playlist_id, batch, (result or {}).get("snapshot_id"))
+                print(f"  [+] {playlist_name}: {len(new_track_uris)} titre(s) ajoute(s)")
+                return True
+            except Exception as e:
+                print(f"  [-] Erreur lors de la mise a jour de '{playlist_name}': {e}")
+                return False
+        
+        results = await asyncio.gather(*(update_one(*target) for target in targets))
+    membership.save()
+    invalidate_catalog()
+    return sum(results)
+
+
+def update_playlists(playlists_to_update, confirm=False, use_async=False):
     """
     Met à jour les playlists avec les nouvelles chansons.
     
     Args:
         playlists_to_update: Dictionnaire {playlist_name: [track_uris]}
         confirm: Si True, met à jour réellement. Si False, mode dry-run.
+        use_async: Si True, met à jour les playlists en parallèle via le client asynchrone (aiohttp)
     """
     if not playlists_to_update:
         print("[*] Aucune playlist a mettre a jour.")
@@ -306,6 +354,12 @@ def update_playlists(playlists_to_update, confirm=False):
         return
     
     print("\n[*] Mise a jour des playlists en cours...\n")
+    if use_async:
+        updated_count = asyncio.run(update_playlists_async(playlists_to_update))
+        print(f"\n[+] Termine. {updated_count}/{len(playlists_to_update)} playlist(s) mise(s) a jour avec succes.")
+        return
+    
+    membership = get_membership()
     updated_count = 0
     
     for playlist_name, track_uris in playlists_to_update.items():
@@ -317,14 +371,10 @@ def update_playlists(playlists_to_update, confirm=False):
                 continue
             
             # Vérifier les titres déjà présents pour éviter les doublons
-            existing_tracks = set()
-            results = sp.playlist_items(playlist_id, fields="items(track(uri)),next", limit=100)
-            while results:
-                for item in results.get("items", []):
-                    track = item.get("track")
-                    if track:
-                        existing_tracks.add(track.get("uri"))
-                results = sp.next(results) if results.get("next") else None
+            # (miroir local tant que le snapshot_id de la playlist n'a pas changé)
+            existing_tracks = get_playlist_uris(
+                playlist_id, find_playlist_snapshot(playlist_name), membership=membership
+            )
             
             # Filtrer les titres déjà présents
             new_track_uris = [uri for uri in track_uris if uri not in existing_tracks]
@@ -336,20 +386,21 @@ def update_playlists(playlists_to_update, confirm=False):
             # Ajouter les morceaux par lots de 100 (limite API)
             for i in range(0, len(new_track_uris), 100):
                 batch = new_track_uris[i:i+100]
-                sp.playlist_add_items(playlist_id, batch)
-                time.sleep(0.2)  # Anti rate-limit
+                result = sp.playlist_add_items(playlist_id, batch)
+                membership.record_added(playlist_id, batch, (result or {}).get("snapshot_id"))
             
             updated_count += 1
             print(f"  [+] {playlist_name}: {len(new_track_uris)} titre(s) ajoute(s)")
-            time.sleep(0.2)  # Anti rate-limit
             
         except Exception as e:
             print(f"  [-] Erreur lors de la mise a jour de '{playlist_name}': {e}")
     
+    membership.save()
+    invalidate_catalog()
     print(f"\n[+] Termine. {updated_count}/{len(playlists_to_update)} playlist(s) mise(s) a jour avec succes.")
 
 
-def update_playlists_main(confirm=False, use_cache=True, force_refresh=False):
+def update_playlists_main(confirm=False, use_cache=True, force_refresh=False, workers=1, use_async=False, full_sync=False):
     """
     Fonction principale pour mettre à jour les playlists.
     
@@ -357,6 +408,9 @@ def update_playlists_main(confirm=False, use_cache=True, force_refresh=False):
         confirm: Si True, met à jour réellement. Si False, mode dry-run.
         use_cache: Si True, utilise le cache des genres
         force_refresh: Si True, force la mise à jour du cache depuis l'API
+        workers: Nombre de requêtes en parallèle pour les titres absents du cache
+        use_async: Si True, met à jour les playlists via le client asynchrone (aiohttp)
+        full_sync: Si True, relit entièrement la bibliothèque avant de chercher les nouveaux titres
     """
     # Récupérer le profil utilisateur
     me = sp.current_user()
@@ -379,14 +433,16 @@ def update_playlists_main(confirm=False, use_cache=True, force_refresh=False):
             return
     
     # Récupérer les nouvelles chansons likées
-    new_tracks = get_new_liked_tracks(last_update_date)
+    new_tracks = get_new_liked_tracks(last_update_date, full_sync=full_sync)
     
     if not new_tracks:
         print("\n[+] Aucune nouvelle chanson likee depuis la derniere mise a jour.")
         return
     
     # Analyser les genres des nouvelles chansons
-    genre_dict, track_genres_dict = analyze_new_tracks_genres(new_tracks, use_cache=use_cache, force_refresh=force_refresh)
+    track_genres_dict = analyze_new_tracks_genres(
+        new_tracks, use_cache=use_cache, force_refresh=force_refresh, workers=workers
+    )
     
     # Charger les classes de genres
     class_genres = load_class_genres()
@@ -396,7 +452,7 @@ def update_playlists_main(confirm=False, use_cache=True, force_refresh=False):
     print("[*] Cache des playlists (auto) mis a jour.")
 
     # Trouver les playlists à mettre à jour
-    playlists_to_update = find_playlists_for_genres(class_genres, genre_dict, track_genres_dict)
+    playlists_to_update = find_playlists_for_genres(class_genres, track_genres_dict)
 
     # Mode "git" : si des playlists sont staged, ne mettre à jour que celles-là
     staged = load_staged_playlists()
@@ -408,7 +464,7 @@ def update_playlists_main(confirm=False, use_cache=True, force_refresh=False):
         print(f"[*] Mise a jour partielle : {len(playlists_to_update)} playlist(s) staged sur {len(staged)} selectionnee(s).")
 
     # Mettre à jour les playlists
-    update_playlists(playlists_to_update, confirm=confirm)
+    update_playlists(playlists_to_update, confirm=confirm, use_async=use_async)
     
     # Sauvegarder la date de mise à jour si confirmé
     if confirm:
@@ -0,0 +1,44 @@
+"""
+Configuration commune des tests.
+
+Les modules de l'application importent `spotifyapp.credentials`, qui lit
+config/ID_client.txt et ouvre une session OAuth : il est remplacé par un
+module factice exposant `sp` (voir `fake_sp`). Les fichiers de data/ sont
+redirigés vers un dossier temporaire (voir `data_dir`).
+"""
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+class FakeSpotify:
+    """Client factice : les tests définissent les méthodes dont ils ont besoin (monkeypatch)."""
+
+
+_credentials = types.ModuleType("spotifyapp.credentials")
+_credentials.sp = FakeSpotify()
+sys.modules["spotifyapp.credentials"] = _credentials
+
+
+@pytest.fixture
+def fake_sp(monkeypatch):
+    """Client `sp` factice partagé par tous les modules, réinitialisé à chaque test."""
+    client = FakeSpotify()
+    for name, module in list(sys.modules.items()):
+        if name.startswith("spotifyapp.") and getattr(module, "sp", None) is not None:
+            monkeypatch.setattr(module, "sp", client)
+    monkeypatch.setattr(_credentials, "sp", client)
+    return client
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Redirige data/ vers un dossier temporaire."""
+    from spotifyapp import paths
+
+    monkeypatch.setattr(paths, "DIR_DATA", tmp_path)
+    return tmp_path
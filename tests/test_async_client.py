@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from spotifyapp.async_client import AsyncSpotify, AsyncSpotifyError
+from spotifyapp.rate_limiter import RateLimitedSpotify
+
+
+def limiter(**kwargs) -> RateLimitedSpotify:
+    auth_manager = SimpleNamespace(get_access_token=lambda as_dict=False: "token")
+    return RateLimitedSpotify(SimpleNamespace(auth_manager=auth_manager), base_delay=0.01, **kwargs)
+
+
+def run(responses, **kwargs):
+    """
+    Exécute une requête contre un serveur local répondant avec `responses`
+    (statut, ou "slow" pour dépasser le délai ; le dernier est répété).
+
+    Returns:
+        Tuple (résultat ou exception, nombre de requêtes reçues, compteurs du limiteur)
+    """
+    hits = []
+
+    async def handler(request):
+        response = responses[min(len(hits), len(responses) - 1)]
+        hits.append(response)
+        if response == "slow":
+            await asyncio.sleep(1)
+            response = 200
+        return web.json_response({"id": "abc"}, status=response)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/v1/me", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        limited = limiter(**kwargs)
+        try:
+            async with AsyncSpotify(limited, timeout=0.2) as asp:
+                try:
+                    result = await asp._request("current_user", "GET", f"http://127.0.0.1:{port}/v1/me")
+                except Exception as e:
+                    result = e
+        finally:
+            await runner.cleanup()
+        return result, len(hits), limited.stats()
+
+    return asyncio.run(main())
+
+
+def test_server_error_is_retried():
+    result, hits, stats = run([503, 502, 200])
+    assert result == {"id": "abc"}
+    assert hits == 3
+    assert stats["retries"] == 2 and stats["throttled"] == 0
+
+
+def test_server_error_surfaces_after_max_retries():
+    result, hits, _ = run([500], max_retries=2)
+    assert isinstance(result, AsyncSpotifyError) and result.http_status == 500
+    assert hits == 3
+
+
+def test_timeout_is_retried():
+    result, hits, stats = run(["slow", 200])
+    assert result == {"id": "abc"}
+    assert hits == 2 and stats["retries"] == 1
+
+
+def test_client_error_is_not_retried():
+    result, hits, _ = run([404])
+    assert isinstance(result, AsyncSpotifyError) and result.http_status == 404
+    assert hits == 1
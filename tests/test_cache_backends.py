@@ -0,0 +1,106 @@
+import pytest
+
+from spotifyapp import cache_backends
+from spotifyapp.cache_backends import TABLES, backend_names, open_backend
+
+
+META = {"version": 2, "created_at": 1.0, "last_updated": 2.0}
+
+
+def entries(count, updated_at=10.0):
+    return {
+        "tracks": {f"spotify:track:{i}": {"artist_id": f"a{i % 3}", "updated_at": updated_at} for i in range(count)},
+        "artists": {f"a{i}": {"genres": [f"genre {i}"], "updated_at": updated_at} for i in range(3)},
+    }
+
+
+def read_all(backend):
+    return {table: dict(backend.items(table)) for table in TABLES}
+
+
+@pytest.fixture(params=backend_names())
+def cache_path(request, tmp_path):
+    return request.param, tmp_path / f"genre_cache.{request.param}"
+
+
+def test_round_trip_across_reopen(cache_path):
+    name, path = cache_path
+    backend = open_backend(name, path)
+    assert backend.load_meta() is None
+    data = entries(10)
+    backend.write(META, data, {})
+    backend.write({**META, "last_updated": 3.0}, {}, {"tracks": {"spotify:track:0"}})
+    backend.close()
+
+    backend = open_backend(name, path)
+    try:
+        del data["tracks"]["spotify:track:0"]
+        assert backend.load_meta() == {**META, "last_updated": 3.0}
+        assert read_all(backend) == data
+        assert backend.count("tracks") == 9
+        assert backend.get_many("artists", ["a1", "missing"]) == {"a1": data["artists"]["a1"]}
+    finally:
+        backend.close()
+
+
+def test_write_keeps_newer_entries_from_other_process(cache_path):
+    name, path = cache_path
+    first = open_backend(name, path)
+    second = open_backend(name, path)
+    try:
+        first.write(META, entries(2, updated_at=20.0), {})
+        second.write(META, entries(2, updated_at=10.0), {})
+        assert second.get_many("artists", ["a0"])["a0"]["updated_at"] == 20.0
+    finally:
+        first.close()
+        second.close()
+
+    backend = open_backend(name, path)
+    try:
+        assert {entry["updated_at"] for _, entry in backend.items("tracks")} == {20.0}
+    finally:
+        backend.close()
+
+
+def test_reset_empties_storage(cache_path):
+    name, path = cache_path
+    backend = open_backend(name, path)
+    backend.write(META, entries(5), {})
+    backend.reset({**META, "created_at": 5.0})
+    backend.close()
+
+    backend = open_backend(name, path)
+    try:
+        assert backend.load_meta()["created_at"] == 5.0
+        assert all(backend.count(table) == 0 for table in TABLES)
+    finally:
+        backend.close()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        open_backend("nope", "genre_cache.nope")
+
+
+def test_journal_compaction_is_not_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_backends, "COMPACT_MIN_BYTES", 0)
+    backend = open_backend("journal", tmp_path / "genre_cache.log")
+    try:
+        backend.write(META, entries(20), {})
+        backend._wait_compaction()
+        assert backend.snapshot_path.exists() and not backend.old_log_path.exists()
+
+        reads = []
+        read = backend._read
+        monkeypatch.setattr(backend, "_read", lambda: reads.append(1) or read())
+        backend.write(META, entries(1, updated_at=30.0), {})
+        assert reads == []
+    finally:
+        backend.close()
+
+    backend = open_backend("journal", tmp_path / "genre_cache.log")
+    try:
+        assert backend.count("tracks") == 20
+        assert backend.get_many("tracks", ["spotify:track:0"])["spotify:track:0"]["updated_at"] == 30.0
+    finally:
+        backend.close()
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from spotifyapp import genre_cache
+from spotifyapp.genre_cache import GenreCache
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return tmp_path / "genre_cache.db"
+
+
+class ShutDownExecutor(ThreadPoolExecutor):
+    """Pool refusant les tâches, comme après l'arrêt de l'interpréteur (appel depuis atexit)."""
+
+    def submit(self, *args, **kwargs):
+        raise RuntimeError("cannot schedule new futures after interpreter shutdown")
+
+
+def test_close_saves_when_refresh_cannot_be_submitted(fake_sp, cache_file, monkeypatch):
+    monkeypatch.setattr(genre_cache, "ThreadPoolExecutor", ShutDownExecutor)
+    cache = GenreCache(cache_file)
+    cache._set_artist("a1", ["Rock"], time.time())
+    cache._refresh.schedule("a2")
+    cache.close()
+
+    cache = GenreCache(cache_file)
+    try:
+        assert cache.cache_data["artists"]["a1"]["genres"] == ["rock"]
+        assert "a2" not in cache.cache_data["artists"]
+    finally:
+        cache.close()
+
+
+def test_track_without_artists_is_cached_as_negative(fake_sp, cache_file):
+    fake_sp.artists = lambda ids: {"artists": [{"id": artist_id, "genres": ["Jazz"]} for artist_id in ids]}
+    cache = GenreCache(cache_file)
+    try:
+        records = [("spotify:track:1", ["a1"]), ("spotify:track:2", [])]
+        assert list(cache.analyze_track_records(records, save_every_n=0)) == ["spotify:track:1"]
+        assert cache.cache_data["tracks"]["spotify:track:2"]["negative"] == genre_cache.NO_ARTISTS
+
+        cache.analyze_track_records(records, save_every_n=0)
+        assert cache.metrics.to_dict()["negative_hits"] == 1
+    finally:
+        cache.close()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "journal", "binary", "json"])
+def test_collect_garbage_drops_unliked_tracks_and_orphan_artists(fake_sp, tmp_path, backend):
+    cache = GenreCache(tmp_path / f"genre_cache.{backend}", backend=backend)
+    now = time.time()
+    for i in range(6):
+        cache._set_artist(f"a{i}", ["pop"], now)
+    for i in range(4):
+        cache.cache_data["tracks"][f"spotify:track:{i}"] = {"artist_id": f"a{i}", "updated_at": now}
+    cache._save_cache()
+
+    result = cache.collect_garbage({"spotify:track:0", "spotify:track:1"}, keep_artists={"a5"})
+    assert result["before"]["tracks"] == 4 and result["before"]["artists"] == 6
+    assert result["after"]["tracks"] == 2 and result["after"]["artists"] == 3
+    cache.close()
+
+    cache = GenreCache(tmp_path / f"genre_cache.{backend}", backend=backend)
+    try:
+        assert sorted(cache.cache_data["tracks"]) == ["spotify:track:0", "spotify:track:1"]
+        assert sorted(cache.cache_data["artists"]) == ["a0", "a1", "a5"]
+    finally:
+        cache.close()
@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from spotifyapp import incompatibility
+from spotifyapp.genre_table import genre_ids
+from spotifyapp.incompatibility import IncompatibilityRules, get_incompatibility_rules
+
+
+SHIPPED_RULES = Path(__file__).resolve().parent.parent / "data" / "incompatible_genres.json"
+
+DATA = {
+    "groups": {
+        "trap": ["Trap", "drill"],
+        "rap": ["rap", "@trap"],
+    },
+    "buckets": {
+        "4.3": {"label": "House", "exclude": ["@rap", "Hip House"]},
+        "1.5": {"label": "Hip hop, Rap", "exclude": []},
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_rules(monkeypatch):
+    monkeypatch.setattr(incompatibility, "_rules", None)
+    monkeypatch.setattr(incompatibility, "_rules_signature", None)
+
+
+def test_groups_are_expanded():
+    rules = IncompatibilityRules.from_data(DATA)
+    assert rules.genres_by_bucket == {"4.3": {"rap", "trap", "drill", "hip house"}, "1.5": set()}
+    assert rules.has_rules("4.3")
+    assert not rules.has_rules("1.5") and not rules.has_rules("9.9")
+
+
+@pytest.mark.parametrize("groups, message", [
+    ({"a": ["@b"], "b": ["@a"]}, "circulaire"),
+    ({"a": ["@missing"]}, "inconnu"),
+])
+def test_invalid_groups(groups, message):
+    data = {"groups": groups, "buckets": {"4.3": {"exclude": ["@a"]}}}
+    with pytest.raises(ValueError, match=message):
+        IncompatibilityRules.from_data(data)
+
+
+def test_filtering():
+    rules = IncompatibilityRules.from_data(DATA)
+    track_genres = {
+        "spotify:track:1": genre_ids(["deep house"]),
+        "spotify:track:2": genre_ids(["house", "drill"]),
+        "spotify:track:3": genre_ids(["hip house"]),
+        "spotify:track:4": (),
+    }
+    uris = list(track_genres) + ["spotify:track:unknown"]
+    assert rules.filter_tracks("4.3", uris, track_genres) == ["spotify:track:1", "spotify:track:4", "spotify:track:unknown"]
+    assert rules.filter_tracks("1.5", uris, track_genres) == uris
+
+    scored = [("spotify:track:2", 3.0), ("spotify:track:1", 2.0), ("spotify:track:3", 1.0)]
+    assert rules.filter_scored("4.3", scored, track_genres) == [("spotify:track:1", 2.0)]
+    assert rules.filter_scored("1.5", scored, track_genres) == scored
+
+    assert rules.is_compatible("4.3", genre_ids(["house"]))
+    assert not rules.is_compatible("4.3", genre_ids(["trap"]))
+
+
+def test_rules_are_loaded_and_reloaded(data_dir):
+    assert not get_incompatibility_rules().has_rules("4.3")
+
+    path = data_dir / "incompatible_genres.json"
+    path.write_text(json.dumps(DATA), encoding="utf-8")
+    rules = get_incompatibility_rules()
+    assert rules.has_rules("4.3")
+    assert get_incompatibility_rules() is rules
+
+    path.write_text(json.dumps({"buckets": {"1.5": {"exclude": ["house"]}}, "extra": 1}), encoding="utf-8")
+    rules = get_incompatibility_rules()
+    assert rules.has_rules("1.5") and not rules.has_rules("4.3")
+
+
+def test_invalid_file_is_ignored(data_dir):
+    (data_dir / "incompatible_genres.json").write_text(
+        json.dumps({"buckets": {"4.3": {"exclude": ["@missing"]}}}), encoding="utf-8"
+    )
+    assert not get_incompatibility_rules().has_rules("4.3")
+
+
+def test_shipped_rules():
+    with open(SHIPPED_RULES, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rules = IncompatibilityRules.from_data(data)
+    rap = set(data["groups"]["rap"])
+    electro = set(data["groups"]["electro"])
+    assert rules.genres_by_bucket["4.3"] == rap | {"jazz rap", "hip house"}
+    for bucket_key in ("4.4", "4.6", "4.7", "4.8"):
+        assert rules.genres_by_bucket[bucket_key] == rap
+    assert rules.genres_by_bucket["1.5"] == electro
+    assert not rules.is_compatible("4.4", genre_ids(["techno", "french rap"]))
+    assert rules.is_compatible("1.5", genre_ids(["french rap"]))
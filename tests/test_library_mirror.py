@@ -0,0 +1,108 @@
+import pytest
+
+from spotifyapp import library_mirror
+from spotifyapp.library_mirror import load_library_mirror, sync_library
+
+
+class FakeLibrary:
+    """Titres likés (du plus récent au plus ancien) servis comme current_user_saved_tracks."""
+
+    def __init__(self, count):
+        self.items = [self.item(i) for i in range(count, 0, -1)]
+        self.offsets = []
+
+    @staticmethod
+    def item(i, track=True):
+        return {
+            "added_at": f"2025-01-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "track": {"uri": f"spotify:track:{i}", "name": f"Song {i}", "artists": [{"id": f"a{i}"}]} if track else None,
+        }
+
+    def like(self, i):
+        self.items.insert(0, self.item(i))
+
+    def current_user_saved_tracks(self, limit=20, offset=0):
+        self.offsets.append(offset)
+        return {
+            "items": self.items[offset:offset + limit],
+            "total": len(self.items),
+            "offset": offset,
+            "limit": limit,
+            "next": "next" if offset + limit < len(self.items) else None,
+        }
+
+    def next(self, results):
+        return self.current_user_saved_tracks(limit=results["limit"], offset=results["offset"] + results["limit"])
+
+
+@pytest.fixture
+def library(fake_sp, data_dir):
+    library = FakeLibrary(120)
+    # Un titre devenu indisponible : compté dans le total mais sans URI
+    library.items.insert(60, FakeLibrary.item(0, track=False))
+    fake_sp.current_user_saved_tracks = library.current_user_saved_tracks
+    fake_sp.next = library.next
+    return library
+
+
+def test_first_sync_reads_the_whole_library(library):
+    tracks = sync_library(workers=1)
+
+    assert len(tracks) == 120
+    assert tracks[0]["uri"] == "spotify:track:120"
+    mirror = load_library_mirror()
+    assert len(mirror["unavailable"]) == 1
+    assert len(mirror["tracks"]) == 120
+
+
+def test_incremental_sync_fetches_only_new_pages(library, monkeypatch):
+    sync_library(workers=1)
+    library.like(500)
+    library.offsets.clear()
+    monkeypatch.setattr(library_mirror, "_full_scan", lambda workers: pytest.fail("relecture complete inattendue"))
+
+    tracks = sync_library(workers=1)
+
+    assert library.offsets == [0]
+    assert len(tracks) == 121
+    assert tracks[0]["uri"] == "spotify:track:500"
+
+
+def test_incremental_sync_without_changes_stays_incremental(library, monkeypatch):
+    sync_library(workers=1)
+    library.offsets.clear()
+    monkeypatch.setattr(library_mirror, "_full_scan", lambda workers: pytest.fail("relecture complete inattendue"))
+
+    assert len(sync_library(workers=1)) == 120
+    assert library.offsets == [0]
+
+
+@pytest.mark.parametrize("before_first_sync", [True, False])
+def test_new_unavailable_item_is_counted_once(library, monkeypatch, before_first_sync):
+    if before_first_sync:
+        library.items.insert(0, FakeLibrary.item(600, track=False))
+    sync_library(workers=1)
+    if not before_first_sync:
+        library.items.insert(0, FakeLibrary.item(600, track=False))
+    monkeypatch.setattr(library_mirror, "_full_scan", lambda workers: pytest.fail("relecture complete inattendue"))
+
+    for _ in range(3):
+        assert len(sync_library(workers=1)) == 120
+    assert len(load_library_mirror()["unavailable"]) == 2
+
+
+def test_removed_track_triggers_full_scan(library):
+    sync_library(workers=1)
+    del library.items[10]
+
+    tracks = sync_library(workers=1)
+
+    assert len(tracks) == 119
+    assert "spotify:track:110" not in {entry["uri"] for entry in tracks}
+
+
+def test_mirror_is_written_atomically(library, data_dir):
+    sync_library(workers=1)
+
+    assert (data_dir / "library_mirror.json").exists()
+    assert not list(data_dir.glob("*.tmp"))
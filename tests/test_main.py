@@ -0,0 +1,55 @@
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from spotifyapp import genre_cache
+from spotifyapp.genre_cache import GenreCache, close_cache, default_cache_file
+
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+
+@pytest.fixture
+def cli(fake_sp, data_dir, monkeypatch):
+    """Module main.py chargé avec le client factice ; `run(*args)` exécute main() avec ces arguments."""
+    spec = importlib.util.spec_from_file_location("spotifyapp_main", MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "sp", fake_sp)
+    fake_sp.current_user = lambda: {"id": "me", "display_name": "Me"}
+
+    def run(*args):
+        monkeypatch.setattr(sys, "argv", ["main.py", *args])
+        try:
+            module.main()
+        finally:
+            close_cache()
+
+    module.run = run
+    return module
+
+
+def test_cache_gc_keeps_followed_artists(cli, fake_sp, monkeypatch):
+    cache = GenreCache(default_cache_file(genre_cache.DEFAULT_BACKEND))
+    now = time.time()
+    for artist_id in ("liked", "followed", "orphan"):
+        cache._set_artist(artist_id, ["pop"], now)
+    cache.cache_data["tracks"]["spotify:track:1"] = {"artist_id": "liked", "updated_at": now}
+    cache.cache_data["tracks"]["spotify:track:2"] = {"artist_id": "orphan", "updated_at": now}
+    cache.close()
+
+    monkeypatch.setattr(cli, "get_liked_tracks", lambda: [{"uri": "spotify:track:1", "artist_ids": ["liked"]}])
+    fake_sp.current_user_followed_artists = lambda limit, after: {
+        "artists": {"items": [{"id": "followed", "genres": ["pop"]}], "next": None, "cursors": {}}
+    }
+    cli.run("--cache-gc")
+
+    cache = GenreCache(default_cache_file(genre_cache.DEFAULT_BACKEND))
+    try:
+        assert sorted(cache.cache_data["artists"]) == ["followed", "liked"]
+        assert list(cache.cache_data["tracks"]) == ["spotify:track:1"]
+    finally:
+        cache.close()
@@ -0,0 +1,37 @@
+from spotifyapp import playlist_catalog
+from spotifyapp.jsonio import read_json
+from spotifyapp.playlist_membership import PlaylistMembership
+
+
+def test_concurrent_saves_are_merged(data_dir):
+    path = data_dir / "playlist_membership.json"
+    first = PlaylistMembership(path)
+    first.set("p1", "s1", ["spotify:track:1"])
+    first.set("p2", "s1", ["spotify:track:2"])
+    first.save()
+
+    # Deux processus ouverts sur la même version du fichier
+    update = PlaylistMembership(path)
+    train = PlaylistMembership(path)
+    update.record_added("p1", ["spotify:track:3"], "s2")
+    train.set("p3", "s1", ["spotify:track:4"])
+    train.forget("p2")
+    update.save()
+    train.save()
+
+    stored = read_json(path)
+    assert stored == {
+        "p1": {"snapshot_id": "s2", "uris": ["spotify:track:1", "spotify:track:3"]},
+        "p3": {"snapshot_id": "s1", "uris": ["spotify:track:4"]},
+    }
+    assert train.get("p1", "s2") == {"spotify:track:1", "spotify:track:3"}
+    assert not list(data_dir.glob("*.tmp"))
+
+
+def test_older_catalog_does_not_replace_newer(data_dir):
+    playlist_catalog._save_catalog_file({"fetched_at": 20.0, "playlists": [{"id": "new"}]})
+    playlist_catalog._save_catalog_file({"fetched_at": 10.0, "playlists": [{"id": "old"}]})
+    assert read_json(data_dir / "playlist_catalog.json")["playlists"] == [{"id": "new"}]
+
+    playlist_catalog._save_catalog_file({"fetched_at": 30.0, "playlists": []})
+    assert read_json(data_dir / "playlist_catalog.json")["fetched_at"] == 30.0
@@ -0,0 +1,102 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+spotipy = pytest.importorskip("spotipy")
+from spotipy.exceptions import SpotifyException
+
+from spotifyapp.rate_limiter import RateLimitedSpotify, build_session
+
+
+class FakeApi:
+    """Serveur HTTP local : répond avec les statuts de `responses` (le dernier est répété)."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.hits = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers = api.responses[min(api.hits, len(api.responses) - 1)]
+                api.hits += 1
+                body = json.dumps({"id": "abc"} if status == 200 else {"error": {"status": status, "message": "x"}})
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def client(self, **kwargs) -> RateLimitedSpotify:
+        sp = spotipy.Spotify(auth="token", requests_session=build_session(backoff_factor=0))
+        sp.prefix = f"http://127.0.0.1:{self.server.server_port}/v1/"
+        return RateLimitedSpotify(sp, base_delay=0.01, **kwargs)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_api():
+    servers = []
+
+    def start(responses):
+        api = FakeApi(responses)
+        servers.append(api)
+        return api
+
+    yield start
+    for api in servers:
+        api.close()
+
+
+def test_429_with_retry_after_reaches_the_limiter(fake_api):
+    api = fake_api([(429, {"Retry-After": "0"}), (200, {})])
+    sp = api.client()
+
+    assert sp.track("abc")["id"] == "abc"
+    assert api.hits == 2  # Une seule nouvelle tentative, faite par le limiteur
+    stats = sp.stats()
+    assert stats["throttled"] == 1
+    assert stats["rates"]["read"] < 10.0  # Débit réduit après le 429
+
+
+def test_429_gives_up_after_max_retries(fake_api):
+    api = fake_api([(429, {"Retry-After": "0"})])
+    sp = api.client(max_retries=2)
+
+    with pytest.raises(SpotifyException) as error:
+        sp.track("abc")
+    assert error.value.http_status == 429
+    assert api.hits == 3
+    assert sp.stats()["throttled"] == 2
+
+
+def test_server_errors_are_retried_by_the_transport(fake_api):
+    api = fake_api([(503, {}), (200, {})])
+    sp = api.client()
+
+    assert sp.track("abc")["id"] == "abc"
+    assert api.hits == 2
+    assert sp.stats()["throttled"] == 0
+
+
+def test_server_errors_surface_after_transport_retries(fake_api):
+    api = fake_api([(500, {})])
+    sp = api.client()
+
+    with pytest.raises(SpotifyException) as error:
+        sp.track("abc")
+    assert error.value.http_status == 500
+    assert api.hits == 4
+    assert sp.stats()["throttled"] == 0
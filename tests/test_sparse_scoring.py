@@ -0,0 +1,68 @@
+import pytest
+
+from spotifyapp import sparse_scoring
+from spotifyapp.genre_scoring import GenreScoringModel
+from spotifyapp.genre_table import genre_ids
+
+
+CLASS_GENRES = {
+    "Rock": {
+        "buckets": {"2.1": "Rock classique", "2.2": "Metal", "2.3": "Vide"},
+        "genres_by_bucket": {"2.1": ["Rock", "classic rock"], "2.2": ["metal", "heavy metal"], "2.3": []},
+    },
+    "Electro": {
+        "buckets": {"4.3": "House", "4.4": "Techno"},
+        "genres_by_bucket": {"4.3": ["house", "deep house"], "4.4": ["techno", "rock"]},
+    },
+}
+
+TRACKS = {
+    "spotify:track:1": ("rock",),
+    "spotify:track:2": ("hard rock", "heavy metal"),
+    "spotify:track:3": ("deep house", "house"),
+    "spotify:track:4": ("jazz",),
+    "spotify:track:5": (),
+    "spotify:track:6": ("rock",),
+    "spotify:track:7": ("techno", "classic rock", "metal"),
+    "spotify:track:8": ("tech house",),
+}
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy" and not sparse_scoring.is_available():
+        pytest.skip("NumPy/SciPy non installés")
+    if request.param == "python":
+        monkeypatch.setattr(sparse_scoring, "sparse", None)
+    return request.param
+
+
+@pytest.fixture
+def model():
+    model = GenreScoringModel(CLASS_GENRES)
+    model.genre_weights["2.1"]["classic rock"] = 0.25
+    model.genre_weights["2.2"]["metal"] = 0.0
+    model.genre_weights["4.3"]["deep house"] = 1.5
+    return model
+
+
+@pytest.fixture
+def track_genres():
+    return {track_uri: genre_ids(genres) for track_uri, genres in TRACKS.items()}
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.0, 2.0])
+def test_matches_per_bucket_scoring(engine, model, track_genres, threshold):
+    results = model.score_all_buckets(track_genres, threshold=threshold)
+    assert list(results) == list(model.genre_weights)
+    for bucket_key, scored in results.items():
+        expected = model.score_tracks_for_bucket(track_genres, bucket_key, threshold=threshold)
+        assert [uri for uri, _ in scored] == [uri for uri, _ in expected]
+        assert [score for _, score in scored] == pytest.approx([score for _, score in expected])
+
+
+def test_bucket_selection(engine, model, track_genres):
+    results = model.score_all_buckets(track_genres, bucket_keys=["4.4", "9.9"])
+    assert list(results) == ["4.4"]
+    assert results["4.4"] == model.score_tracks_for_bucket(track_genres, "4.4")
+    assert model.score_all_buckets(track_genres, bucket_keys=["9.9"]) == {}